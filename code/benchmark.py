@@ -0,0 +1,342 @@
+# Author: Pedro Urbina Rodriguez
+# Search benchmark: fixed positions searched to fixed depths by each
+# strategy and heuristic, with the results written to a JSON file that
+# can be compared with the one of another commit.
+
+
+from __future__ import annotations  # For Python 3.7
+
+# import from parent directory
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+
+
+import json
+import platform
+import random
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from endgame import EndgameSolver
+from game_infrastructure.reversi import BitboardReversi, Reversi, create_reversi_state
+from heuristic import *
+from move_ordering import MoveOrdering
+from strategy import MinimaxAlphaBetaStrategy, NegamaxPVSStrategy, Strategy
+from transposition import TranspositionTable
+
+
+
+###############################################################################################
+############################### BENCHMARK CONFIGURATION #######################################
+###############################################################################################
+
+# name: (board as in tournament.py, None for the initial 8x8 board; label of the player to move)
+positions = {
+    '8x8 opening': (None, 'B'),
+    '8x8 early': (
+        [
+            '........',
+            '........',
+            '..B.W...',
+            '...BWBB.',
+            '...BWB..',
+            '...W....',
+            '..WB....',
+            '........',
+        ],
+        'B',
+    ),
+    '8x8 midgame 1': (
+        [
+            '...W.W..',
+            'BBBBW...',
+            '.BWWB...',
+            '..WBBBB.',
+            '..WBBBB.',
+            '.BWWBWBB',
+            '..WWW..B',
+            '........',
+        ],
+        'B',
+    ),
+    '8x8 midgame 2': (
+        [
+            'W....BW.',
+            '.W.B.W..',
+            '..WBBB..',
+            '..BWWWW.',
+            '..BBWBW.',
+            '.B..BBW.',
+            '....BBWB',
+            '...BW.BW',
+        ],
+        'B',
+    ),
+    '8x8 endgame 1': (
+        [
+            'BBBBBW..',
+            'WBWWWW.B',
+            'WWWWWWBB',
+            'WWWBBW.B',
+            'WWBBBWWW',
+            'WWWBWBW.',
+            'W.WBBW.W',
+            '.W.BB...',
+        ],
+        'B',
+    ),
+    '8x8 endgame 2': (
+        [
+            '.BWB.WBW',
+            'BBWWBBBB',
+            'BBWBWWBW',
+            'BBWWWBWW',
+            'BBWWB.W.',
+            'WBWBWWW.',
+            '..B.WWWW',
+            '...WWWW.',
+        ],
+        'B',
+    ),
+    '5x7 intermediate': (
+        [
+            '..B.B..',
+            '.WBBW..',
+            'WBWBB..',
+            '.W.WWW.',
+            '.BBWBWB',
+        ],
+        'B',
+    ),
+    '5x7 endgame': (
+        [
+            'B.B.B..',
+            'WWWWWW.',
+            'WWBBBB.',
+            '.WWWWW.',
+            'WWWWBWB',
+        ],
+        'B',
+    ),
+}
+
+engines = [Reversi, BitboardReversi]
+max_depth = 4 # every position is searched to depths 1, 2, ..., max_depth
+repetitions = 1 # each search is timed this many times, keeping the fastest
+
+# name: evaluation heuristic (deterministic, so that node counts are reproducible)
+corners_parity_mobility = ([corners_based_function, parity_function, best_mobility_function], [0.3, 0.3, 0.4])
+heuristics = {
+    'mobility': Heuristic(name='mobility', evaluation_function=best_mobility_function),
+    'corners_parity_mobility': Heuristic(
+        name='corners_parity_mobility',
+        evaluation_function=lambda state: combined_based_function(state, *corners_parity_mobility),
+        batch_evaluation_function=lambda batch: combined_based_function_batch(
+            batch,
+            [corners_based_function_batch, parity_function_batch, best_mobility_function_batch],
+            corners_parity_mobility[1],
+        ),
+    ),
+    'ponderation_maximize': Heuristic(
+        name='ponderation_maximize',
+        evaluation_function=lambda state: ponderation_maximize(state, 0.25, 0.25, 0.25, 0.25),
+    ),
+}
+
+# name: function (heuristic, depth) -> search strategy
+strategies = {
+    'alphabeta': lambda heuristic, depth: MinimaxAlphaBetaStrategy(heuristic, depth),
+    'pvs_tt_ordering': lambda heuristic, depth: NegamaxPVSStrategy(
+        heuristic,
+        depth,
+        transposition_table=TranspositionTable(),
+        move_ordering=MoveOrdering(),
+    ),
+}
+
+endgame_max_empties = 14 # positions with at most this many empties are also solved exactly
+results_path = None # None for benchmark-<commit>.json
+compare_with = None # e.g. 'benchmark-1a2b3c4.json': print the changes with respect to it
+
+
+
+###############################################################################################
+#################################### BENCHMARK RUN ############################################
+###############################################################################################
+
+def git_commit() -> Optional[str]:
+    """Short hash of the current commit (with '-dirty' if there are changes)."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        changes = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + '-dirty' if changes else commit
+
+
+def count_nodes(strategy: Strategy, calls_before: int) -> int:
+    """Nodes expanded by the last search of the strategy."""
+    if hasattr(strategy, 'statistics'):
+        return strategy.statistics.nodes
+    return type(strategy).calls_number - calls_before
+
+
+def benchmark_search(
+    engine: type,
+    position: str,
+    strategy_name: str,
+    heuristic_name: str,
+) -> List[Dict[str, Any]]:
+    """Search the position to each depth, from scratch every time."""
+    board, label = positions[position]
+    results = []
+    previous_nodes = None
+    for depth in range(1, max_depth + 1):
+        best_time = np.inf
+        for repetition in range(repetitions):
+            state = create_reversi_state(engine, board, label)
+            strategy = strategies[strategy_name](heuristics[heuristic_name], depth)
+            calls_before = type(strategy).calls_number
+            start = time.perf_counter()
+            successor = strategy.next_move(state)
+            best_time = min(best_time, time.perf_counter() - start)
+            nodes = count_nodes(strategy, calls_before)
+        results.append({
+            'position': position,
+            'engine': engine.__name__,
+            'strategy': strategy_name,
+            'heuristic': heuristic_name,
+            'depth': depth,
+            'move': successor.move_code,
+            'nodes': nodes,
+            'seconds': best_time,
+            'nodes_per_second': nodes / best_time if best_time else None,
+            # growth of the tree with one more ply
+            'branching_factor': nodes / previous_nodes if previous_nodes else None,
+        })
+        previous_nodes = nodes
+    return results
+
+
+def benchmark_endgame(engine: type, position: str, win_loss_draw: bool) -> Dict[str, Any]:
+    """Solve the position exactly, with a new solver."""
+    board, label = positions[position]
+    best_time = np.inf
+    for repetition in range(repetitions):
+        state = create_reversi_state(engine, board, label)
+        solver = EndgameSolver(max_empties=endgame_max_empties, win_loss_draw=win_loss_draw)
+        value = solver.solve(state)
+        best_time = min(best_time, solver.statistics.seconds)
+    return {
+        'position': position,
+        'engine': engine.__name__,
+        'mode': 'win_loss_draw' if win_loss_draw else 'exact',
+        'empties': solver.empties(state),
+        'value': value,
+        'nodes': solver.statistics.nodes,
+        'seconds': best_time,
+        'positions_per_second': 1 / best_time if best_time else None,
+        'nodes_per_second': solver.statistics.nodes / best_time if best_time else None,
+    }
+
+
+def search_key(result: Dict[str, Any]) -> tuple:
+    return (result['position'], result['engine'], result['strategy'], result['heuristic'], result['depth'])
+
+
+def endgame_key(result: Dict[str, Any]) -> tuple:
+    return (result['position'], result['engine'], result['mode'])
+
+
+def print_comparison(report: Dict[str, Any], path: str) -> None:
+    """Speed of this run relative to a previous one, and node counts that changed."""
+    with open(path) as previous_file:
+        previous = json.load(previous_file)
+    print()
+    print('Compared with %s (commit %s):' % (path, previous.get('commit')))
+    for section, key_function in (('searches', search_key), ('endgame', endgame_key)):
+        before = {key_function(result): result for result in previous.get(section, [])}
+        speedups = []
+        for result in report[section]:
+            old = before.get(key_function(result))
+            if old is None:
+                continue
+            speedups.append(old['seconds'] / result['seconds'])
+            if old['nodes'] != result['nodes']:
+                print('  %s: %d nodes, %d before' % (' / '.join(map(str, key_function(result))), result['nodes'], old['nodes']))
+        if speedups:
+            print('  %s: %.2fx faster (geometric mean of %d)' % (
+                section, float(np.exp(np.mean(np.log(speedups)))), len(speedups),
+            ))
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    np.random.seed(0)
+
+    report = {
+        'commit': git_commit(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'max_depth': max_depth,
+        'repetitions': repetitions,
+        'searches': [],
+        'endgame': [],
+    }
+
+    print('Searches (nodes, seconds, nodes/s and branching factor at each depth):')
+    for position in positions:
+        for engine in engines:
+            for strategy_name in strategies:
+                for heuristic_name in heuristics:
+                    results = benchmark_search(engine, position, strategy_name, heuristic_name)
+                    report['searches'].extend(results)
+                    print('%s\t%s\t%s\t%s' % (position, engine.__name__, strategy_name, heuristic_name))
+                    for result in results:
+                        print('\tdepth %d: %d nodes, %.3fs, %.0f nodes/s, branching %s' % (
+                            result['depth'],
+                            result['nodes'],
+                            result['seconds'],
+                            result['nodes_per_second'] or 0,
+                            '-' if result['branching_factor'] is None else '%.1f' % result['branching_factor'],
+                        ))
+
+    print()
+    print('Endgame solver (positions with at most %d empties):' % endgame_max_empties)
+    for position, (board, label) in positions.items():
+        for engine in engines:
+            if EndgameSolver(endgame_max_empties).applies(create_reversi_state(engine, board, label)):
+                for win_loss_draw in (False, True):
+                    result = benchmark_endgame(engine, position, win_loss_draw)
+                    report['endgame'].append(result)
+                    print('%s\t%s\t%s: value %d, %d nodes, %.3fs, %.1f positions/s, %.0f nodes/s' % (
+                        position,
+                        engine.__name__,
+                        result['mode'],
+                        result['value'],
+                        result['nodes'],
+                        result['seconds'],
+                        result['positions_per_second'] or 0,
+                        result['nodes_per_second'] or 0,
+                    ))
+
+    if results_path is None:
+        results_path = 'benchmark-%s.json' % (report['commit'] or time.strftime('%Y%m%d%H%M%S'))
+    with open(results_path, 'w') as results_file:
+        json.dump(report, results_file, indent=1)
+    print()
+    print('Results written to %s' % results_path)
+
+    if compare_with is not None:
+        print_comparison(report, compare_with)
@@ -0,0 +1,79 @@
+# Author: Pedro Urbina Rodriguez
+# Builds the opening book that tournament.py can use (see opening_book.py).
+
+
+from __future__ import annotations  # For Python 3.7
+
+# import from parent directory
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+
+
+import time
+
+from game_infrastructure.game import Player, TwoPlayerGameState
+from game_infrastructure.reversi import BitboardReversi, from_array_to_dictionary_board
+from heuristic import *
+from move_ordering import MoveOrdering
+from opening_book import OpeningBook, build_opening_book
+from strategy import NegamaxPVSStrategy, RandomStrategy
+from transposition import TranspositionTable
+
+
+
+###############################################################################################
+############################### BOOK CONFIGURATION ############################################
+###############################################################################################
+
+book_path = 'opening_book.bin'
+initial_board = None # as initial_board_global in tournament.py, None for the standard 8x8 board
+plies = 6 # every position of the first plies moves gets a book move (about 400 positions of the 8x8 board, 5 minutes at depth 5)
+depth = 5 # search depth used to choose the book moves, deeper than the players'
+verbose = 1
+
+# heuristic used to choose the book moves
+functions = [corners_based_function, parity_function, best_mobility_function]
+batch_functions = [corners_based_function_batch, parity_function_batch, best_mobility_function_batch]
+weights = [0.3, 0.3, 0.4]
+book_heuristic = Heuristic(
+    name='book',
+    evaluation_function=lambda state: combined_based_function(state, functions, weights),
+    batch_evaluation_function=lambda batch: combined_based_function_batch(batch, batch_functions, weights),
+)
+
+
+
+###############################################################################################
+################################### BOOK CONSTRUCTION #########################################
+###############################################################################################
+
+if initial_board is None:
+    height, width = 8, 8
+    board = None
+else:
+    height = len(initial_board)
+    width = len(initial_board[0])
+    board = from_array_to_dictionary_board(initial_board)
+
+# the players only give the labels of the colors
+player1 = Player(name='player1', strategy=RandomStrategy())
+player2 = Player(name='player2', strategy=RandomStrategy())
+game = BitboardReversi(player1=player1, player2=player2, height=height, width=width)
+initial_state = TwoPlayerGameState(game=game, board=board, initial_player=player1).setup_match()
+
+strategy = NegamaxPVSStrategy(
+    heuristic=book_heuristic,
+    max_depth_minimax=depth,
+    transposition_table=TranspositionTable(),
+    move_ordering=MoveOrdering(),
+)
+
+start = time.time()
+n_positions = build_opening_book(book_path, initial_state, plies, strategy, verbose)
+print('Book of %d positions written to %s in %.1fs' % (n_positions, book_path, time.time() - start))
+print('%d bytes' % os.path.getsize(book_path))
+
+book = OpeningBook(book_path)
+print('Book of %dx%d boards with up to %d discs' % (book.height, book.width, book.max_discs))
+book.close()
@@ -0,0 +1,273 @@
+"""
+Exact endgame solver for Reversi.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from game_infrastructure.game import Deadline, TwoPlayerGameState
+from game_infrastructure.reversi import BitBoard, BitboardLayout, Reversi, _popcount
+
+
+class EndgameStatistics(object):
+    """Counters of the positions solved."""
+
+    __slots__ = ('positions', 'nodes', 'seconds')
+
+    def __init__(self) -> None:
+        self.positions = 0
+        self.nodes = 0
+        self.seconds = 0.0
+
+    def positions_per_second(self) -> float:
+        return self.positions / self.seconds if self.seconds else 0.0
+
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            'Endgame positions solved: {:d} ({:.1f}/s), '
+            'nodes: {:d} ({:.0f}/s)'.format(
+                self.positions,
+                self.positions_per_second(),
+                self.nodes,
+                self.nodes_per_second(),
+            )
+        )
+
+
+class EndgameSolver(object):
+    """Exact alpha-beta solver for Reversi positions with few empty squares.
+
+    The search runs on a pair of bitboards (discs of the player to move,
+    discs of the opponent) and its value is the final disc difference for
+    the player to move, as in the scores of the game. With more than
+    fastest_first_empties empties, moves that leave the opponent fewer
+    replies are tried first; closer to the end, moves in regions of the
+    board (quadrants) with an odd number of empties are tried first
+    (parity), since they tend to give the last move in the region. The
+    value is narrowed with null-window searches (see _null_window_search)
+    sharing a table of bounds, which is kept between solves.
+
+    With win_loss_draw only the sign of the result is computed, with the
+    null window (-1, 1), which is much cheaper than the exact difference.
+    """
+
+    poll_interval = 1024 # nodes between checks of the deadline, if any
+    max_table_entries = 2 ** 18 # bounds of positions kept between solves
+    table_empties = 5 # positions with fewer empties are not kept
+
+    def __init__(
+        self,
+        max_empties: int = 12,
+        win_loss_draw: bool = False,
+        fastest_first_empties: int = 6,
+    ) -> None:
+        self.max_empties = max_empties
+        self.win_loss_draw = win_loss_draw
+        self.fastest_first_empties = fastest_first_empties
+        self.statistics = EndgameStatistics()
+        self._layouts: Dict[Tuple[int, int], BitboardLayout] = {}
+        self._regions: Dict[Tuple[int, int], List[int]] = {}
+        self._layout: Optional[BitboardLayout] = None
+        self._region_masks: List[int] = []
+        self._deadline: Optional[Deadline] = None
+        self._nodes_to_poll = 0
+        self._bounds: Dict[Tuple[int, int], Tuple[float, float, int]] = {}
+
+    def clear(self) -> None:
+        """Forget the bounds kept between solves (the counters are kept)."""
+        self._bounds.clear()
+
+    def empties(self, state: TwoPlayerGameState) -> Optional[int]:
+        """Number of empty squares of a Reversi state, None for other games."""
+        game = state.game
+        if not isinstance(game, Reversi):
+            return None
+        return game.height * game.width - len(state.board)
+
+    def applies(self, state: TwoPlayerGameState) -> bool:
+        """Whether the state is close enough to the end to be solved."""
+        empties = self.empties(state)
+        return empties is not None and empties <= self.max_empties
+
+    def solve(
+        self,
+        state: TwoPlayerGameState,
+        alpha: float = -math.inf,
+        beta: float = math.inf,
+        deadline: Optional[Deadline] = None,
+    ) -> int:
+        """Final disc difference for the player to move, with perfect play.
+
+        Fail-soft: a value <= alpha is an upper bound and a value >= beta
+        a lower bound. With win_loss_draw, only its sign (-1, 0 or 1).
+        """
+        own, opponent = self._bitboards(state)
+        if self.win_loss_draw:
+            alpha, beta = -1, 1
+        else:
+            # the values are whole numbers of discs
+            n_squares = self._layout.n_squares
+            alpha = math.floor(min(max(alpha, -n_squares - 1), n_squares))
+            beta = math.ceil(max(min(beta, n_squares + 1), -n_squares))
+        started = time.perf_counter()
+        self._deadline = deadline
+        self._nodes_to_poll = self.poll_interval
+        try:
+            value = self._null_window_search(own, opponent, alpha, beta)
+        finally:
+            self._deadline = None
+            self.statistics.seconds += time.perf_counter() - started
+        self.statistics.positions += 1
+        if self.win_loss_draw:
+            return (value > 0) - (value < 0)
+        return value
+
+    def evaluate(
+        self,
+        state: TwoPlayerGameState,
+        alpha: float = -math.inf,
+        beta: float = math.inf,
+        deadline: Optional[Deadline] = None,
+    ) -> float:
+        """As solve, but for MAX: the value and the window are those of
+        the search strategies."""
+        if state.is_player_max(state.next_player):
+            return float(self.solve(state, alpha, beta, deadline))
+        return float(-self.solve(state, -beta, -alpha, deadline))
+
+    def _bitboards(self, state: TwoPlayerGameState) -> Tuple[int, int]:
+        """Discs of the player to move and of the opponent."""
+        game = state.game
+        size = (game.height, game.width)
+        if size not in self._layouts:
+            self._layouts[size] = BitboardLayout(
+                game.height, game.width, game.player1.label, game.player2.label,
+            )
+            self._regions[size] = _quadrants(self._layouts[size])
+        if self._layout is not self._layouts[size]:
+            self._bounds.clear()
+        self._layout = self._layouts[size]
+        self._region_masks = self._regions[size]
+
+        board = state.board
+        if not isinstance(board, BitBoard):
+            board = self._layout.from_mapping(board)
+        if state.next_player.label == game.player1.label:
+            return board.black, board.white
+        return board.white, board.black
+
+    def _ordered_moves(self, own: int, opponent: int, moves: int, empty: int) -> List[int]:
+        layout = self._layout
+        odd_regions = 0
+        for region in self._region_masks:
+            if _popcount(empty & region) & 1:
+                odd_regions |= region
+        moves_list = list(layout.iter_bits(moves))
+        if _popcount(empty) > self.fastest_first_empties:
+            def replies(move: int) -> Tuple[int, bool]:
+                flipped = layout.flips(own, opponent, move)
+                mobility = _popcount(layout.valid_moves(opponent & ~flipped, own | move | flipped))
+                return mobility, not move & odd_regions
+            return sorted(moves_list, key=replies)
+        return sorted(moves_list, key=lambda move: not move & odd_regions)
+
+    def _null_window_search(self, own: int, opponent: int, alpha: float, beta: float) -> int:
+        """Value within (alpha, beta) found with null-window searches
+        (MTD(f)), starting by whether the position is won or lost. They
+        are much cheaper than a wide window, and the bounds they leave
+        make each one cheaper than the one before."""
+        lower, upper = alpha, beta
+        value = 0
+        while lower < upper:
+            bound = max(value, lower + 1)
+            value = self._negamax(own, opponent, bound - 1, bound)
+            if value < bound:
+                upper = value
+            else:
+                lower = value
+        return value
+
+    def _negamax(self, own: int, opponent: int, alpha: float, beta: float) -> int:
+        self.statistics.nodes += 1
+        if self._deadline is not None:
+            self._nodes_to_poll -= 1
+            if self._nodes_to_poll <= 0:
+                self._nodes_to_poll = self.poll_interval
+                self._deadline.check()
+
+        layout = self._layout
+        moves = layout.valid_moves(own, opponent)
+        if not moves:
+            if not layout.valid_moves(opponent, own):
+                # end of the game
+                return _popcount(own) - _popcount(opponent)
+            return -self._negamax(opponent, own, -beta, -alpha)
+
+        empty = layout.full & ~(own | opponent)
+        # Bounds of the values of the positions far from the end, which
+        # are reached again through different move orders and by each
+        # null-window search, and the best move found for them.
+        key = None
+        best_move = 0
+        if _popcount(empty) > self.table_empties:
+            key = (own, opponent)
+            lower, upper, best_move = self._bounds.get(key, (-math.inf, math.inf, 0))
+            if lower >= beta:
+                return lower
+            if upper <= alpha:
+                return upper
+            alpha, beta = max(alpha, lower), min(beta, upper)
+
+        if moves & (moves - 1) == 0:
+            ordered = [moves]
+        else:
+            ordered = self._ordered_moves(own, opponent, moves, empty)
+            if best_move:
+                ordered.remove(best_move)
+                ordered.insert(0, best_move)
+
+        window = (alpha, beta)
+        best = -math.inf
+        for move in ordered:
+            flipped = layout.flips(own, opponent, move)
+            value = -self._negamax(opponent & ~flipped, own | move | flipped, -beta, -alpha)
+            if value > best:
+                best = value
+                best_move = move
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if key is not None:
+            if len(self._bounds) >= self.max_table_entries:
+                self._bounds.clear()
+            if best <= window[0]:
+                self._bounds[key] = (lower, best, best_move)
+            elif best >= window[1]:
+                self._bounds[key] = (best, upper, best_move)
+            else:
+                self._bounds[key] = (best, best, best_move)
+        return best
+
+
+def _quadrants(layout: BitboardLayout) -> List[int]:
+    """Bits of each quadrant of the board."""
+    regions = []
+    for columns in (range(1, layout.width // 2 + 1), range(layout.width // 2 + 1, layout.width + 1)):
+        for rows in (range(1, layout.height // 2 + 1), range(layout.height // 2 + 1, layout.height + 1)):
+            region = 0
+            for x in columns:
+                for y in rows:
+                    region |= layout.bits[(x, y)]
+            if region:
+                regions.append(region)
+    return regions
+
@@ -11,6 +11,7 @@ from __future__ import annotations  # For Python 3.7
 import copy
 import time
 from abc import ABC, abstractmethod
+from types import MappingProxyType
 from tkinter import Frame, Tk, messagebox
 from typing import Any, Callable, List, Optional, Sequence, Tuple
 
@@ -23,9 +24,209 @@ from strategy import (
 )
 """
 
-import _thread
+import multiprocessing
 import threading
-from contextlib import contextmanager
+from collections import OrderedDict
+
+
+def multiprocessing_context() -> Any:
+    """Multiprocessing context, forking the workers where possible so that
+    they inherit the classes defined in the main script (e.g. heuristics)."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a computation goes past its deadline."""
+
+
+class Deadline(object):
+    """Point in time by which a computation (e.g. a search) has to stop.
+
+    Searches poll it cooperatively, so they can stop cleanly and keep the
+    result of the work done so far. It can also be cancelled (from any
+    thread) to stop them before its time. A deadline with a parent also
+    expires when the parent does.
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        parent: Optional[Deadline] = None,
+    ) -> None:
+        self.seconds = seconds
+        self.parent = parent
+        self.cancelled = False
+        self.start = time.perf_counter()
+        self.end = None if seconds is None else self.start + seconds
+
+    def elapsed(self) -> float:
+        """Seconds since the deadline was created."""
+        return time.perf_counter() - self.start
+
+    def remaining(self) -> float:
+        """Seconds left (infinite if there is no limit)."""
+        if self.cancelled:
+            return 0.0
+        remaining = np.inf if self.end is None else self.end - time.perf_counter()
+        if self.parent is not None:
+            remaining = min(remaining, self.parent.remaining())
+        return remaining
+
+    def cancel(self) -> None:
+        """Make the deadline expire now."""
+        self.cancelled = True
+
+    def expired(self) -> bool:
+        return (
+            self.cancelled
+            or (self.end is not None and time.perf_counter() >= self.end)
+            or (self.parent is not None and self.parent.expired())
+        )
+
+    def check(self) -> None:
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.expired():
+            raise DeadlineExceeded()
+
+
+class BoundedCache(ABC):
+    """Mapping of bounded size that evicts entries when it is full.
+
+    Counts the hits, misses and evictions. Pickling it (e.g. to send a
+    game to another process) keeps the size and the counters, not the
+    entries. Values can not be None.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        for name in self._entry_attributes:
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.clear()
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def get(self, key: Any) -> Any:
+        """Value stored for the key (None if there is none)."""
+
+    @abstractmethod
+    def put(self, key: Any, value: Any) -> None:
+        """Store a value, evicting an entry if the cache is full."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all the entries (the counters are kept)."""
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups that found an entry."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return 'Hits: {:d}, misses: {:d} ({:.1%} hit rate), evictions: {:d}'.format(
+            self.hits, self.misses, self.hit_rate(), self.evictions,
+        )
+
+
+class LRUCache(BoundedCache):
+    """Cache that evicts the least recently used entry."""
+
+    _entry_attributes = ('_entries',)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Any:
+        """Value stored for the key (None if there is none)."""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        """Store a value, evicting the oldest entry if the cache is full."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all the entries (the counters are kept)."""
+        self._entries: OrderedDict = OrderedDict()
+
+
+class ClockCache(BoundedCache):
+    """Cache with CLOCK (second chance) eviction.
+
+    An approximation of LRU that does not move entries on hits: each
+    slot has a reference bit, set on every hit, and the hand of the
+    clock evicts the first slot without it, clearing the bits it passes.
+    """
+
+    _entry_attributes = ('_slots', '_keys', '_values', '_referenced', '_hand')
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, key: Any) -> Any:
+        """Value stored for the key (None if there is none)."""
+        slot = self._slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._referenced[slot] = True
+        return self._values[slot]
+
+    def put(self, key: Any, value: Any) -> None:
+        """Store a value, evicting the first unreferenced entry if the cache is full."""
+        slot = self._slots.get(key)
+        if slot is None:
+            if len(self._keys) < self.max_entries:
+                slot = len(self._keys)
+                self._keys.append(key)
+                self._values.append(value)
+                self._referenced.append(False)
+                self._slots[key] = slot
+                return
+            while self._referenced[self._hand]:
+                self._referenced[self._hand] = False
+                self._hand = (self._hand + 1) % self.max_entries
+            slot = self._hand
+            self._hand = (self._hand + 1) % self.max_entries
+            del self._slots[self._keys[slot]]
+            self.evictions += 1
+            self._keys[slot] = key
+            self._slots[key] = slot
+        self._values[slot] = value
+        self._referenced[slot] = False
+
+    def clear(self) -> None:
+        """Remove all the entries (the counters are kept)."""
+        self._slots: dict = {}
+        self._keys: list = []
+        self._values: list = []
+        self._referenced: List[bool] = []
+        self._hand = 0
 
 
 class Player(object):
@@ -46,15 +247,37 @@ class Player(object):
         self,
         state: TwoPlayerGameState,
         gui: bool = False,
+        deadline: Optional[Deadline] = None,
     ) -> TwoPlayerGameState:
         """Player's move."""
         if self.delay > 0:
             time.sleep(self.delay)
-        return self.strategy.next_move(state, gui)
+        return self.strategy.next_move(state, gui, deadline)
 
 
 class TwoPlayerGameState(object):
-    """State of a two-player game."""
+    """State of a two-player game.
+
+    States are created for every node of a search, so they are kept
+    compact: attributes live in __slots__, the GUI handles are reached
+    through the single gui_thread reference and end_of_game / scores are
+    only computed (with game.score) the first time they are read.
+    Assigning None to them marks them as unknown again. The same holds
+    for hash_key, computed with game.hash_state.
+    """
+
+    __slots__ = (
+        'game',
+        'player_max',
+        'next_player',
+        'board',
+        'move_code',
+        'parent',
+        'gui_thread',
+        '_end_of_game',
+        '_scores',
+        '_hash',
+    )
 
     def __init__(
         self,
@@ -68,17 +291,69 @@ class TwoPlayerGameState(object):
         self.game = game
         self.player_max = player_max
         self.next_player = initial_player
-        self.end_of_game: Optional[bool] = None
-        self.scores: Optional[np.ndarray] = None
+        self._end_of_game: Optional[bool] = None
+        self._scores: Optional[np.ndarray] = None
+        self._hash: Optional[int] = None
         self.board = board
         self.move_code = move_code
         self.parent = parent
-        # variables for GUI:
-        self.gui_root = None
-        self.gui_frame = None
-        self.gui_buttons = None
+        # variable for GUI (the thread owns root, frame and buttons):
         self.gui_thread = None
 
+    def _compute_score(self) -> None:
+        if (
+            self.game is not None
+            and self.next_player is not None
+            and self.board is not None
+        ):
+            self._end_of_game, self._scores = self.game.score(self)
+
+    @property
+    def end_of_game(self) -> Optional[bool]:
+        """Whether the game is over in this state."""
+        if self._end_of_game is None:
+            self._compute_score()
+        return self._end_of_game
+
+    @end_of_game.setter
+    def end_of_game(self, end_of_game: Optional[bool]) -> None:
+        self._end_of_game = end_of_game
+
+    @property
+    def scores(self) -> Optional[np.ndarray]:
+        """Scores of the players in this state."""
+        if self._scores is None:
+            self._compute_score()
+        return self._scores
+
+    @scores.setter
+    def scores(self, scores: Optional[np.ndarray]) -> None:
+        self._scores = scores
+
+    @property
+    def hash_key(self) -> int:
+        """Hash of the position (board and player to move)."""
+        if self._hash is None:
+            assert isinstance(self.game, TwoPlayerGame)
+            self._hash = self.game.hash_state(self)
+        return self._hash
+
+    @hash_key.setter
+    def hash_key(self, hash_key: Optional[int]) -> None:
+        self._hash = hash_key
+
+    @property
+    def gui_root(self) -> Optional[Tk]:
+        return self.gui_thread.gui_root if self.gui_thread else None
+
+    @property
+    def gui_frame(self) -> Optional[Frame]:
+        return self.gui_thread.gui_frame if self.gui_thread else None
+
+    @property
+    def gui_buttons(self) -> Optional[dict]:
+        return self.gui_thread.gui_buttons if self.gui_thread else None
+
     @property
     def previous_player(self) -> Player:
         if self.parent:
@@ -129,9 +404,6 @@ class TwoPlayerGameState(object):
                     self.gui_buttons = self.game.initialize_buttons(self.board, self.gui_frame)
                     self.gui_root.mainloop()
             self.gui_thread = GuiThread(self.game, self.board)
-            self.gui_frame = self.gui_thread.gui_frame
-            self.gui_root = self.gui_thread.gui_root
-            self.gui_buttons = self.gui_thread.gui_buttons
         return self
 
     def is_player_max(self, player: Player) -> bool:
@@ -148,16 +420,29 @@ class TwoPlayerGameState(object):
         c.move_code = copy.deepcopy(self.move_code)
         c.parent = self.parent
 
-        c.end_of_game = self.end_of_game
-        c.scores = self.scores
+        c.end_of_game = self._end_of_game
+        c.scores = self._scores
+        c.hash_key = self._hash
 
-        c.gui_root = self.gui_root
-        c.gui_frame = self.gui_frame
-        c.gui_buttons = self.gui_buttons
         c.gui_thread = self.gui_thread
 
         return c
 
+    def detach(self) -> TwoPlayerGameState:
+        """Copy of the state without parent nor GUI (e.g. to send it to
+        another process). The board is shared, not copied."""
+        c = TwoPlayerGameState(
+            game=self.game,
+            initial_player=self.next_player,
+            player_max=self.player_max,
+            board=self.board,
+            move_code=self.move_code,
+        )
+        c.end_of_game = self._end_of_game
+        c.scores = self._scores
+        c.hash_key = self._hash
+        return c
+
     def generate_successor(
         self,
         board_successor: Any = None,
@@ -180,24 +465,16 @@ class TwoPlayerGameState(object):
         successor.move_code = move_code
         successor.parent = self
 
-        end_of_game, scores = self.game.score(successor)
-        successor.end_of_game = end_of_game
-        successor.scores = scores
-
-        successor.gui_root = self.gui_root
-        successor.gui_frame = self.gui_frame
-        successor.gui_buttons = self.gui_buttons
+        # end_of_game and scores are computed when first read
         successor.gui_thread = self.gui_thread
 
         return successor
 
-    def move(self, gui: bool = False) -> TwoPlayerGameState:
-        """Make move."""
+    def move(self, gui: bool = False, deadline: Optional[Deadline] = None) -> TwoPlayerGameState:
+        """Make move (raises DeadlineExceeded if the player runs out of time)."""
         assert isinstance(self.next_player, Player)
-        next_state = self.next_player.move(self, gui)
+        next_state = self.next_player.move(self, gui, deadline)
         if gui:
-            self.gui_root = self.gui_thread.gui_root
-            self.gui_buttons = self.gui_thread.gui_buttons
             self.game.gui_update(state=next_state, gui_buttons=self.gui_buttons, gui_root=self.gui_root, moves=[], click_function=None)
         assert isinstance(self.game, TwoPlayerGame)
         assert isinstance(self.player_max, Player)
@@ -210,6 +487,61 @@ class TwoPlayerGameState(object):
         self.game.display(self, gui)
 
 
+def freeze_board(board: Any) -> Any:
+    """Read-only view of a board that shares its data (no copy)."""
+    if isinstance(board, dict):
+        return MappingProxyType(board)
+    if isinstance(board, np.ndarray):
+        view = board.view()
+        view.flags.writeable = False
+        return view
+    # other boards (e.g. bitboards) are already immutable
+    return board
+
+
+class FrozenGameState(object):
+    """Read-only view of a game state, used to evaluate it without copying.
+
+    Attributes are read from the wrapped state, the board and the scores
+    are read-only views and assigning any attribute raises an error.
+    Evaluation functions that need a modifiable state can call clone()
+    or copy.deepcopy() on the view, which copy the wrapped state.
+    """
+
+    __slots__ = ('_state', '_board')
+
+    def __init__(self, state: TwoPlayerGameState) -> None:
+        object.__setattr__(self, '_state', state)
+        object.__setattr__(self, '_board', freeze_board(state.board))
+
+    @property
+    def board(self) -> Any:
+        return self._board
+
+    @property
+    def scores(self) -> Optional[np.ndarray]:
+        scores = self._state.scores
+        if isinstance(scores, np.ndarray):
+            scores = scores.view()
+            scores.flags.writeable = False
+        return scores
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._state, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Game state is read-only, clone it to modify it')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError('Game state is read-only, clone it to modify it')
+
+    def __deepcopy__(self, memo: dict) -> TwoPlayerGameState:
+        return copy.deepcopy(self._state, memo)
+
+    def clone(self) -> TwoPlayerGameState:
+        return self._state.clone()
+
+
 class TwoPlayerGame(ABC):
     """Abstract class for a two player game."""
 
@@ -339,6 +671,50 @@ class TwoPlayerGame(ABC):
         pass
     #   NOTE return end_of_game and scores
 
+    def hash_state(self, state: TwoPlayerGameState) -> int:
+        """Hash of the board and the player to move."""
+        board = state.board
+        if isinstance(board, np.ndarray):
+            board = board.tobytes()
+        elif isinstance(board, dict):
+            board = frozenset(board.items())
+        return hash((board, state.next_player.label))
+
+    # Incremental interface used by the search strategies to walk the
+    # game tree on a single mutable state instead of building successors.
+
+    # The defaults build the successors; games override them to apply
+    # the moves without doing so.
+
+    def legal_moves(self, state: TwoPlayerGameState) -> list:
+        """Moves of the next player, in the order of generate_successors
+        (by default the move codes of the successors)."""
+        return [successor.move_code for successor in self.generate_successors(state)]
+
+    def make_move(self, state: TwoPlayerGameState, move: Any) -> Any:
+        """Apply a move to the state in place and return its undo record.
+
+        By default the state takes the board of the successor of the
+        move, so no board is changed in place.
+        """
+        for successor in self.generate_successors(state):
+            if successor.move_code == move:
+                break
+        else:
+            raise ValueError('{} is not a legal move'.format(move))
+        undo = (state.board, state.next_player, state.move_code, state._end_of_game, state._scores, state._hash)
+        state.board = successor.board
+        state.next_player = successor.next_player
+        state.move_code = successor.move_code
+        state.end_of_game = successor._end_of_game
+        state.scores = successor._scores
+        state.hash_key = successor._hash
+        return undo
+
+    def unmake_move(self, state: TwoPlayerGameState, undo: Any) -> None:
+        """Revert a move applied by make_move, given its undo record."""
+        state.board, state.next_player, state.move_code, state.end_of_game, state.scores, state.hash_key = undo
+
 
 class TwoPlayerMatch(object):
     """Infrastructure for a match between two players."""
@@ -365,18 +741,11 @@ class TwoPlayerMatch(object):
 
         self.max_sec_per_move = max_sec_per_move
         self.gui = gui
-
-    @contextmanager
-    def time_limit(self, seconds: float):
-        timer = threading.Timer(seconds, lambda: _thread.interrupt_main())
-        timer.start()
-        try:
-            yield
-        except KeyboardInterrupt:
-            pass
-        finally:
-            # if the action ends in specified time, timer is canceled
-            timer.cancel()
+        # of the last match played, for player1 and player2 (None for
+        # players whose strategy does not count its nodes)
+        self.n_plies = 0
+        self.seconds = [0.0, 0.0]
+        self.nodes: List[Optional[int]] = [0, 0]
 
     def play_match(self) -> Optional[np.ndarray]:
         """Play a match."""
@@ -384,12 +753,28 @@ class TwoPlayerMatch(object):
             raise ValueError('Please, provide an initial state')
 
         state = self.initial_state.setup_match(self.gui)
+        # the strategies may keep data from one move to the next, until
+        # the match is over
+        strategies = [state.player1.strategy, state.player2.strategy]
+        for strategy in strategies:
+            strategy.start_match(state)
+        try:
+            return self._play_moves(state)
+        finally:
+            for strategy in strategies:
+                strategy.end_match()
+
+    def _play_moves(self, state: TwoPlayerGameState) -> Optional[np.ndarray]:
+        """Play the moves of the match from the state and return the scores."""
         if (self._verbose > 0):
             print('\nLet\'s play %s!\n' % (self.initial_state.game.name))
             if self._verbose != 3:
                 input('Press any key to start playing. ')
 
         n_plies = 0
+        self.n_plies = 0
+        self.seconds = [0.0, 0.0]
+        self.nodes = [0, 0]
         while (n_plies < self.n_plies_max) and not state.end_of_game:
 
             strategy = state.next_player.strategy
@@ -427,11 +812,16 @@ class TwoPlayerMatch(object):
 
                 print()
 
-            # limit maximum seconds for this move
-            finished = False
-            with self.time_limit(self.max_sec_per_move):
-                state = state.move(self.gui)
-                finished = True
+            # limit maximum seconds for this move: the strategies poll the
+            # deadline while they search and stop once it has passed, so
+            # matches can run in any thread
+            deadline = Deadline(self.max_sec_per_move)
+            try:
+                next_state = state.move(self.gui, deadline)
+                finished = not deadline.expired()
+            except DeadlineExceeded:
+                finished = False
+            self._count_move(state, deadline.elapsed())
 
             if not finished:
                 print("Match cancelled because player %s used too much time" % (state.next_player.label))
@@ -442,7 +832,9 @@ class TwoPlayerMatch(object):
                     scores[1] = -1
                 return scores
 
+            state = next_state
             n_plies += 1
+            self.n_plies = n_plies
 
         if self._verbose > 0:
             state.display(self.gui)
@@ -470,3 +862,14 @@ class TwoPlayerMatch(object):
             )
 
         return state.scores
+
+    def _count_move(self, state: TwoPlayerGameState, seconds: float) -> None:
+        """Add the time and the nodes of the move just made from the state
+        to those of its player."""
+        index = 0 if state.next_player == state.player1 else 1
+        self.seconds[index] += seconds
+        nodes = state.next_player.strategy.search_nodes()
+        if nodes is None or self.nodes[index] is None:
+            self.nodes[index] = None
+        else:
+            self.nodes[index] += nodes
@@ -8,18 +8,36 @@
 
 from __future__ import annotations  # For Python 3.7
 
-import copy
+import random
+from collections.abc import Mapping
 from tkinter import *
 from tkinter import messagebox
-from typing import Any, Callable, List, Optional, Tuple
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
 
 import numpy as np
 
-from game_infrastructure.game import Player, TwoPlayerGame, TwoPlayerGameState
+from game_infrastructure.game import LRUCache, Player, TwoPlayerGame, TwoPlayerGameState
+
+
+class BoardInfo(NamedTuple):
+    """What the game needs to know about a board, whoever is to move.
+
+    Both tuples are indexed as the players: player1 first.
+    """
+
+    moves: Tuple[tuple, tuple]  # valid moves of each player
+    coins: Tuple[int, int]
+    end_of_game: bool
 
 
 class Reversi(TwoPlayerGame):
-    """Specific definitions for Reversi."""
+    """Specific definitions for Reversi.
+
+    The valid moves of both players, the coins and whether the game has
+    ended are computed once per board and kept in board_cache (an LRU
+    cache with up to board_cache_size boards, None to disable it), which
+    score, the successors and the heuristics share.
+    """
 
     def __init__(
         self,
@@ -27,6 +45,7 @@ class Reversi(TwoPlayerGame):
         player2: Player,
         height: int,
         width: int,
+        board_cache_size: Optional[int] = 2 ** 14,
     ) -> None:
         super().__init__(
             "Reversi",
@@ -39,6 +58,17 @@ class Reversi(TwoPlayerGame):
         self.width = width
         self.max_score = height*width
         self.min_score = - self.max_score
+        # Zobrist keys, seeded with the board size so that every game
+        # of the same size (in any process) hashes positions alike.
+        zobrist_random = random.Random('reversi-%dx%d' % (height, width))
+        self._zobrist = {
+            ((x, y), label): zobrist_random.getrandbits(64)
+            for x in range(1, width + 1) for y in range(1, height + 1)
+            for label in (self.player1.label, self.player2.label)
+        }
+        self._zobrist_white_to_move = zobrist_random.getrandbits(64)
+        self.board_cache = LRUCache(board_cache_size) if board_cache_size else None
+        self._symmetries: Optional[BoardSymmetries] = None
 
     # Private functions
     def _capture_enemy_in_dir(self, board: dict, move, player_label: Any, delta_x_y) -> list:
@@ -68,15 +98,76 @@ class Reversi(TwoPlayerGame):
                + self._capture_enemy_in_dir(board, move, player_label, (1, -1)) \
                + self._capture_enemy_in_dir(board, move, player_label, (1, 1))
 
+    def _board_key(self, board: dict) -> int:
+        """Zobrist hash of the discs of the board."""
+        board_key = 0
+        for square, label in board.items():
+            board_key ^= self._zobrist[square, label]
+        return board_key
+
+    def _board_info(self, board: dict) -> BoardInfo:
+        """Moves, coins and end of game of the board, from the cache if possible."""
+        if self.board_cache is None:
+            return self._compute_board_info(board)
+        board_key = self._board_key(board)
+        info = self.board_cache.get(board_key)
+        if info is None:
+            info = self._compute_board_info(board)
+            self.board_cache.put(board_key, info)
+        return info
+
+    def _compute_board_info(self, board: dict) -> BoardInfo:
+        moves = (
+            tuple(self._scan_valid_moves(board, self.player1.label)),
+            tuple(self._scan_valid_moves(board, self.player2.label)),
+        )
+        coins = (
+            sum(x == self.player1.label for x in board.values()),
+            sum(x == self.player2.label for x in board.values()),
+        )
+        return BoardInfo(moves, coins, not (moves[0] or moves[1]))
+
+    def _scan_valid_moves(self, board: dict, player_label: Any) -> list:
+        """Valid moves of the player, trying every empty square."""
+        moves = []
+        for x in range(1, self.width + 1):
+            for y in range(1, self.height + 1):
+                if (x, y) not in board and self._enemy_captured_by_move(board, (x, y), player_label):
+                    moves.append((x, y))
+        return moves
+
+    def _player_index(self, player_label: Any) -> int:
+        return 0 if player_label == self.player1.label else 1
+
+    def _position_bits(self, board: dict, player_label: Any) -> Tuple[int, int]:
+        """Bitboards (as in BitboardLayout) of the discs of the player and
+        of the opponent."""
+        bits = self.symmetries.layout.bits
+        own = opponent = 0
+        for square, label in board.items():
+            if label == player_label:
+                own |= bits[square]
+            else:
+                opponent |= bits[square]
+        return own, opponent
+
     def _get_valid_moves(self, board: dict, player_label: Any) -> list:
         """Returns a list of valid moves for the player judging from the board."""
-        return [(x, y) for x in range(1, self.width + 1)
-                for y in range(1, self.height + 1)
-                if (x, y) not in board.keys() and
-                self._enemy_captured_by_move(board, (x, y), player_label)]
+        return list(self._board_info(board).moves[self._player_index(player_label)])
+
+    def _has_valid_moves(self, board: dict, player_label: Any) -> bool:
+        """Whether the player has at least one valid move."""
+        return bool(self._board_info(board).moves[self._player_index(player_label)])
+
+    def _get_valid_captures(self, board: dict, player_label: Any) -> list:
+        """Returns (move, captured enemies) for each valid move of the player."""
+        return [
+            (move, self._enemy_captured_by_move(board, move, player_label))
+            for move in self._board_info(board).moves[self._player_index(player_label)]
+        ]
 
     def _player_coins(self, board: dict, player_label: Any) -> float:
-        return sum(x == player_label for x in board.values())
+        return self._board_info(board).coins[self._player_index(player_label)]
 
     def _coin_diff(self, board: dict) -> float:
         """Difference in the number of coins."""
@@ -175,15 +266,16 @@ class Reversi(TwoPlayerGame):
         """Generate the list of successors of a game state."""
         successors = []
         board = state.board
-        moves = self._get_valid_moves(board, state.next_player.label)
+        captures = self._get_valid_captures(board, state.next_player.label)
 
-        for move in moves:
-            board_successor = copy.deepcopy(state.board)
+        for move, captured in captures:
+            # board values are labels, so a shallow copy is enough
+            board_successor = board.copy()
             assert isinstance(state.next_player, Player)
             # show the move on the board
             board_successor[move] = state.next_player.label
             # flip enemy
-            for enemy in self._enemy_captured_by_move(board, move, state.next_player.label):
+            for enemy in captured:
                 board_successor[enemy] = state.next_player.label
             move_code = self._matrix_to_display_coordinates(move)
             successor = state.generate_successor(
@@ -194,7 +286,7 @@ class Reversi(TwoPlayerGame):
             successors.append(successor)
 
         if not successors:
-            board_successor = copy.deepcopy(state.board)
+            board_successor = board.copy()
             move_code = None
             no_movement = state.generate_successor(
                 board_successor,
@@ -209,20 +301,99 @@ class Reversi(TwoPlayerGame):
         state: TwoPlayerGameState,
     ) -> Tuple[bool, Optional[np.ndarray]]:
         """Determine whether a game state is terminal."""
-        board = state.board
-        moves = self._get_valid_moves(board, state.next_player.label)
-
-        end_of_game = (len(
-            self._get_valid_moves(board, self.player1.label) +
-            self._get_valid_moves(board, self.player2.label)
-            ) == 0)
+        info = self._board_info(state.board)
 
         scores = np.zeros(self.n_players, dtype=float)
-        players = (self.player1, self.player2)
-        for i in range(len(players)):
-            scores[i] = self._player_coins(board, players[i].label)
+        scores[0], scores[1] = info.coins
+
+        return info.end_of_game, scores
 
-        return end_of_game, scores
+    def hash_state(self, state: TwoPlayerGameState) -> int:
+        """Zobrist hash of the board and the player to move."""
+        hash_key = 0
+        if state.next_player.label == self.player2.label:
+            hash_key = self._zobrist_white_to_move
+        for square, label in state.board.items():
+            hash_key ^= self._zobrist[square, label]
+        return hash_key
+
+    @property
+    def symmetries(self) -> BoardSymmetries:
+        """Symmetries of the board (built on first use)."""
+        if self._symmetries is None:
+            self._symmetries = BoardSymmetries(self.height, self.width)
+        return self._symmetries
+
+    def canonical_form(self, state: TwoPlayerGameState) -> Tuple[int, int, int]:
+        """Canonical form of the position of the state and the symmetry that
+        gives it, as in BoardSymmetries.canonical.
+
+        The position is given by the bitboards of the discs of the player
+        to move and of the opponent, so it does not depend on the colors
+        either. Map moves back with self.symmetries.inverse_square.
+        """
+        own, opponent = self._position_bits(state.board, state.next_player.label)
+        return self.symmetries.canonical(own, opponent)
+
+    def _updated_hash(self, hash_key: Optional[int], move: Any, captured: list, player_label: Any) -> Optional[int]:
+        """Zobrist hash after a move, from the hash before it (if known)."""
+        if hash_key is None:
+            return None
+        hash_key ^= self._zobrist_white_to_move
+        if move is not None:
+            enemy_label = self.player2.label if player_label == self.player1.label else self.player1.label
+            hash_key ^= self._zobrist[move, player_label]
+            for enemy in captured:
+                hash_key ^= self._zobrist[enemy, player_label] ^ self._zobrist[enemy, enemy_label]
+        return hash_key
+
+    def legal_moves(self, state: TwoPlayerGameState) -> list:
+        """Moves of the next player; [None] when the player has to pass."""
+        return self._get_valid_moves(state.board, state.next_player.label) or [None]
+
+    def move_effects(self, state: TwoPlayerGameState) -> List[Tuple[Any, int]]:
+        """(move, number of discs it flips) for each valid move of the next
+        player, in the order of the successors; empty if it has to pass.
+        No state is built."""
+        player_label = state.next_player.label
+        return [
+            (move, len(self._enemy_captured_by_move(state.board, move, player_label)))
+            for move in self._board_info(state.board).moves[self._player_index(player_label)]
+        ]
+
+    def make_move(self, state: TwoPlayerGameState, move: Any) -> tuple:
+        """Place the disc and flip the captured enemies in place."""
+        board = state.board
+        player_label = state.next_player.label
+        captured = []
+        if move is not None:
+            captured = self._enemy_captured_by_move(board, move, player_label)
+            board[move] = player_label
+            for enemy in captured:
+                board[enemy] = player_label
+        undo = (move, captured, state.next_player, state.move_code, state._end_of_game, state._scores, state._hash)
+
+        state.next_player = self.opponent(state.next_player)
+        state.move_code = None if move is None else self._matrix_to_display_coordinates(move)
+        state.hash_key = self._updated_hash(state._hash, move, captured, player_label)
+        # computed again only if they are read
+        state.end_of_game = state.scores = None
+        return undo
+
+    def unmake_move(self, state: TwoPlayerGameState, undo: tuple) -> None:
+        """Remove the disc and flip the captured enemies back."""
+        move, captured, next_player, move_code, end_of_game, scores, hash_key = undo
+        if move is not None:
+            board = state.board
+            enemy_label = self.opponent(next_player).label
+            del board[move]
+            for enemy in captured:
+                board[enemy] = enemy_label
+        state.next_player = next_player
+        state.move_code = move_code
+        state.end_of_game = end_of_game
+        state.scores = scores
+        state.hash_key = hash_key
 
     def initialize_buttons(self, board: Any, gui_frame: Frame) -> dict:
         assert (board is not None)
@@ -272,6 +443,596 @@ class Reversi(TwoPlayerGame):
         gui_root.update()  # Refresh UI
 
 
+def _popcount(bits: int) -> int:
+    """Number of set bits of a non-negative integer."""
+    return bin(bits).count('1')
+
+
+class BitboardLayout(object):
+    """Geometry of a bitboard: square indices, shifts and edge masks.
+
+    The square (x, y) is stored in bit (x - 1) * height + (y - 1), so that
+    increasing bit order is the same raster order used by
+    Reversi._get_valid_moves (x first, then y). Boards larger than 8x8
+    simply use a wider Python integer.
+    """
+
+    def __init__(
+        self,
+        height: int,
+        width: int,
+        black_label: Any,
+        white_label: Any,
+    ) -> None:
+        self.height = height
+        self.width = width
+        self.black_label = black_label
+        self.white_label = white_label
+        self.n_squares = height * width
+        self.full = (1 << self.n_squares) - 1
+        self.squares = [(x, y) for x in range(1, width + 1)
+                        for y in range(1, height + 1)]
+        self.bits = {square: 1 << index for index, square in enumerate(self.squares)}
+
+        # Bits in the first / last row of every column, which must be
+        # masked out after a vertical shift to avoid wrapping columns.
+        first_row = sum(1 << (column * height) for column in range(width))
+        last_row = first_row << (height - 1)
+        row_masks = {0: self.full, 1: self.full & ~first_row, -1: self.full & ~last_row}
+
+        # (shift, mask) for each of the 8 directions (dx, dy).
+        self.directions = [
+            (delta_x * height + delta_y, row_masks[delta_y])
+            for delta_x in (-1, 0, 1) for delta_y in (-1, 0, 1)
+            if (delta_x, delta_y) != (0, 0)
+        ]
+
+    def square(self, bit: int) -> Tuple[int, int]:
+        """Square (x, y) of a single-bit integer."""
+        return self.squares[bit.bit_length() - 1]
+
+    def iter_bits(self, bits: int) -> Iterator[int]:
+        """Single-bit integers set in bits, in increasing order."""
+        while bits:
+            low = bits & -bits
+            yield low
+            bits ^= low
+
+    def from_mapping(self, board: Any) -> BitBoard:
+        """Build a bitboard from a dict board."""
+        black = white = 0
+        for square, label in board.items():
+            bit = self.bits[square]
+            if label == self.black_label:
+                black |= bit
+            elif label == self.white_label:
+                white |= bit
+        return BitBoard(black, white, self)
+
+    def valid_moves(self, own: int, opponent: int) -> int:
+        """Bits of the squares where own can move, capturing opponent discs."""
+        empty = self.full & ~(own | opponent)
+        moves = 0
+        for shift, mask in self.directions:
+            if shift > 0:
+                run = (own << shift) & mask & opponent
+                while True:
+                    extended = run | ((run << shift) & mask & opponent)
+                    if extended == run:
+                        break
+                    run = extended
+                moves |= (run << shift) & mask
+            else:
+                run = (own >> -shift) & mask & opponent
+                while True:
+                    extended = run | ((run >> -shift) & mask & opponent)
+                    if extended == run:
+                        break
+                    run = extended
+                moves |= (run >> -shift) & mask
+        return moves & empty
+
+    def flips(self, own: int, opponent: int, move: int) -> int:
+        """Bits of the opponent discs captured by own playing move."""
+        flipped = 0
+        for shift, mask in self.directions:
+            line = 0
+            if shift > 0:
+                cursor = (move << shift) & mask
+                while cursor & opponent:
+                    line |= cursor
+                    cursor = (cursor << shift) & mask
+            else:
+                cursor = (move >> -shift) & mask
+                while cursor & opponent:
+                    line |= cursor
+                    cursor = (cursor >> -shift) & mask
+            if cursor & own:
+                flipped |= line
+        return flipped
+
+
+class BoardSymmetries(object):
+    """Symmetries of a Reversi board of the given size, on bitboards.
+
+    Rectangular boards have 4: the identity, the two mirrors and the half
+    turn. Square ones have 8: also the diagonal mirrors and the quarter
+    turns. Any Reversi position is worth the same as its images, so
+    caches and books can store a single canonical form of all of them.
+
+    Bitboards use the bit order of BitboardLayout and are transformed a
+    byte at a time with precomputed tables.
+    """
+
+    def __init__(self, height: int, width: int) -> None:
+        self.height = height
+        self.width = width
+        self.layout = BitboardLayout(height, width, None, None)
+        maps = [
+            lambda x, y: (x, y),
+            lambda x, y: (width + 1 - x, y),
+            lambda x, y: (x, height + 1 - y),
+            lambda x, y: (width + 1 - x, height + 1 - y),
+        ]
+        if height == width:
+            maps += [
+                lambda x, y: (y, x),
+                lambda x, y: (width + 1 - y, x),
+                lambda x, y: (y, height + 1 - x),
+                lambda x, y: (width + 1 - y, height + 1 - x),
+            ]
+        index = {square: i for i, square in enumerate(self.layout.squares)}
+        # bit index of the image of each bit index, for each symmetry
+        self.permutations = [
+            [index[f(x, y)] for x, y in self.layout.squares] for f in maps
+        ]
+        self.inverses = [
+            [permutation.index(i) for i in range(self.layout.n_squares)]
+            for permutation in self.permutations
+        ]
+        # image of every value of every byte of a bitboard, for each symmetry
+        self._byte_tables = []
+        for permutation in self.permutations:
+            tables = []
+            for first in range(0, self.layout.n_squares, 8):
+                table = [0] * 256
+                for value in range(1, 256):
+                    low = (value & -value).bit_length() - 1
+                    image = 0
+                    if first + low < self.layout.n_squares:
+                        image = 1 << permutation[first + low]
+                    table[value] = table[value & (value - 1)] | image
+                tables.append(table)
+            self._byte_tables.append(tables)
+
+    def __len__(self) -> int:
+        return len(self.permutations)
+
+    def __deepcopy__(self, memo: dict) -> BoardSymmetries:
+        # immutable, shared by the copies of a game
+        return self
+
+    def apply(self, bits: int, symmetry: int) -> int:
+        """Image of a bitboard by a symmetry (an index in range(len(self)))."""
+        image = 0
+        shift = 0
+        for table in self._byte_tables[symmetry]:
+            image |= table[(bits >> shift) & 0xFF]
+            shift += 8
+        return image
+
+    def canonical(self, first: int, second: int) -> Tuple[int, int, int]:
+        """Canonical form of a position given by two bitboards (e.g. the
+        discs of the player to move and of the opponent).
+
+        Returns the images of both bitboards by the symmetry that makes
+        them smallest (first, then second) and the index of that symmetry.
+        Symmetric positions have the same canonical form.
+        """
+        best = None
+        for symmetry in range(len(self.permutations)):
+            image = (self.apply(first, symmetry), self.apply(second, symmetry), symmetry)
+            if best is None or image < best:
+                best = image
+        return best
+
+    def square(self, square: Tuple[int, int], symmetry: int) -> Tuple[int, int]:
+        """Image of a square (x, y) by a symmetry, e.g. a move of the
+        position into its canonical form."""
+        index = self.layout.bits[square].bit_length() - 1
+        return self.layout.squares[self.permutations[symmetry][index]]
+
+    def inverse_square(self, square: Tuple[int, int], symmetry: int) -> Tuple[int, int]:
+        """Square (x, y) whose image by the symmetry is the given one, e.g. a
+        move of the canonical form back into the position."""
+        index = self.layout.bits[square].bit_length() - 1
+        return self.layout.squares[self.inverses[symmetry][index]]
+
+
+class BitBoard(Mapping):
+    """Immutable Reversi board stored as one integer per color.
+
+    It behaves as a read-only dict[(x, y)] -> label, so code written for
+    the dict board (display, GUI, heuristics) keeps working unchanged.
+    """
+
+    __slots__ = ('black', 'white', 'layout')
+
+    def __init__(self, black: int, white: int, layout: BitboardLayout) -> None:
+        self.black = black
+        self.white = white
+        self.layout = layout
+
+    def __getitem__(self, square: Any) -> Any:
+        bit = self.layout.bits.get(square, 0)
+        if self.black & bit:
+            return self.layout.black_label
+        if self.white & bit:
+            return self.layout.white_label
+        raise KeyError(square)
+
+    def get(self, square: Any, default: Any = None) -> Any:
+        bit = self.layout.bits.get(square, 0)
+        if self.black & bit:
+            return self.layout.black_label
+        if self.white & bit:
+            return self.layout.white_label
+        return default
+
+    def __contains__(self, square: Any) -> bool:
+        return bool((self.black | self.white) & self.layout.bits.get(square, 0))
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for bit in self.layout.iter_bits(self.black | self.white):
+            yield self.layout.square(bit)
+
+    def __len__(self) -> int:
+        return _popcount(self.black | self.white)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, BitBoard):
+            return self.black == other.black and self.white == other.white
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        return hash((self.black, self.white))
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def copy(self) -> BitBoard:
+        return self
+
+    def __copy__(self) -> BitBoard:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> BitBoard:
+        return self
+
+
+class BitboardReversi(Reversi):
+    """Reversi with the board stored as bitboards.
+
+    Drop-in replacement for Reversi: successors, their order and the
+    scores are the same, but moves, flips and counts are computed with
+    shifts and masks. Dict boards (e.g. from from_array_to_dictionary_board)
+    are accepted and converted on first use.
+    """
+
+    def __init__(
+        self,
+        player1: Player,
+        player2: Player,
+        height: int,
+        width: int,
+        board_cache_size: Optional[int] = 2 ** 14,
+    ) -> None:
+        super().__init__(player1, player2, height, width, board_cache_size)
+        self.layout = BitboardLayout(
+            height, width, self.player1.label, self.player2.label,
+        )
+        # Zobrist key of every value of every byte of a bitboard, so that
+        # a bitboard is hashed 8 squares at a time (same keys as Reversi).
+        self._zobrist_bytes = {}
+        for label in (self.player1.label, self.player2.label):
+            tables = []
+            for first in range(0, self.layout.n_squares, 8):
+                table = [0] * 256
+                for value in range(1, 256):
+                    low = (value & -value).bit_length() - 1
+                    square_key = 0
+                    if first + low < self.layout.n_squares:
+                        square_key = self._zobrist[self.layout.squares[first + low], label]
+                    table[value] = table[value & (value - 1)] ^ square_key
+                tables.append(table)
+            self._zobrist_bytes[label] = tables
+
+    # Private functions
+    def _as_bitboard(self, board: Any) -> BitBoard:
+        if isinstance(board, BitBoard):
+            return board
+        return self.layout.from_mapping(board)
+
+    def _own_opponent(self, board: BitBoard, player_label: Any) -> Tuple[int, int]:
+        if player_label == self.player1.label:
+            return board.black, board.white
+        return board.white, board.black
+
+    def _position_bits(self, board: Any, player_label: Any) -> Tuple[int, int]:
+        return self._own_opponent(self._as_bitboard(board), player_label)
+
+    def _bits_hash(self, bits: int, player_label: Any) -> int:
+        """Zobrist hash of discs of the player on the squares of the bits."""
+        hash_key = 0
+        for table in self._zobrist_bytes[player_label]:
+            hash_key ^= table[bits & 0xFF]
+            bits >>= 8
+        return hash_key
+
+    def _enemy_captured_by_move(self, board: Any, move, player_label: Any) -> list:
+        board = self._as_bitboard(board)
+        own, opponent = self._own_opponent(board, player_label)
+        flipped = self.layout.flips(own, opponent, self.layout.bits[move])
+        return [self.layout.square(bit) for bit in self.layout.iter_bits(flipped)]
+
+    def _board_key(self, board: Any) -> Tuple[int, int]:
+        board = self._as_bitboard(board)
+        return board.black, board.white
+
+    def _compute_board_info(self, board: Any) -> BoardInfo:
+        board = self._as_bitboard(board)
+        black_moves = self.layout.valid_moves(board.black, board.white)
+        white_moves = self.layout.valid_moves(board.white, board.black)
+        moves = (
+            tuple(self.layout.square(bit) for bit in self.layout.iter_bits(black_moves)),
+            tuple(self.layout.square(bit) for bit in self.layout.iter_bits(white_moves)),
+        )
+        coins = (_popcount(board.black), _popcount(board.white))
+        return BoardInfo(moves, coins, not (black_moves or white_moves))
+
+    # Public methods
+
+    def initialize_board(self) -> BitBoard:
+        """Initialize board with standard configuration."""
+        return self._as_bitboard(super().initialize_board())
+
+    def generate_successors(
+        self,
+        state: TwoPlayerGameState,
+    ) -> List[TwoPlayerGameState]:
+        """Generate the list of successors of a game state."""
+        successors = []
+        board = self._as_bitboard(state.board)
+        assert isinstance(state.next_player, Player)
+        is_black = state.next_player.label == self.player1.label
+        own, opponent = self._own_opponent(board, state.next_player.label)
+        moves = self._board_info(board).moves[self._player_index(state.next_player.label)]
+
+        for square in moves:
+            move = self.layout.bits[square]
+            flipped = self.layout.flips(own, opponent, move)
+            new_own, new_opponent = own | move | flipped, opponent & ~flipped
+            if is_black:
+                board_successor = BitBoard(new_own, new_opponent, self.layout)
+            else:
+                board_successor = BitBoard(new_opponent, new_own, self.layout)
+            move_code = self._matrix_to_display_coordinates(square)
+            successor = state.generate_successor(
+                board_successor,
+                move_code,
+            )
+
+            successors.append(successor)
+
+        if not successors:
+            no_movement = state.generate_successor(
+                board,
+                None,
+            )
+            successors = [ no_movement ]
+
+        return successors
+
+    def move_effects(self, state: TwoPlayerGameState) -> List[Tuple[Any, int]]:
+        """(move, number of discs it flips) for each valid move of the next
+        player, in the order of the successors; empty if it has to pass."""
+        board = self._as_bitboard(state.board)
+        player_label = state.next_player.label
+        own, opponent = self._own_opponent(board, player_label)
+        return [
+            (move, _popcount(self.layout.flips(own, opponent, self.layout.bits[move])))
+            for move in self._board_info(board).moves[self._player_index(player_label)]
+        ]
+
+    def make_move(self, state: TwoPlayerGameState, move: Any) -> tuple:
+        """Replace the board of the state by the one after the move.
+
+        Bitboards are immutable and cheap to build, so the undo record
+        just keeps the previous board.
+        """
+        board = self._as_bitboard(state.board)
+        player_label = state.next_player.label
+        undo = (state.board, state.next_player, state.move_code, state._end_of_game, state._scores, state._hash)
+        hash_key = state._hash
+        if hash_key is not None:
+            hash_key ^= self._zobrist_white_to_move
+        if move is not None:
+            own, opponent = self._own_opponent(board, player_label)
+            bit = self.layout.bits[move]
+            flipped = self.layout.flips(own, opponent, bit)
+            own, opponent = own | bit | flipped, opponent & ~flipped
+            if player_label == self.player1.label:
+                board = BitBoard(own, opponent, self.layout)
+            else:
+                board = BitBoard(opponent, own, self.layout)
+            if hash_key is not None:
+                enemy_label = self.opponent(state.next_player).label
+                hash_key ^= (
+                    self._zobrist[move, player_label]
+                    ^ self._bits_hash(flipped, player_label)
+                    ^ self._bits_hash(flipped, enemy_label)
+                )
+
+        state.board = board
+        state.next_player = self.opponent(state.next_player)
+        state.move_code = None if move is None else self._matrix_to_display_coordinates(move)
+        state.hash_key = hash_key
+        # computed again only if they are read
+        state.end_of_game = state.scores = None
+        return undo
+
+    def unmake_move(self, state: TwoPlayerGameState, undo: tuple) -> None:
+        """Restore the board kept in the undo record."""
+        state.board, state.next_player, state.move_code, state.end_of_game, state.scores, state.hash_key = undo
+
+    def hash_state(self, state: TwoPlayerGameState) -> int:
+        """Zobrist hash of the board and the player to move."""
+        board = self._as_bitboard(state.board)
+        hash_key = 0
+        if state.next_player.label == self.player2.label:
+            hash_key = self._zobrist_white_to_move
+        return (
+            hash_key
+            ^ self._bits_hash(board.black, self.player1.label)
+            ^ self._bits_hash(board.white, self.player2.label)
+        )
+
+
+class ArrayMoveGenerator(object):
+    """Reversi moves computed with NumPy on whole boards at once.
+
+    A board is a pair of boolean arrays (own discs, opponent discs) of
+    shape [height, width], with the square (x, y) at [y - 1, x - 1] as in
+    from_dictionary_to_array_board. Every method also accepts a stack of
+    boards of shape [N, height, width] and works on all of them with the
+    same few array operations, which is what makes it fast: use the
+    bitboards of BitboardReversi for a single board.
+
+    Runs of discs are followed one square at a time along each direction
+    and only while some board still has one, so the number of operations
+    depends on the longest run, not on the size of the board.
+    """
+
+    # (row, column) offsets of the 8 directions
+    directions = [
+        (delta_row, delta_column)
+        for delta_row in (-1, 0, 1) for delta_column in (-1, 0, 1)
+        if (delta_row, delta_column) != (0, 0)
+    ]
+
+    def __init__(self, height: int, width: int) -> None:
+        self.height = height
+        self.width = width
+        self.n_squares = height * width
+        # (destination, source) slices moving the squares one step along each direction
+        self._slices = {
+            (delta_row, delta_column): (
+                (
+                    Ellipsis,
+                    slice(max(delta_row, 0), height + min(delta_row, 0)),
+                    slice(max(delta_column, 0), width + min(delta_column, 0)),
+                ),
+                (
+                    Ellipsis,
+                    slice(max(-delta_row, 0), height + min(-delta_row, 0)),
+                    slice(max(-delta_column, 0), width + min(-delta_column, 0)),
+                ),
+            )
+            for delta_row, delta_column in self.directions
+        }
+
+    def from_mappings(self, boards: List[Any], player_label: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Stack dict boards or BitBoards into (own, opponent) arrays of shape [N, height, width]."""
+        own = np.zeros((len(boards), self.height, self.width), dtype=bool)
+        opponent = np.zeros_like(own)
+        for index, board in enumerate(boards):
+            if isinstance(board, BitBoard):
+                black, white = self._unpack(board.black), self._unpack(board.white)
+                if player_label == board.layout.black_label:
+                    own[index], opponent[index] = black, white
+                else:
+                    own[index], opponent[index] = white, black
+            else:
+                for (x, y), label in board.items():
+                    if label == player_label:
+                        own[index, y - 1, x - 1] = True
+                    else:
+                        opponent[index, y - 1, x - 1] = True
+        return own, opponent
+
+    def _unpack(self, bits: int) -> np.ndarray:
+        # bit (x - 1) * height + (y - 1) is the square [y - 1, x - 1]
+        n_bytes = (self.n_squares + 7) // 8
+        unpacked = np.unpackbits(
+            np.frombuffer(bits.to_bytes(n_bytes, 'little'), dtype=np.uint8),
+            bitorder='little',
+        )
+        return unpacked[:self.n_squares].reshape(self.width, self.height).T.astype(bool)
+
+    def moves(self, mask: np.ndarray) -> List[Tuple[int, int]]:
+        """Squares (x, y) set in the mask of one board, in the order of Reversi._get_valid_moves."""
+        columns, rows = np.nonzero(mask.T)
+        return [(int(column) + 1, int(row) + 1) for column, row in zip(columns, rows)]
+
+    def _shift(self, boards: np.ndarray, direction: Tuple[int, int]) -> np.ndarray:
+        """Move the squares one step along the direction; squares coming from outside are False/0."""
+        destination, source = self._slices[direction]
+        shifted = np.zeros(boards.shape, dtype=boards.dtype)
+        shifted[destination] = boards[source]
+        return shifted
+
+    def valid_moves(self, own: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+        """Mask of the squares where own can move, capturing opponent discs."""
+        empty = ~(own | opponent)
+        moves = np.zeros_like(own)
+        for direction in self.directions:
+            # end of the runs of opponent discs that start at an own disc
+            front = self._shift(own, direction) & opponent
+            while front.any():
+                shifted = self._shift(front, direction)
+                moves |= shifted & empty
+                front = shifted & opponent
+        return moves
+
+    def flip_counts(self, own: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+        """Number of opponent discs captured by a move on each square (0 where it is not valid)."""
+        empty = ~(own | opponent)
+        counts = np.zeros(own.shape, dtype=np.int32)
+        for direction in self.directions:
+            front = self._shift(own, direction) & opponent
+            length = 1
+            while front.any():
+                shifted = self._shift(front, direction)
+                # a move there captures the length discs of the run
+                counts += length * (shifted & empty)
+                front = shifted & opponent
+                length += 1
+        return counts
+
+    def flips(self, own: np.ndarray, opponent: np.ndarray, move: np.ndarray) -> np.ndarray:
+        """Mask of the opponent discs captured by own playing move (a mask with one square per board)."""
+        flipped = np.zeros_like(own)
+        for direction in self.directions:
+            front = line = self._shift(move, direction) & opponent
+            closed = np.zeros(own.shape[:-2] + (1, 1), dtype=bool)
+            while front.any():
+                shifted = self._shift(front, direction)
+                closed |= (shifted & own).any(axis=(-2, -1), keepdims=True)
+                front = shifted & opponent
+                line = line | front
+            flipped |= line & closed
+        return flipped
+
+    def play(self, own: np.ndarray, opponent: np.ndarray, move: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Boards (own, opponent) after own plays move, still from the point of view of own."""
+        flipped = self.flips(own, opponent, move)
+        return own | move | flipped, opponent & ~flipped
+
+    def mobility(self, own: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+        """Number of valid moves of own on each board."""
+        return self.valid_moves(own, opponent).sum(axis=(-2, -1))
+
+
 def from_array_to_dictionary_board(board_array):
     """Create a state from an initial board."""
     if board_array is None:
@@ -305,3 +1066,31 @@ def from_dictionary_to_array_board(board_dictionary, height, width):
                 board_array[i] += '.'
 
     return board_array
+
+
+def create_reversi_state(
+    engine: type,
+    board_array: Optional[List[str]] = None,
+    label: str = 'B',
+) -> TwoPlayerGameState:
+    """State of a position given as in tournament.py (None for the
+    initial 8x8 board), with the player of the label to move as MAX.
+
+    The players only give the labels of the colors, they have no
+    strategy. The state has a board of its own, since make_move changes
+    boards in place.
+    """
+    if board_array is None:
+        height, width = 8, 8
+    else:
+        height, width = len(board_array), len(board_array[0])
+    player1 = Player(name='player1', strategy=None)
+    player2 = Player(name='player2', strategy=None)
+    game = engine(player1=player1, player2=player2, height=height, width=width)
+    state = TwoPlayerGameState(
+        game=game,
+        board=from_array_to_dictionary_board(board_array),
+        initial_player=player1 if label == player1.label else player2,
+    ).setup_match().detach()
+    state.board = state.board.copy()
+    return state
@@ -99,6 +99,26 @@ class TicTacToe(TwoPlayerGame):
 
         return successors
 
+    def legal_moves(self, state: TwoPlayerGameState) -> list:
+        """Empty squares of the board, in the order of generate_successors."""
+        n_rows, n_columns = np.shape(state.board)
+        return [(i, j) for i in range(n_rows) for j in range(n_columns)
+                if state.board[i, j] == 0]
+
+    def make_move(self, state: TwoPlayerGameState, move: Any) -> tuple:
+        """Mark the square in place."""
+        undo = (move, state.next_player, state.move_code, state._end_of_game, state._scores, state._hash)
+        state.board[move] = state.next_player.label
+        state.next_player = self.opponent(state.next_player)
+        state.move_code = self._matrix_to_display_coordinates(*move)
+        state.end_of_game = state.scores = state.hash_key = None
+        return undo
+
+    def unmake_move(self, state: TwoPlayerGameState, undo: tuple) -> None:
+        """Clear the square again."""
+        move, state.next_player, state.move_code, state.end_of_game, state.scores, state.hash_key = undo
+        state.board[move] = 0
+
     def _matrix_to_display_coordinates(
         self,
         i: int,
@@ -7,15 +7,22 @@
 from __future__ import annotations  # For Python 3.7
 
 import inspect  # for dynamic members of a module
+import json
 import os
+import random
 import sys
 from abc import ABC
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from importlib import find_loader, import_module, util
-from typing import Callable, Tuple
+from typing import Callable, Dict, Optional, Tuple, Type
 
-from game_infrastructure.game import Player, TwoPlayerGame, TwoPlayerGameState, TwoPlayerMatch
-from heuristic import Heuristic
-from strategy import MinimaxAlphaBetaStrategy, MinimaxStrategy
+import numpy as np
+
+from game_infrastructure.game import BoundedCache, Player, TwoPlayerGame, TwoPlayerGameState, TwoPlayerMatch, multiprocessing_context
+from endgame import EndgameSolver
+from heuristic import Heuristic, evaluation_cache
+from opening_book import OpeningBook
+from strategy import MinimaxAlphaBetaStrategy, MinimaxStrategy, PonderingStrategy, Strategy
 
 """
 NOTE: When MinimaxAlphaBetaStrategy has been implemented
@@ -24,6 +31,16 @@ so that the tournament runs faster.
 """
 
 class StudentHeuristic(ABC):
+    # set to True if evaluation_function modifies the state it receives
+    clone_state = False
+    # define it as a method (self, batch: BoardBatch) -> np.ndarray giving the
+    # values of evaluation_function for many states at once (see heuristic.py)
+    batch_evaluation_function = None
+    # define it as a method (self, heuristic, max_depth_minimax, verbose, **options)
+    # -> Strategy to play with that strategy instead of the one of the tournament
+    # (e.g. MCTSStrategy, to compare it with the players that search)
+    strategy = None
+
     def __init__(self):
         pass
     def evaluation_function(self, state: TwoPlayerGameState) -> float:
@@ -33,9 +50,45 @@ class StudentHeuristic(ABC):
 
 
 class Tournament(object):
-  def __init__(self, max_depth: int, init_match: Callable[[Player, Player], TwoPlayerMatch]):
+  """
+  strategy = class of the search strategy used by every player, built
+  as strategy(heuristic=..., max_depth_minimax=..., verbose=0).
+  evaluation_cache_size = if given, each heuristic remembers the values
+  of up to this many positions, with evaluation_cache_policy ('lru' or
+  'clock', see heuristic.evaluation_cache).
+  persistent_evaluation_cache = keep those values from one match to the
+  next, instead of starting each match with an empty cache. Matches played
+  in worker processes (n_workers > 1) always start with an empty cache.
+  endgame_empties = if given, each player solves exactly the positions with
+  at most this many empty squares (see endgame.EndgameSolver), only
+  telling wins, losses and draws apart with endgame_win_loss_draw.
+  opening_book = path of an opening book file (see opening_book.py) that
+  every player checks before searching.
+  max_sec_ponder = if given, each player keeps searching for up to this
+  many seconds during the turn of its opponent (see
+  strategy.PonderingStrategy), in a process of its own.
+  batch_leaves = if given, passed to the strategies of the players (see
+  MinimaxAlphaBetaStrategy._leaf_values); by default the leaves of frontier
+  nodes are evaluated in one batch except with BitboardReversi.
+  """
+  def __init__(self, max_depth: int, init_match: Callable[[Player, Player], TwoPlayerMatch], strategy: Type[Strategy] = MinimaxAlphaBetaStrategy,
+               evaluation_cache_size: Optional[int] = None, evaluation_cache_policy: str = 'lru', persistent_evaluation_cache: bool = False,
+               endgame_empties: Optional[int] = None, endgame_win_loss_draw: bool = False,
+               opening_book: Optional[str] = None, max_sec_ponder: Optional[float] = None, batch_leaves: Optional[bool] = None):
     self.__max_depth = max_depth
     self.__init_match = init_match
+    self.__strategy = strategy
+    self.__evaluation_cache_size = evaluation_cache_size
+    self.__evaluation_cache_policy = evaluation_cache_policy
+    self.__persistent_evaluation_cache = persistent_evaluation_cache
+    self.__endgame_empties = endgame_empties
+    self.__endgame_win_loss_draw = endgame_win_loss_draw
+    # shared by all the players, so it counts the hits of all of them
+    self.__opening_book = None if opening_book is None else OpeningBook(opening_book)
+    self.__max_sec_ponder = max_sec_ponder
+    self.__batch_leaves = batch_leaves
+    # one cache per heuristic class, shared by all its players
+    self.__evaluation_caches = dict()
 
   def __get_function_from_str(self, name: str, definition: str, max_strat: int) -> list :
     # write content in file with new name
@@ -80,11 +133,20 @@ class Tournament(object):
   n_pairs = games each strategy plays as each color against
   each opponent. So with N strategies, a total of
   N*(N-1)*n_pairs games are played.
+  n_workers = number of processes playing matches at the same time.
+  seed = if given, the random generators are seeded before each match
+  (with seed + number of the match), so results do not depend on n_workers.
+  log_path = if given, each match is appended to this JSONL file as soon as
+  it finishes (players, colors, depth, scores, plies, seconds and nodes of
+  each player). Matches already in the file are not played again but
+  counted from it, so an interrupted tournament is resumed by running it
+  again with the same configuration.
   """
-  def run(self, student_strategies: dict, increasing_depth : bool = True, n_pairs: int = 1, allow_selfmatch : bool = False) -> Tuple[dict, dict, dict]:
+  def run(self, student_strategies: dict, increasing_depth : bool = True, n_pairs: int = 1, allow_selfmatch : bool = False, n_workers: int = 1, seed: Optional[int] = None, log_path: Optional[str] = None) -> Tuple[dict, dict, dict]:
     scores = dict()
     totals = dict()
     name_mapping = dict()
+    matches = list()
     for student1 in student_strategies:
       strats1 = student_strategies[student1]
       for student2 in student_strategies:
@@ -106,72 +168,111 @@ class Tournament(object):
                 name_mapping[name2] = sh2.get_name()
                 if increasing_depth:
                     for depth in range(1, self.__max_depth):
-                        pl1 = Player(
-                            name=name1,
-                            strategy=MinimaxAlphaBetaStrategy(
-                            #strategy=MinimaxStrategy(
-                                heuristic=Heuristic(name=sh1.get_name(), evaluation_function=sh1.evaluation_function),
-                                max_depth_minimax=depth,
-                                verbose=0,
-                            ),
-                        )
-                        pl2 = Player(
-                            name=name2,
-                            strategy=MinimaxAlphaBetaStrategy(
-                            #strategy=MinimaxStrategy(
-                                heuristic=Heuristic(name=sh2.get_name(), evaluation_function=sh2.evaluation_function),
-                                max_depth_minimax=depth,
-                                verbose=0,
-                            ),
-                        )
-
-                        self.__single_run(player1_first, pl1, name1, pl2, name2, scores, totals)
+                        pl1 = self.__get_player(name1, sh1, depth)
+                        pl2 = self.__get_player(name2, sh2, depth)
+
+                        matches.append((player1_first, pl1, name1, pl2, name2, depth))
                 else:
                     depth=self.__max_depth
-                    pl1 = Player(
-                        name=name1,
-                        strategy=MinimaxAlphaBetaStrategy(
-                        #strategy=MinimaxStrategy(
-                            heuristic=Heuristic(name=sh1.get_name(), evaluation_function=sh1.evaluation_function),
-                            max_depth_minimax=depth,
-                            verbose=0,
-                        ),
-                    )
-                    pl2 = Player(
-                        name=name2,
-                        strategy=MinimaxAlphaBetaStrategy(
-                        #strategy=MinimaxStrategy(
-                            heuristic=Heuristic(name=sh2.get_name(), evaluation_function=sh2.evaluation_function),
-                            max_depth_minimax=depth,
-                            verbose=0,
-                        ),
-                    )
-
-                    self.__single_run(player1_first, pl1, name1, pl2, name2, scores, totals)
+                    pl1 = self.__get_player(name1, sh1, depth)
+                    pl2 = self.__get_player(name2, sh2, depth)
+
+                    matches.append((player1_first, pl1, name1, pl2, name2, depth))
+    self.__run_matches(matches, scores, totals, n_workers, seed, log_path)
     return scores, totals, name_mapping
 
-  def __single_run(self, player1_first: bool, pl1: Player, name1: str, pl2: Player, name2: str, scores: dict, totals: dict):
-        players = []
-        if player1_first:
-            players = [pl1, pl2]
+  def __run_matches(self, matches: list, scores: dict, totals: dict, n_workers: int, seed: Optional[int], log_path: Optional[str]):
+    # register the pairs in order, so that the result dicts do not
+    # depend on the order in which the matches finish
+    for player1_first, pl1, name1, pl2, name2, depth in matches:
+        self.__store_result(name1, name2, 0, 0, scores, totals)
+    seeds = [None if seed is None else seed + n for n in range(len(matches))]
+    # matches of a previous run of the tournament count without being played
+    logged = _read_match_log(log_path) if log_path is not None else dict()
+    pending = list()
+    for n, (player1_first, pl1, name1, pl2, name2, depth) in enumerate(matches):
+        record = logged.get(_match_key(n, name1, name2, depth, player1_first))
+        if record is None:
+            pending.append(n)
         else:
-            players = [pl2, pl1]
-        game = self.__init_match(players[0], players[1])
-        try:
-            game_scores = game.play_match()
-            # let's get the scores (do not assume they will always be binary)
-            # we assume a higher score is better
-            if player1_first:
-                score1, score2 = game_scores[0], game_scores[1]
-            else:
-                score1, score2 = game_scores[1], game_scores[0]
-            wins = loses = 0
-            if score1 > score2:
-                wins, loses = 1, 0
-            else:
-                wins, loses = 0, 1
-        except Warning:
-            wins = loses = 0
+            self.__store_result(name1, name2, record['wins'], record['loses'], scores, totals)
+    log = _open_match_log(log_path) if log_path is not None else None
+    try:
+        if n_workers <= 1:
+            for n in pending:
+                player1_first, pl1, name1, pl2, name2, depth = matches[n]
+                if not self.__persistent_evaluation_cache:
+                    for cache in self.__evaluation_caches.values():
+                        cache.clear()
+                wins, loses, details = _play_single_match(self.__init_match, player1_first, pl1, pl2, seeds[n])
+                self.__store_result(name1, name2, wins, loses, scores, totals)
+                _log_match(log, n, matches[n], wins, loses, details)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing_context()) as executor:
+                futures = {
+                    executor.submit(_play_single_match, self.__init_match, matches[n][0], matches[n][1], matches[n][3], seeds[n]): n
+                    for n in pending
+                }
+                # merge the results as they arrive
+                for future in as_completed(futures):
+                    n = futures[future]
+                    player1_first, pl1, name1, pl2, name2, depth = matches[n]
+                    wins, loses, details = future.result()
+                    self.__store_result(name1, name2, wins, loses, scores, totals)
+                    _log_match(log, n, matches[n], wins, loses, details)
+    finally:
+        if log is not None:
+            log.close()
+
+  def __get_player(self, name: str, sh: StudentHeuristic, depth: int) -> Player:
+    options = dict()
+    if self.__endgame_empties is not None:
+        options['endgame_solver'] = EndgameSolver(
+            max_empties=self.__endgame_empties,
+            win_loss_draw=self.__endgame_win_loss_draw,
+        )
+    if self.__opening_book is not None:
+        options['opening_book'] = self.__opening_book
+    if self.__batch_leaves is not None:
+        options['batch_leaves'] = self.__batch_leaves
+    create_strategy = self.__strategy if sh.strategy is None else sh.strategy
+    strategy = create_strategy(
+        heuristic=self.__get_heuristic(sh),
+        max_depth_minimax=depth,
+        verbose=0,
+        **options,
+    )
+    if self.__max_sec_ponder is not None:
+        strategy = PonderingStrategy(strategy, self.__max_sec_ponder)
+    return Player(name=name, strategy=strategy)
+
+  def __get_heuristic(self, sh: StudentHeuristic) -> Heuristic:
+    return Heuristic(
+        name=sh.get_name(),
+        evaluation_function=sh.evaluation_function,
+        clone_state=sh.clone_state,
+        batch_evaluation_function=sh.batch_evaluation_function,
+        cache=self.__get_evaluation_cache(sh),
+    )
+
+  def __get_evaluation_cache(self, sh: StudentHeuristic) -> Optional[BoundedCache]:
+    if self.__evaluation_cache_size is None:
+        return None
+    if type(sh) not in self.__evaluation_caches:
+        self.__evaluation_caches[type(sh)] = evaluation_cache(self.__evaluation_cache_size, self.__evaluation_cache_policy)
+    return self.__evaluation_caches[type(sh)]
+
+  def evaluation_cache_statistics(self) -> dict:
+    """Evaluation cache of each heuristic (by name), with its hit and miss
+    counters for all the matches played in this process."""
+    return {sh().get_name(): cache for sh, cache in self.__evaluation_caches.items()}
+
+  def opening_book_statistics(self) -> Optional[OpeningBook]:
+    """Opening book, with its hit and miss counters for all the matches
+    played in this process (None if there is no book)."""
+    return self.__opening_book
+
+  def __store_result(self, name1: str, name2: str, wins: int, loses: int, scores: dict, totals: dict):
         # store the 1-to-1 numbers
         if name1 not in scores:
             scores[name1] = dict()
@@ -187,3 +288,107 @@ class Tournament(object):
             totals[name2] = 0
         totals[name2] += loses
         # end of function
+
+
+def _match_key(n: int, name1: str, name2: str, depth: int, player1_first: bool) -> tuple:
+    """Identifies a match of a tournament in the match log."""
+    return (n, name1, name2, depth, player1_first)
+
+
+def _read_match_log(log_path: str) -> Dict[tuple, dict]:
+    """Records of the matches in the log (none if it does not exist yet)."""
+    records = dict()
+    if not os.path.exists(log_path):
+        return records
+    with open(log_path) as log:
+        for line in log:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # a line cut short by an interrupted run
+                continue
+            key = _match_key(record['match'], record['player1'], record['player2'], record['depth'], record['player1_first'])
+            records[key] = record
+    return records
+
+
+def _open_match_log(log_path: str):
+    """Open the log to append records, ending first a line cut short by
+    an interrupted run."""
+    cut_short = False
+    if os.path.exists(log_path) and os.path.getsize(log_path) > 0:
+        with open(log_path, 'rb') as log:
+            log.seek(-1, os.SEEK_END)
+            cut_short = log.read(1) != b'\n'
+    log = open(log_path, 'a')
+    if cut_short:
+        log.write('\n')
+    return log
+
+
+def _log_match(log, n: int, match: tuple, wins: int, loses: int, details: dict) -> None:
+    """Append the record of a finished match to the log and flush it, so
+    that it is kept if the tournament is interrupted."""
+    if log is None:
+        return
+    player1_first, pl1, name1, pl2, name2, depth = match
+    record = {
+        'match': n,
+        'player1': name1,
+        'player2': name2,
+        'depth': depth,
+        'player1_first': player1_first,
+        'wins': wins,
+        'loses': loses,
+    }
+    record.update(details)
+    log.write(json.dumps(record) + '\n')
+    log.flush()
+
+
+def _play_single_match(init_match: Callable[[Player, Player], TwoPlayerMatch], player1_first: bool, pl1: Player, pl2: Player, seed: Optional[int] = None) -> Tuple[int, int, dict]:
+    """Play one match of a tournament and return (wins, loses) of pl1 and
+    the details of the match for the match log: colors, scores, plies,
+    and seconds and nodes of the search of each player, all listed as
+    [pl1, pl2] (scores are None if the match did not finish).
+
+    Module-level function, so that it can be run in a worker process.
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    players = []
+    if player1_first:
+        players = [pl1, pl2]
+    else:
+        players = [pl2, pl1]
+    game = init_match(players[0], players[1])
+    try:
+        game_scores = game.play_match()
+        # let's get the scores (do not assume they will always be binary)
+        # we assume a higher score is better
+        if player1_first:
+            score1, score2 = game_scores[0], game_scores[1]
+        else:
+            score1, score2 = game_scores[1], game_scores[0]
+        wins = loses = 0
+        if score1 > score2:
+            wins, loses = 1, 0
+        else:
+            wins, loses = 0, 1
+        match_scores = [float(score1), float(score2)]
+    except Warning:
+        wins = loses = 0
+        match_scores = None
+    # TwoPlayerMatch lists them in the order of play
+    order = [0, 1] if player1_first else [1, 0]
+    details = {
+        'colors': [str(players[i].label) for i in order],
+        'scores': match_scores,
+        'plies': game.n_plies,
+        'seconds': [game.seconds[i] for i in order],
+        'nodes': [game.nodes[i] for i in order],
+    }
+    return wins, loses, details
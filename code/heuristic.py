@@ -1,8 +1,9 @@
 # Author: Pedro Urbina Rodriguez
 
 from __future__ import annotations  # For Python 3.7
-from typing import Callable, Sequence
-from game_infrastructure.game import TwoPlayerGameState
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from game_infrastructure.game import BoundedCache, ClockCache, FrozenGameState, LRUCache, TwoPlayerGameState
+from game_infrastructure.reversi import ArrayMoveGenerator
 
 import numpy as np
 import copy
@@ -14,24 +15,149 @@ class Heuristic(object):
         self,
         name: str,
         evaluation_function: Callable[[TwoPlayerGameState], float],
+        clone_state: bool = False,
+        batch_evaluation_function: Optional[Callable[[BoardBatch], np.ndarray]] = None,
+        cache: Optional[BoundedCache] = None,
     ) -> None:
-        """Initialize name of heuristic & evaluation function."""
+        """Initialize name of heuristic & evaluation function.
+
+        With clone_state the evaluation function receives a deep copy of
+        the state it may modify, instead of a read-only view.
+        batch_evaluation_function, if given, must give the same values as
+        evaluation_function for a whole BoardBatch at once.
+        With a cache (see evaluation_cache), the values are remembered by
+        (position hash, player to move, player MAX), so the evaluation
+        function must not be random.
+        """
         self.name = name
         self.evaluation_function = evaluation_function
+        self.clone_state = clone_state
+        self.batch_evaluation_function = batch_evaluation_function
+        self.cache = cache
+
+    def _cache_key(self, state: TwoPlayerGameState) -> tuple:
+        return state.hash_key, state.next_player.label, state.player_max.label
 
     def evaluate(self, state: TwoPlayerGameState) -> float:
         """Evaluate a state."""
+        if self.cache is None:
+            return self._evaluate(state)
+        key = self._cache_key(state)
+        value = self.cache.get(key)
+        if value is None:
+            value = self._evaluate(state)
+            self.cache.put(key, value)
+        return value
+
+    def _evaluate(self, state: TwoPlayerGameState) -> float:
         # Prevent modifications of the state.
-        # Deep copy everything, except attributes related
-        # to graphical display.
-        state_copy = state.clone()
-        return self.evaluation_function(state_copy)
+        if self.clone_state:
+            # Deep copy everything, except attributes related
+            # to graphical display.
+            return self.evaluation_function(state.clone())
+        # Read-only view, nothing is copied.
+        return self.evaluation_function(FrozenGameState(state))
+
+    def evaluate_batch(self, states: List[TwoPlayerGameState]) -> np.ndarray:
+        """Evaluate several states, in a single call if there is a batch evaluation function."""
+        if self.batch_evaluation_function is None:
+            return np.array([self.evaluate(state) for state in states], dtype=float)
+        if self.cache is None:
+            return np.asarray(self.batch_evaluation_function(BoardBatch(states)), dtype=float)
+        # only the states not in the cache are evaluated
+        keys = [self._cache_key(state) for state in states]
+        values = [self.cache.get(key) for key in keys]
+        missing = [index for index, value in enumerate(values) if value is None]
+        if missing:
+            batch = BoardBatch([states[index] for index in missing])
+            for index, value in zip(missing, self.batch_evaluation_function(batch)):
+                values[index] = float(value)
+                self.cache.put(keys[index], values[index])
+        return np.array(values, dtype=float)
 
     def get_name(self) -> str:
         """Name getter."""
         return self.name
 
 
+def evaluation_cache(max_entries: int, policy: str = 'lru') -> BoundedCache:
+    """Cache for Heuristic, keeping up to max_entries values.
+
+    The policy is 'lru' (evict the least recently used value) or 'clock'
+    (second chance, cheaper on hits). Each entry takes roughly 230 bytes.
+    """
+    if policy == 'lru':
+        return LRUCache(max_entries)
+    if policy == 'clock':
+        return ClockCache(max_entries)
+    raise ValueError('Unknown cache policy: %s' % policy)
+
+
+class BoardBatch(object):
+    """Reversi boards of several states packed into arrays.
+
+    black and white are the [N, height, width] masks of the discs of
+    player1 and player2, and sign is 1 where MAX is player1 and -1 where
+    it is player2. Disc counts, mobility and end of game are computed
+    once, when first used, and shared by all the functions evaluating
+    the batch.
+    """
+
+    _generators: Dict[Tuple[int, int], ArrayMoveGenerator] = {}
+
+    def __init__(self, states: List[TwoPlayerGameState]) -> None:
+        self.states = states
+        game = states[0].game
+        self.height = game.height
+        self.width = game.width
+        size = (game.height, game.width)
+        if size not in BoardBatch._generators:
+            BoardBatch._generators[size] = ArrayMoveGenerator(*size)
+        self.generator = BoardBatch._generators[size]
+        self.black, self.white = self.generator.from_mappings(
+            [state.board for state in states], game.player1.label,
+        )
+        sign = []
+        for state in states:
+            if state.player_max.label == game.player1.label:
+                sign.append(1)
+            elif state.player_max.label == game.player2.label:
+                sign.append(-1)
+            else:
+                raise ValueError('Player MAX not defined')
+        self.sign = np.array(sign)
+        self._counts: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._mobility: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Number of discs of player1 and player2 on each board."""
+        if self._counts is None:
+            self._counts = (
+                self.black.sum(axis=(1, 2)),
+                self.white.sum(axis=(1, 2)),
+            )
+        return self._counts
+
+    def mobility(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Number of valid moves of player1 and player2 on each board."""
+        if self._mobility is None:
+            # both players in a single call
+            mobility = self.generator.mobility(
+                np.concatenate([self.black, self.white]),
+                np.concatenate([self.white, self.black]),
+            )
+            self._mobility = (mobility[:len(self)], mobility[len(self):])
+        return self._mobility
+
+    def end_of_game(self) -> np.ndarray:
+        """Mask of the finished games (no player can move)."""
+        black_moves, white_moves = self.mobility()
+        return (black_moves == 0) & (white_moves == 0)
+
+
 
 
 ###############################################################################################
@@ -54,16 +180,16 @@ def complex_evaluation_function(state: TwoPlayerGameState) -> float:
         state_value = result_end_game(state)
 
     else:
-        successors = state.game.generate_successors(state)
+        # as many successors as legal moves (a pass is a move)
+        moves = state.game.legal_moves(state)
 
-        state_next = copy.deepcopy(state)
+        state_next = state.detach()
         state_next.next_player = state_next.game.opponent(
             state_next.next_player
         )
-        successors_next = state.game.generate_successors(
-            state_next
-        )
-        return len(successors_next) - len(successors)
+        state_next.hash_key = None
+        moves_next = state.game.legal_moves(state_next)
+        return len(moves_next) - len(moves)
 
     return state_value
      
@@ -86,6 +212,20 @@ def result_end_game(state: TwoPlayerGameState) -> float:
 
     return state_value
 
+def successors_gains(state: TwoPlayerGameState) -> list:
+    """How much result_end_game would change in each successor of a Reversi state.
+
+    A move placing a disc and flipping n discs changes the difference of
+    coins by 1 + 2n, in favour of the player to move; a pass changes
+    nothing. Computed with Reversi.move_effects, without building the
+    successors.
+    """
+    effects = state.game.move_effects(state)
+    if not effects:
+        return [0]
+    sign = 1 if state.is_player_max(state.next_player) else -1
+    return [sign * (1 + 2 * flipped) for move, flipped in effects]
+
 def maximize_possibly_captured_pieces(state: TwoPlayerGameState) -> float:
     """Returns how many pieces could the player eat in his turn if he had unlimited moves."""
     state_value = 0
@@ -95,17 +235,8 @@ def maximize_possibly_captured_pieces(state: TwoPlayerGameState) -> float:
         state_value = actual_score        
 
     else:
-        # scores[0] => scores player1, scores[1] => scores player2
-        successors = state.game.generate_successors(state)
-        
-        if state.is_player_max(state.player1):
-            for successor in successors:
-                state_value += ((successor.scores[0] - successor.scores[1]) - actual_score) 
-        elif state.is_player_max(state.player2):
-            for successor in successors:
-                state_value += ((successor.scores[1] - successor.scores[0]) - actual_score)
-        else:
-            raise ValueError('Player MAX not defined')
+        for gain in successors_gains(state):
+            state_value += gain
 
     return state_value
 
@@ -118,17 +249,8 @@ def maximize_captured_piece(state: TwoPlayerGameState) -> float:
         state_value = actual_score
 
     else:
-        # scores[0] => scores player1, scores[1] => scores player2
-        successors = state.game.generate_successors(state)
-    
-        if state.is_player_max(state.player1):
-            for successor in successors:
-                state_value = max(state_value, (successor.scores[0] - successor.scores[1]) - actual_score)
-        elif state.is_player_max(state.player2):
-            for successor in successors:
-                state_value = max(state_value, (successor.scores[1] - successor.scores[0])- actual_score)
-        else:
-            raise ValueError('Player MAX not defined')
+        for gain in successors_gains(state):
+            state_value = max(state_value, gain)
 
     return state_value
 
@@ -142,24 +264,13 @@ def ponderation_maximize(state: TwoPlayerGameState, p_actual, p_max_captured, p_
         state_value = actual_score
 
     else:
-        # scores[0] => scores player1, scores[1] => scores player2
-        successors = state.game.generate_successors(state)        
         corners_score = corners_based_function(state)
         score_maximum_captured = 0
         score_possibly_captured = 0
 
-        if state.is_player_max(state.player1):
-            for successor in successors:
-                score_maximum_captured = max(score_maximum_captured, (successor.scores[0] - successor.scores[1]) - actual_score)
-                score_possibly_captured += ((successor.scores[0] - successor.scores[1]) - actual_score)
-
-        elif state.is_player_max(state.player2):
-            for successor in successors:
-                score_maximum_captured = max(score_maximum_captured, (successor.scores[1] - successor.scores[0])- actual_score)
-                score_possibly_captured += ((successor.scores[1] - successor.scores[0]) - actual_score)
-
-        else:
-            raise ValueError('Player MAX not defined')
+        for gain in successors_gains(state):
+            score_maximum_captured = max(score_maximum_captured, gain)
+            score_possibly_captured += gain
 
         # final ponderation of the calculated scores
         state_value = actual_score * p_actual + score_maximum_captured * p_max_captured + score_possibly_captured * p_sum_captured + corners_score * p_corners
@@ -265,3 +376,61 @@ def combined_based_function(state: TwoPlayerGameState, functions, weights) -> fl
            state_value = state_value + weight * state_value_aux
             
     return state_value
+
+
+###############################################################################################
+############################### BATCH EVALUATION FUNCTIONS ####################################
+###############################################################################################
+# Same values as the functions above, for a whole BoardBatch of Reversi states.
+
+def _percentage_difference(player1_value: np.ndarray, player2_value: np.ndarray) -> np.ndarray:
+    """100 * (player1 - player2) / (player1 + player2), 0 where both are 0."""
+    total = player1_value + player2_value
+    return np.where(
+        total != 0,
+        100 * (player1_value - player2_value) / np.where(total != 0, total, 1),
+        0,
+    )
+
+def result_end_game_batch(batch: BoardBatch) -> np.ndarray:
+    """Batch version of result_end_game."""
+    player1_score, player2_score = batch.counts()
+    return batch.sign * (player1_score - player2_score)
+
+def parity_function_batch(batch: BoardBatch) -> np.ndarray:
+    """Batch version of parity_function."""
+    score = _percentage_difference(*batch.counts())
+    return np.where(batch.end_of_game(), result_end_game_batch(batch), batch.sign * score)
+
+def corners_based_function_batch(batch: BoardBatch) -> np.ndarray:
+    """Batch version of corners_based_function."""
+    height, width = batch.height, batch.width
+    # the same (x, y) squares as corners_based_function, skipping
+    # those outside the board (which never have a disc)
+    corners = [
+        (x, y) for x, y in [(1, 1), (1, width), (height, 1), (height, width)]
+        if 1 <= x <= width and 1 <= y <= height
+    ]
+    rows = [y - 1 for x, y in corners]
+    columns = [x - 1 for x, y in corners]
+    corners_count_player1 = batch.black[:, rows, columns].sum(axis=1)
+    corners_count_player2 = batch.white[:, rows, columns].sum(axis=1)
+    score = _percentage_difference(corners_count_player1, corners_count_player2)
+    return np.where(batch.end_of_game(), result_end_game_batch(batch), batch.sign * score)
+
+def best_mobility_function_batch(batch: BoardBatch) -> np.ndarray:
+    """Batch version of best_mobility_function."""
+    score = _percentage_difference(*batch.mobility())
+    return np.where(batch.end_of_game(), result_end_game_batch(batch), batch.sign * score)
+
+def combined_based_function_batch(batch: BoardBatch, functions, weights) -> np.ndarray:
+    """Batch version of combined_based_function (functions must be batch functions)."""
+    state_value = np.zeros(len(batch))
+
+    if len(functions) != len(weights):
+        return state_value
+
+    for (weight, function) in zip(weights, functions):
+        state_value = state_value + weight * function(batch)
+
+    return np.where(batch.end_of_game(), result_end_game_batch(batch), state_value)
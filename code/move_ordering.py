@@ -0,0 +1,135 @@
+"""
+Move ordering for the alpha-beta search strategies.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+from typing import Any, Dict, List, Tuple
+
+from game_infrastructure.game import TwoPlayerGameState
+
+PV_BONUS = 1e9
+KILLER_BONUS = 1e6
+
+
+def reversi_square_values(height: int, width: int) -> Dict[Tuple[int, int], float]:
+    """Static value of each square of a Reversi board.
+
+    Corners are the best squares, then edges. The squares next to the
+    corners are the worst: C-squares (along the edges) and, even worse,
+    X-squares (diagonal), because they give the corner away.
+    """
+    values = {}
+    for x in range(1, width + 1):
+        for y in range(1, height + 1):
+            on_edge_x = x in (1, width)
+            on_edge_y = y in (1, height)
+            near_x = x in (2, width - 1)
+            near_y = y in (2, height - 1)
+            if on_edge_x and on_edge_y:
+                value = 100
+            elif near_x and near_y:
+                value = -50
+            elif (on_edge_x and near_y) or (on_edge_y and near_x):
+                value = -25
+            elif on_edge_x or on_edge_y:
+                value = 10
+            else:
+                value = 0
+            values[(x, y)] = value
+    return values
+
+
+class MoveOrdering(object):
+    """Orders the moves of a node so that alpha-beta cuts off early.
+
+    Moves are tried in this order: the principal variation move (the
+    best move stored for the node, e.g. in the transposition table), the
+    killer moves of the ply (moves that caused a cutoff in sibling
+    nodes), and then by history heuristic (moves that often caused
+    cutoffs, weighted by depth) plus a static square value table.
+    Each part can be switched off.
+    """
+
+    def __init__(
+        self,
+        pv_first: bool = True,
+        n_killers: int = 2,
+        history: bool = True,
+        square_values: bool = True,
+    ) -> None:
+        self.pv_first = pv_first
+        self.n_killers = n_killers
+        self.history = history
+        self.square_values = square_values
+        self._killers: Dict[int, List[Any]] = {}
+        self._history: Dict[Tuple[Any, Any], float] = {}
+        self._square_values: Dict[Tuple[int, int], Dict[Any, float]] = {}
+
+    def new_search(self) -> None:
+        """Forget the killers and age the history before a new search."""
+        self._killers = {}
+        for key in self._history:
+            self._history[key] /= 2
+
+    def clear(self) -> None:
+        """Forget everything learnt."""
+        self._killers = {}
+        self._history = {}
+
+    def _static_values(self, state: TwoPlayerGameState) -> Dict[Any, float]:
+        game = state.game
+        size = (getattr(game, 'height', None), getattr(game, 'width', None))
+        if size not in self._square_values:
+            if None in size:
+                # not a board with Reversi-like squares
+                self._square_values[size] = {}
+            else:
+                self._square_values[size] = reversi_square_values(*size)
+        return self._square_values[size]
+
+    def order(
+        self,
+        state: TwoPlayerGameState,
+        moves: list,
+        ply: int,
+        pv_move: Any = None,
+    ) -> list:
+        """Moves of the state sorted from most to least promising."""
+        if len(moves) < 2:
+            return moves
+        killers = self._killers.get(ply, ()) if self.n_killers else ()
+        history = self._history if self.history else {}
+        static = self._static_values(state) if self.square_values else {}
+        label = state.next_player.label
+
+        def move_score(move: Any) -> float:
+            score = history.get((label, move), 0) + static.get(move, 0)
+            if self.pv_first and pv_move is not None and move == pv_move:
+                score += PV_BONUS
+            elif move in killers:
+                score += KILLER_BONUS * (self.n_killers - killers.index(move))
+            return score
+
+        return sorted(moves, key=move_score, reverse=True)
+
+    def record_cutoff(
+        self,
+        state: TwoPlayerGameState,
+        move: Any,
+        ply: int,
+        depth: int,
+    ) -> None:
+        """Learn from a move that caused a cutoff in the state."""
+        if move is None:
+            return
+        if self.n_killers:
+            killers = self._killers.setdefault(ply, [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.n_killers:]
+        if self.history:
+            key = (state.next_player.label, move)
+            self._history[key] = self._history.get(key, 0) + depth * depth
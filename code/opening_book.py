@@ -0,0 +1,206 @@
+"""
+Opening book for Reversi.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import mmap
+import struct
+from typing import Dict, Optional, Tuple
+
+from game_infrastructure.game import TwoPlayerGameState
+from game_infrastructure.reversi import Reversi
+
+"""
+# Skipped to avoid circular import
+from strategy import (
+    Strategy,
+)
+"""
+
+# File layout: a header followed by the entries sorted by key. Each entry
+# is the key of a position (see OpeningBook) as a big-endian integer of
+# key_size bytes and the index of the square of its best move.
+MAGIC = b'RVBK'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBxHI')  # magic, version, height, width, max discs, entries
+MOVE = struct.Struct('>H')
+
+
+def _book_key(game: Reversi, state: TwoPlayerGameState) -> Tuple[int, int]:
+    """Key of the canonical form of the position and the symmetry that gives it."""
+    own, opponent, symmetry = game.canonical_form(state)
+    return (own << (game.height * game.width)) | opponent, symmetry
+
+
+class OpeningBook(object):
+    """Best moves of the first positions of a Reversi game, read from a file.
+
+    Positions are stored in canonical form (see Reversi.canonical_form):
+    from the point of view of the player to move and normalized by the
+    symmetries of the board, so each entry serves all the positions
+    equivalent to it.
+    The file is memory-mapped and searched in place (binary search over
+    the sorted keys), so opening a book is immediate whatever its size.
+    Build it with build_opening_book.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    def _open(self) -> None:
+        with open(self.path, 'rb') as book_file:
+            self._data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.height, self.width, self.max_discs, self._n_entries = (
+            HEADER.unpack_from(self._data)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not an opening book'.format(self.path))
+        self._n_squares = self.height * self.width
+        self._key_size = (2 * self._n_squares + 7) // 8
+        self._entry_size = self._key_size + MOVE.size
+
+    def __getstate__(self) -> dict:
+        # Pickling (e.g. to send a strategy to another process) keeps the
+        # path and the counters; the copy maps the file again.
+        state = self.__dict__.copy()
+        del state['_data']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self) -> int:
+        return self._n_entries
+
+    def close(self) -> None:
+        self._data.close()
+
+    def _find(self, key: int) -> Optional[int]:
+        """Square index of the move stored for the key, if any."""
+        target = key.to_bytes(self._key_size, 'big')
+        low, high = 0, self._n_entries
+        while low < high:
+            middle = (low + high) // 2
+            start = HEADER.size + middle * self._entry_size
+            stored = self._data[start:start + self._key_size]
+            if stored < target:
+                low = middle + 1
+            elif stored > target:
+                high = middle
+            else:
+                return MOVE.unpack_from(self._data, start + self._key_size)[0]
+        return None
+
+    def lookup(self, state: TwoPlayerGameState) -> Optional[Tuple[int, int]]:
+        """Square (x, y) of the book move of the state, None if it is not in the book.
+
+        Only states of Reversi games of the size of the book with at most
+        as many discs as its positions are looked up (and counted).
+        """
+        game = state.game
+        if (
+            not isinstance(game, Reversi)
+            or (game.height, game.width) != (self.height, self.width)
+            or len(state.board) > self.max_discs
+        ):
+            return None
+        key, symmetry = _book_key(game, state)
+        move = self._find(key)
+        if move is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        symmetries = game.symmetries
+        return symmetries.inverse_square(symmetries.layout.squares[move], symmetry)
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups that found a move."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return 'Book hits: {:d}, misses: {:d} ({:.1%} hit rate)'.format(
+            self.hits,
+            self.misses,
+            self.hit_rate(),
+        )
+
+
+def write_opening_book(
+    path: str,
+    height: int,
+    width: int,
+    max_discs: int,
+    entries: Dict[int, int],
+) -> None:
+    """Write a book file from its entries (canonical key -> square index)."""
+    key_size = (2 * height * width + 7) // 8
+    with open(path, 'wb') as book_file:
+        book_file.write(HEADER.pack(MAGIC, VERSION, height, width, max_discs, len(entries)))
+        for key in sorted(entries):
+            book_file.write(key.to_bytes(key_size, 'big'))
+            book_file.write(MOVE.pack(entries[key]))
+
+
+def build_opening_book(
+    path: str,
+    initial_state: TwoPlayerGameState,
+    plies: int,
+    strategy: "Strategy",
+    verbose: int = 0,
+) -> int:
+    """Search the positions of the first plies of a game and write their best moves.
+
+    Every position reached from initial_state in fewer than plies moves
+    (whatever the moves played) is searched once, up to symmetry, with
+    the strategy, which should search deeper than the players that will
+    use the book. Returns the number of positions in the book.
+    """
+    game = initial_state.game
+    symmetries = game.symmetries
+    square_index = {square: i for i, square in enumerate(symmetries.layout.squares)}
+    entries: Dict[int, int] = {}
+    max_discs = 0
+
+    def add_position(state: TwoPlayerGameState) -> None:
+        nonlocal max_discs
+        if game.legal_moves(state) == [None]:
+            # the player has to pass
+            return
+        key, symmetry = _book_key(game, state)
+        if key in entries:
+            return
+        position = state.detach()
+        position.board = position.board.copy()
+        position.player_max = position.next_player
+        successor = strategy.next_move(position)
+        (placed,) = set(successor.board) - set(position.board)
+        entries[key] = square_index[symmetries.square(placed, symmetry)]
+        max_discs = max(max_discs, len(position.board))
+        if verbose > 0:
+            print('Book position {:d}: {} plays {}'.format(
+                len(entries), state.next_player.label, successor.move_code,
+            ))
+
+    def expand(state: TwoPlayerGameState, ply: int) -> None:
+        if ply >= plies or state.end_of_game:
+            return
+        add_position(state)
+        for move in game.legal_moves(state):
+            undo = game.make_move(state, move)
+            try:
+                expand(state, ply + 1)
+            finally:
+                game.unmake_move(state, undo)
+
+    state = initial_state.detach()
+    state.board = state.board.copy()
+    expand(state, 0)
+    write_opening_book(path, game.height, game.width, max_discs, entries)
+    return len(entries)
@@ -0,0 +1,129 @@
+# Author: Pedro Urbina Rodriguez
+# Perft: counts the leaf nodes of the game tree to a fixed depth with each
+# Reversi engine, to measure the speed of move generation apart from the
+# search and to check that the engines generate the same moves.
+
+
+from __future__ import annotations  # For Python 3.7
+
+# import from parent directory
+import os, sys
+parent = os.path.abspath('.')
+sys.path.insert(1, parent)
+
+
+import time
+from typing import Dict, List, Optional
+
+from game_infrastructure.game import TwoPlayerGameState
+from game_infrastructure.reversi import BitboardReversi, Reversi, create_reversi_state
+
+
+
+###############################################################################################
+################################ PERFT CONFIGURATION ##########################################
+###############################################################################################
+
+initial_board = None # as initial_board_global in tournament.py, None for the standard 8x8 board
+first_player = 'B' # label of the player to move
+max_depth = 7 # the tree is counted to depths 1, 2, ..., max_depth
+engines = [Reversi, BitboardReversi]
+
+# Known counts of the standard 8x8 board (passes count as a move and
+# finished games as a leaf), checked when initial_board is None.
+standard_counts = {
+    1: 4,
+    2: 12,
+    3: 56,
+    4: 244,
+    5: 1396,
+    6: 8200,
+    7: 55092,
+    8: 390216,
+    9: 3005288,
+    10: 24571284,
+}
+
+
+
+###############################################################################################
+#################################### PERFT RUN ################################################
+###############################################################################################
+
+def perft(state: TwoPlayerGameState, depth: int) -> int:
+    """Leaf nodes of the tree of the state to the depth, built with
+    generate_successors. A pass (the successor with move None) counts
+    as a move and a finished game as a leaf, whatever the depth left."""
+    if depth == 0 or state.end_of_game:
+        return 1
+    successors = state.game.generate_successors(state)
+    if depth == 1:
+        return len(successors)
+    return sum(perft(successor, depth - 1) for successor in successors)
+
+
+def perft_make_unmake(state: TwoPlayerGameState, depth: int) -> int:
+    """As perft, walking the tree with make_move and unmake_move on the
+    state (legal_moves gives [None] for a pass)."""
+    if depth == 0 or state.end_of_game:
+        return 1
+    game = state.game
+    moves = game.legal_moves(state)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = game.make_move(state, move)
+        try:
+            nodes += perft_make_unmake(state, depth - 1)
+        finally:
+            game.unmake_move(state, undo)
+    return nodes
+
+
+def divide(state: TwoPlayerGameState, depth: int) -> Dict[Optional[str], int]:
+    """Leaf nodes below each move of the state, to find where two
+    engines start to differ."""
+    return {
+        successor.move_code: perft(successor, depth - 1)
+        for successor in state.game.generate_successors(state)
+    }
+
+
+methods = {
+    'generate_successors': perft,
+    'make_move': perft_make_unmake,
+}
+
+if __name__ == '__main__':
+    mismatches = 0
+    for depth in range(1, max_depth + 1):
+        counts: Dict[str, int] = {}
+        for engine in engines:
+            for method_name, method in methods.items():
+                # a new game for every count, so that caches do not carry over
+                state = create_reversi_state(engine, initial_board, first_player)
+                start = time.perf_counter()
+                nodes = method(state, depth)
+                seconds = time.perf_counter() - start
+                name = '%s.%s' % (engine.__name__, method_name)
+                counts[name] = nodes
+                print('depth %d\t%-36s %12d nodes %9.3fs %12.0f nodes/s' % (
+                    depth, name, nodes, seconds, nodes / seconds if seconds else 0,
+                ))
+
+        expected: List[int] = list(counts.values())
+        if initial_board is None and depth in standard_counts:
+            expected.append(standard_counts[depth])
+        if len(set(expected)) > 1:
+            mismatches += 1
+            print('depth %d: the counts differ%s' % (
+                depth,
+                ' (%d expected)' % standard_counts[depth] if initial_board is None and depth in standard_counts else '',
+            ))
+            for engine in engines:
+                print('\t%s: %s' % (engine.__name__, divide(create_reversi_state(engine, initial_board, first_player), depth)))
+
+    if mismatches:
+        sys.exit('Perft counts differ at %d depths' % mismatches)
+    print('All the engines agree up to depth %d' % max_depth)
@@ -5,30 +5,84 @@ Author: Pedro Urbina Rodriguez
 
 from __future__ import annotations  # For Python 3.7
 
+import math
+import os
+import random
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 
-from game_infrastructure.game import TwoPlayerGame, TwoPlayerGameState
+from game_infrastructure.game import (
+    Deadline,
+    DeadlineExceeded,
+    TwoPlayerGame,
+    TwoPlayerGameState,
+    multiprocessing_context,
+)
+from game_infrastructure.reversi import BitBoard, BitboardLayout, BitboardReversi, Reversi, _popcount
+from endgame import EndgameSolver
 from heuristic import Heuristic
+from move_ordering import MoveOrdering
+from opening_book import OpeningBook
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
 
 
 class Strategy(ABC):
-    """Abstract base class for player's strategy."""
+    """Abstract base class for player's strategy.
+
+    next_move receives the deadline of the move, if any. Searches poll it
+    once every poll_interval nodes (see _poll_deadline) and raise
+    DeadlineExceeded once it has passed.
+    """
+
+    poll_interval = 64 # nodes between checks of the deadline, if any
 
     def __init__(self, verbose: int = 0) -> None:
         """Initialize common attributes for all derived classes."""
         self.verbose = verbose
+        self._deadline: Optional[Deadline] = None
+        self._nodes_to_poll = 0
 
     @abstractmethod
     def next_move(
         self,
         state: TwoPlayerGameState,
         gui: bool = False,
+        deadline: Optional[Deadline] = None,
     ) -> TwoPlayerGameState:
         """Compute next move."""
 
+    def search_nodes(self) -> Optional[int]:
+        """Positions searched for the last move (nodes of the search tree,
+        playouts for MCTSStrategy), None if the strategy does not count
+        them."""
+        return None
+
+    def start_match(self, state: TwoPlayerGameState) -> None:
+        """Called by TwoPlayerMatch before the first move of a match from
+        the state, so that the strategy can keep data from one move to
+        the next."""
+
+    def end_match(self) -> None:
+        """Called by TwoPlayerMatch when the match is over (or fails), to
+        release the data kept during it."""
+
+    def _set_deadline(self, deadline: Optional[Deadline]) -> None:
+        """Deadline polled by the search that starts."""
+        self._deadline = deadline
+        self._nodes_to_poll = self.poll_interval
+
+    def _poll_deadline(self) -> None:
+        """Check the deadline once every poll_interval nodes."""
+        self._nodes_to_poll -= 1
+        if self._nodes_to_poll <= 0:
+            self._nodes_to_poll = self.poll_interval
+            self._deadline.check()
+
     def generate_successors(
         self,
         state: TwoPlayerGameState,
@@ -47,6 +101,7 @@ class RandomStrategy(Strategy):
         self,
         state: TwoPlayerGameState,
         gui: bool = False,
+        deadline: Optional[Deadline] = None,
     ) -> TwoPlayerGameState:
         """Compute next move."""
         successors = self.generate_successors(state)
@@ -60,6 +115,7 @@ class ManualStrategy(Strategy):
         self,
         state: TwoPlayerGameState,
         gui: bool = False,
+        deadline: Optional[Deadline] = None,
     ) -> TwoPlayerGameState:
         """Compute next move."""
         successors = self.generate_successors(state)
@@ -98,8 +154,10 @@ class MinimaxStrategy(Strategy):
         self,
         state: TwoPlayerGameState,
         gui: bool = False,
+        deadline: Optional[Deadline] = None,
     ) -> TwoPlayerGameState:
         """Compute next state in the game."""
+        self._set_deadline(deadline)
 
         successors = self.generate_successors(state)
 
@@ -136,6 +194,8 @@ class MinimaxStrategy(Strategy):
     ) -> float:
 
         MinimaxStrategy.calls_number += 1 # for computer independent measures
+        if self._deadline is not None:
+            self._poll_deadline()
 
         """Min step of the minimax algorithm."""
         if state.end_of_game or depth == 0:
@@ -167,6 +227,8 @@ class MinimaxStrategy(Strategy):
     ) -> float:
         
         MinimaxStrategy.calls_number += 1 # for computer independent measures
+        if self._deadline is not None:
+            self._poll_deadline()
 
         """Max step of the minimax algorithm."""
         if state.end_of_game or depth == 0:
@@ -192,6 +254,37 @@ class MinimaxStrategy(Strategy):
         return minimax_value
 
 
+class SearchStatistics(object):
+    """Counters of a single search."""
+
+    __slots__ = ('nodes', 'interior_nodes', 'cutoffs', 'first_move_cutoffs')
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.interior_nodes = 0 # nodes whose moves were searched
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0 # cutoffs caused by the first move tried
+
+    def cutoff_rate(self) -> float:
+        """Fraction of the interior nodes that were cut off."""
+        return self.cutoffs / self.interior_nodes if self.interior_nodes else 0.0
+
+    def first_move_cutoff_rate(self) -> float:
+        """Fraction of the cutoffs caused by the first move tried."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def __str__(self) -> str:
+        return (
+            'Nodes: {:d}, cutoffs: {:d} ({:.1%} of interior nodes), '
+            'first move cutoffs: {:.1%}'.format(
+                self.nodes,
+                self.cutoffs,
+                self.cutoff_rate(),
+                self.first_move_cutoff_rate(),
+            )
+        )
+
+
 class MinimaxAlphaBetaStrategy(Strategy):
     """Minimax alpha-beta strategy."""
 
@@ -202,18 +295,42 @@ class MinimaxAlphaBetaStrategy(Strategy):
         heuristic: Heuristic,
         max_depth_minimax: int,
         verbose: int = 0,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_ordering: Optional[MoveOrdering] = None,
+        endgame_solver: Optional[EndgameSolver] = None,
+        opening_book: Optional[OpeningBook] = None,
+        batch_leaves: Optional[bool] = None,
     ) -> None:
         super().__init__(verbose)
         self.heuristic = heuristic
         self.max_depth_minimax = max_depth_minimax
+        self.transposition_table = transposition_table
+        self.move_ordering = move_ordering
+        self.endgame_solver = endgame_solver
+        self.opening_book = opening_book
+        self.batch_leaves = batch_leaves # see _leaf_values
+        self.statistics = SearchStatistics()
+        self._solving_endgame = False # the whole search is solved exactly
+        self._in_match = False # between start_match and end_match
+        self._search_depth = max_depth_minimax # depth of the root successors
+        self._replies: Dict[int, Any] = {} # best reply to each root successor
 
     def next_move(
         self,
         state: TwoPlayerGameState,
         gui: bool = False,
+        deadline: Optional[Deadline] = None,
     ) -> TwoPlayerGameState:
         """Compute next state in the game."""
+        book_successor = self._book_successor(state)
+        if book_successor is not None:
+            return book_successor
+        self._new_search(state, deadline)
+        self._search_depth = self.max_depth_minimax
+
         # Remember to write the removed prints
+        # The successors are fresh states, so each subtree below them is
+        # searched in place with make_move/unmake_move.
         successors = self.generate_successors(state)
         
         # Because MAX starts
@@ -248,10 +365,208 @@ class MinimaxAlphaBetaStrategy(Strategy):
             print('Minimax value = {:.2g}'.format(minimax_value))
     
         if self.verbose > 0:
-            print('Total number of recursive calls: %d' %MinimaxAlphaBetaStrategy.calls_number)
+            self._print_statistics()
         
         return next_state
 
+    def _book_successor(self, state: TwoPlayerGameState) -> Optional[TwoPlayerGameState]:
+        """Successor reached with the move of the opening book, if it has one."""
+        if self.opening_book is None:
+            return None
+        move = self.opening_book.lookup(state)
+        if move is None:
+            return None
+        for successor in self.generate_successors(state):
+            if move in successor.board and move not in state.board:
+                # no search for this move
+                self.statistics = SearchStatistics()
+                if self.verbose > 0:
+                    print('Book move')
+                    print(self.opening_book)
+                return successor
+        return None
+
+    def search_nodes(self) -> Optional[int]:
+        return self.statistics.nodes
+
+    def start_match(self, state: TwoPlayerGameState) -> None:
+        """Start with empty tables, which are then kept from one move to
+        the next: the positions searched for a move include many of those
+        searched for the next one, two plies deeper."""
+        self._clear_tables()
+        self._in_match = True
+
+    def end_match(self) -> None:
+        self._clear_tables()
+        self._in_match = False
+
+    def _clear_tables(self) -> None:
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        if self.move_ordering is not None:
+            self.move_ordering.clear()
+        if self.endgame_solver is not None:
+            self.endgame_solver.clear()
+
+    def _new_search(self, state: TwoPlayerGameState, deadline: Optional[Deadline] = None) -> None:
+        """Reset the per-search data before computing a move from the state.
+
+        The tables (transposition table, move ordering and bounds of the
+        endgame solver) are only kept within a match (see start_match);
+        otherwise each search starts from scratch.
+        """
+        self._set_deadline(deadline)
+        self.statistics = SearchStatistics()
+        self._replies.clear()
+        self._solving_endgame = (
+            self.endgame_solver is not None and self.endgame_solver.applies(state)
+        )
+        if not self._in_match:
+            self._clear_tables()
+        elif self.move_ordering is not None:
+            self.move_ordering.new_search()
+
+    def _print_statistics(self) -> None:
+        print('Total number of recursive calls: %d' %type(self).calls_number)
+        print(self.statistics)
+        if self.transposition_table is not None:
+            print('Transposition table hits: %d, misses: %d' % (
+                self.transposition_table.hits,
+                self.transposition_table.misses,
+            ))
+        if self.endgame_solver is not None:
+            print(self.endgame_solver.statistics)
+        if self.opening_book is not None:
+            print(self.opening_book)
+
+    def expected_reply(self, successor: TwoPlayerGameState) -> Tuple[bool, Any]:
+        """Whether the last search found the best reply of the opponent to
+        the move leading to the successor (the next move of the principal
+        variation, if the successor is the move played), and the reply."""
+        if successor.hash_key in self._replies:
+            return True, self._replies[successor.hash_key]
+        return False, None
+
+    def _solved_value(
+        self,
+        state: TwoPlayerGameState,
+        alpha: float,
+        beta: float,
+    ) -> Optional[float]:
+        """Exact value of the state for MAX, when the move is searched
+        from a position close enough to the end for the endgame solver
+        (see EndgameSolver.evaluate)."""
+        if not self._solving_endgame:
+            return None
+        return self.endgame_solver.evaluate(state, alpha, beta, self._deadline)
+
+    def _probe(
+        self,
+        state: TwoPlayerGameState,
+        depth: int,
+        alpha: float,
+        beta: float,
+    ) -> Tuple[Optional[float], float, float, Any]:
+        """Look the state up in the transposition table.
+
+        Returns the value if the stored result settles the node, the
+        (possibly narrowed) window and the best move found before.
+        """
+        if self.transposition_table is None:
+            return None, alpha, beta, None
+        entry = self.transposition_table.probe(state.hash_key)
+        if entry is None:
+            return None, alpha, beta, None
+        if entry.depth >= depth:
+            if entry.bound == EXACT:
+                return entry.value, alpha, beta, entry.best_move
+            if entry.bound == LOWER_BOUND:
+                alpha = max(alpha, entry.value)
+            else:
+                beta = min(beta, entry.value)
+            if alpha >= beta:
+                return entry.value, alpha, beta, entry.best_move
+        return None, alpha, beta, entry.best_move
+
+    def _store(
+        self,
+        state: TwoPlayerGameState,
+        depth: int,
+        value: float,
+        alpha: float,
+        beta: float,
+        best_move: Any,
+    ) -> None:
+        """Store the value of a node searched with the (alpha, beta) window."""
+        if depth == self._search_depth:
+            # a root successor: the move is the reply expected to our move
+            self._replies[state.hash_key] = best_move
+        if self.transposition_table is None:
+            return
+        if value <= alpha:
+            bound = UPPER_BOUND
+        elif value >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.transposition_table.store(state.hash_key, depth, value, bound, best_move)
+
+    def _ordered_moves(self, state: TwoPlayerGameState, best_move: Any, ply: int) -> list:
+        """Legal moves, trying first the best move stored for the state."""
+        moves = state.game.legal_moves(state)
+        if self.move_ordering is not None:
+            return self.move_ordering.order(state, moves, ply, best_move)
+        if best_move is not None and best_move in moves:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+        return moves
+
+    def _leaf_values(self, state: TwoPlayerGameState, moves: list) -> Optional[List[float]]:
+        """Values of the states reached by the moves, evaluated in one batch.
+
+        Used for the frontier nodes (whose successors are all leaves) when
+        the heuristic has a batch evaluation function and batch_leaves is
+        set, None otherwise. All the leaves are evaluated, even those that
+        a cutoff would skip, so it only pays off when evaluating a single
+        state is expensive. With batch_leaves None (the default) leaves are
+        batched except for BitboardReversi, whose scalar evaluation is
+        already cheap.
+        """
+        batch_leaves = self.batch_leaves
+        if batch_leaves is None:
+            batch_leaves = not isinstance(state.game, BitboardReversi)
+        if not batch_leaves or self.heuristic.batch_evaluation_function is None:
+            return None
+        game = state.game
+        leaves = []
+        for move in moves:
+            undo = game.make_move(state, move)
+            try:
+                leaf = state.detach()
+                # boards changed in place by make_move must be copied
+                leaf.board = leaf.board.copy()
+            finally:
+                game.unmake_move(state, undo)
+            leaves.append(leaf)
+        self.statistics.nodes += len(leaves)
+        if self._deadline is not None:
+            self._poll_deadline()
+        return self.heuristic.evaluate_batch(leaves).tolist()
+
+    def _record_cutoff(
+        self,
+        state: TwoPlayerGameState,
+        move: Any,
+        index: int,
+        ply: int,
+        depth: int,
+    ) -> None:
+        self.statistics.cutoffs += 1
+        if index == 0:
+            self.statistics.first_move_cutoffs += 1
+        if self.move_ordering is not None:
+            self.move_ordering.record_cutoff(state, move, ply, depth)
+
     def _min_value(
         self,
         state: TwoPlayerGameState,
@@ -261,33 +576,64 @@ class MinimaxAlphaBetaStrategy(Strategy):
     ) -> float:
         
         MinimaxAlphaBetaStrategy.calls_number += 1 # for computer independent measures
+        self.statistics.nodes += 1
+        if self._deadline is not None:
+            self._poll_deadline()
 
         """Min step of the minimax algorithm."""
-        if state.end_of_game or depth == 0:
+        solved_value = self._solved_value(state, alpha, beta)
+        if solved_value is not None:
+            minimax_value = solved_value
+
+        elif state.end_of_game or depth == 0:
             minimax_value = self.heuristic.evaluate(state)
         
         else:
+            cached_value, alpha, beta, best_move = self._probe(state, depth, alpha, beta)
+            if cached_value is not None:
+                return cached_value
+            window = (alpha, beta)
+            self.statistics.interior_nodes += 1
+            ply = self._search_depth - depth + 1
+
             minimax_value = np.inf
             
-            successors = self.generate_successors(state)
-            for successor in successors:
+            # Walk the tree on this single state: make the move, search
+            # below it and unmake it, instead of building successors.
+            game = state.game
+            moves = self._ordered_moves(state, best_move, ply)
+            leaf_values = self._leaf_values(state, moves) if depth == 1 else None
+            if leaf_values is not None:
+                MinimaxAlphaBetaStrategy.calls_number += len(moves)
+            for index, move in enumerate(moves):
                 if self.verbose > 1:
                     print('{}: {}'.format(state.board, minimax_value))
 
-                successor_minimax_value = self._max_value(
-                    successor, depth - 1, alpha, beta,
-                )
+                if leaf_values is not None:
+                    successor_minimax_value = leaf_values[index]
+                else:
+                    undo = game.make_move(state, move)
+                    try:
+                        successor_minimax_value = self._max_value(
+                            state, depth - 1, alpha, beta,
+                        )
+                    finally:
+                        game.unmake_move(state, undo)
                 
-                minimax_value = min(minimax_value, successor_minimax_value)
+                if (successor_minimax_value < minimax_value):
+                    minimax_value = successor_minimax_value
+                    best_move = move
                 
                 # Pruning
                 if (minimax_value <= alpha):
                     #if self.verbose > 0:
                         #print('Pruning!')
-                    return minimax_value
+                    self._record_cutoff(state, move, index, ply, depth)
+                    break
                 
                 beta = min(beta, minimax_value)
                 
+            self._store(state, depth, minimax_value, *window, best_move)
                 
         if self.verbose > 1:
             print('{}: {}'.format(state.board, minimax_value))
@@ -304,34 +650,1206 @@ class MinimaxAlphaBetaStrategy(Strategy):
     ) -> float:
         
         MinimaxAlphaBetaStrategy.calls_number += 1 # for computer independent measures
+        self.statistics.nodes += 1
+        if self._deadline is not None:
+            self._poll_deadline()
 
         """Max step of the minimax algorithm."""
-        if state.end_of_game or depth == 0:
+        solved_value = self._solved_value(state, alpha, beta)
+        if solved_value is not None:
+            minimax_value = solved_value
+
+        elif state.end_of_game or depth == 0:
             minimax_value = self.heuristic.evaluate(state)
         
         else:
+            cached_value, alpha, beta, best_move = self._probe(state, depth, alpha, beta)
+            if cached_value is not None:
+                return cached_value
+            window = (alpha, beta)
+            self.statistics.interior_nodes += 1
+            ply = self._search_depth - depth + 1
+
             minimax_value = -np.inf
             
-            successors = self.generate_successors(state)
-            for successor in successors:
+            game = state.game
+            moves = self._ordered_moves(state, best_move, ply)
+            leaf_values = self._leaf_values(state, moves) if depth == 1 else None
+            if leaf_values is not None:
+                MinimaxAlphaBetaStrategy.calls_number += len(moves)
+            for index, move in enumerate(moves):
                 if self.verbose > 1:
                     print('{}: {}'.format(state.board, minimax_value))
+
+                if leaf_values is not None:
+                    successor_minimax_value = leaf_values[index]
+                else:
+                    undo = game.make_move(state, move)
+                    try:
+                        successor_minimax_value = self._min_value(
+                            state, depth - 1, alpha, beta,
+                        )
+                    finally:
+                        game.unmake_move(state, undo)
                 
-                successor_minimax_value = self._min_value(
-                    successor, depth - 1, alpha, beta,
-                )
-                
-                minimax_value = max(minimax_value, successor_minimax_value)
+                if (successor_minimax_value > minimax_value):
+                    minimax_value = successor_minimax_value
+                    best_move = move
                 
                 # Pruning
                 if (minimax_value >= beta):
                     #if self.verbose > 0:
                         #print('Pruning!')
-                    return minimax_value
+                    self._record_cutoff(state, move, index, ply, depth)
+                    break
                 
                 alpha = max(alpha, minimax_value)
                 
+            self._store(state, depth, minimax_value, *window, best_move)
+                
         if self.verbose > 1:
             print('{}: {}'.format(state.board, minimax_value))
             
-        return minimax_value
\ No newline at end of file
+        return minimax_value
+
+
+class IterativeDeepeningAlphaBetaStrategy(MinimaxAlphaBetaStrategy):
+    """Alpha-beta searched with increasing depth within a time budget.
+
+    Depths 0, 1, ..., max_depth_minimax are searched in turn until
+    max_sec_per_move runs out. The deadline is checked cooperatively, so
+    the search stops cleanly and the move of the last completed iteration
+    is played. Each iteration tries the root moves in the order of the
+    values found by the previous one (and, with a transposition table,
+    the best moves it stored), which makes the next one cheaper.
+
+    Given the deadline of the move, the search also stops safety_margin
+    seconds before it, to have the move played in time.
+    """
+
+    safety_margin = 0.05 # seconds
+
+    def __init__(
+        self,
+        heuristic: Heuristic,
+        max_sec_per_move: float,
+        max_depth_minimax: int = 64,
+        verbose: int = 0,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_ordering: Optional[MoveOrdering] = None,
+        endgame_solver: Optional[EndgameSolver] = None,
+        opening_book: Optional[OpeningBook] = None,
+        batch_leaves: Optional[bool] = None,
+    ) -> None:
+        super().__init__(
+            heuristic,
+            max_depth_minimax,
+            verbose,
+            transposition_table,
+            move_ordering,
+            endgame_solver,
+            opening_book,
+            batch_leaves,
+        )
+        self.max_sec_per_move = max_sec_per_move
+        self.depth_reached = -1
+
+    def next_move(
+        self,
+        state: TwoPlayerGameState,
+        gui: bool = False,
+        deadline: Optional[Deadline] = None,
+    ) -> TwoPlayerGameState:
+        """Compute next state in the game."""
+        book_successor = self._book_successor(state)
+        if book_successor is not None:
+            return book_successor
+        seconds = self.max_sec_per_move
+        if deadline is not None:
+            seconds = min(seconds, deadline.remaining() - self.safety_margin)
+        search_deadline = Deadline(seconds, parent=deadline)
+        self._new_search(state)
+
+        successors = self.generate_successors(state)
+        next_state = successors[0]
+        minimax_value = -np.inf
+        self.depth_reached = -1
+
+        if len(successors) > 1:
+            self._set_deadline(search_deadline)
+            self._nodes_to_poll = 0
+            try:
+                for depth in range(self.max_depth_minimax + 1):
+                    values = self._search_root(successors, depth)
+                    self.depth_reached = depth
+                    # best first for the next iteration (stable for ties)
+                    ranking = sorted(
+                        range(len(successors)),
+                        key=lambda index: -values[index],
+                    )
+                    successors = [successors[index] for index in ranking]
+                    next_state = successors[0]
+                    minimax_value = values[ranking[0]]
+                    if self._solving_endgame:
+                        # solved values do not depend on the depth
+                        break
+            except DeadlineExceeded:
+                pass
+            finally:
+                self._deadline = None
+
+        if self.verbose > 0:
+            print('Depth reached = {:d} in {:.2f}s'.format(
+                self.depth_reached,
+                search_deadline.elapsed(),
+            ))
+            print('Minimax value = {:.2g}'.format(minimax_value))
+            self._print_statistics()
+
+        return next_state
+
+    def _search_root(
+        self,
+        successors: List[TwoPlayerGameState],
+        depth: int,
+    ) -> List[float]:
+        """Values of the root successors searched to the given depth.
+
+        Successors that cannot beat the best one found before them only
+        get an upper bound of their value, which is enough to rank them.
+        """
+        values = []
+        alpha = -np.inf
+        self._search_depth = depth
+        for successor in successors:
+            successor_minimax_value = self._min_value(
+                successor,
+                depth,
+                alpha,
+                np.inf,
+            )
+            values.append(successor_minimax_value)
+            alpha = max(alpha, successor_minimax_value)
+        return values
+
+
+# Search state of each worker process of ParallelAlphaBetaStrategy
+_worker_shared_alpha: Any = None
+_worker_strategy: Optional[MinimaxAlphaBetaStrategy] = None
+_worker_game: Optional[TwoPlayerGame] = None
+
+
+def _init_parallel_worker(
+    shared_alpha: Any,
+    strategy: MinimaxAlphaBetaStrategy,
+    game: TwoPlayerGame,
+) -> None:
+    global _worker_shared_alpha, _worker_strategy, _worker_game
+    _worker_shared_alpha = shared_alpha
+    _worker_strategy = strategy
+    _worker_game = game
+
+
+def _search_root_successor(
+    board: Any,
+    player_label: Any,
+    max_label: Any,
+    depth: int,
+    solving_endgame: bool,
+    deadline: Optional[Deadline],
+) -> Tuple[float, float, int]:
+    """Search a root successor (the board, with the player of the label
+    to move and the one of max_label as MAX) in a worker process.
+
+    The strategy and the game received when the worker started are kept,
+    so only the board is sent and the transposition table and move
+    ordering of the strategy stay warm from one task to the next. Returns
+    the value, the alpha it was searched with and the number of nodes.
+    """
+    game = _worker_game
+    players = {game.player1.label: game.player1, game.player2.label: game.player2}
+    successor = TwoPlayerGameState(
+        game=game,
+        board=board,
+        initial_player=players[player_label],
+        player_max=players[max_label],
+    )
+    strategy = _worker_strategy
+    strategy._solving_endgame = solving_endgame
+    strategy._set_deadline(deadline)
+    strategy.statistics = SearchStatistics()
+    strategy._search_depth = depth
+
+    alpha = _worker_shared_alpha.value
+    value = strategy._min_value(successor, depth, alpha, np.inf)
+    with _worker_shared_alpha.get_lock():
+        if value > _worker_shared_alpha.value:
+            _worker_shared_alpha.value = value
+    return value, alpha, strategy.statistics.nodes
+
+
+class ParallelAlphaBetaStrategy(MinimaxAlphaBetaStrategy):
+    """Alpha-beta with the root moves searched by a pool of processes.
+
+    The first root move is searched here to get a good alpha bound
+    (young brothers wait), then the rest are spread over n_workers
+    processes. The best value found so far is kept in shared memory and
+    read by every worker when it starts a move. The workers receive the
+    strategy and the game once, when the pool starts, and keep their own
+    transposition table and move ordering between moves.
+
+    Moves searched with a raised alpha may only get an upper bound of
+    their value; those that could tie with the best move are searched
+    again, so that the move played is the one MinimaxAlphaBetaStrategy
+    plays at the same depth (the first of the best ones). Transposition
+    tables may make any of both searches use results of deeper searches,
+    so with them the move can differ. The workers are stopped at the end
+    of the match (or by close()).
+    """
+
+    def __init__(
+        self,
+        heuristic: Heuristic,
+        max_depth_minimax: int,
+        n_workers: Optional[int] = None,
+        verbose: int = 0,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_ordering: Optional[MoveOrdering] = None,
+        endgame_solver: Optional[EndgameSolver] = None,
+        opening_book: Optional[OpeningBook] = None,
+        batch_leaves: Optional[bool] = None,
+    ) -> None:
+        super().__init__(
+            heuristic,
+            max_depth_minimax,
+            verbose,
+            transposition_table,
+            move_ordering,
+            endgame_solver,
+            opening_book,
+            batch_leaves,
+        )
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._shared_alpha: Any = None
+        self._game: Optional[TwoPlayerGame] = None # game of the workers
+
+    def __getstate__(self) -> dict:
+        # the pool stays in this process
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        state['_shared_alpha'] = None
+        state['_game'] = None
+        return state
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._shared_alpha = None
+            self._game = None
+
+    def end_match(self) -> None:
+        # the tables of the workers go with them
+        super().end_match()
+        self.close()
+
+    def _pool(self, game: TwoPlayerGame) -> ProcessPoolExecutor:
+        if self._executor is not None and self._game is not game:
+            # the workers know another game
+            self.close()
+        if self._executor is None:
+            context = multiprocessing_context()
+            self._game = game
+            self._shared_alpha = context.Value('d', -np.inf)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                mp_context=context,
+                initializer=_init_parallel_worker,
+                initargs=(self._shared_alpha, self, game),
+            )
+        return self._executor
+
+    def next_move(
+        self,
+        state: TwoPlayerGameState,
+        gui: bool = False,
+        deadline: Optional[Deadline] = None,
+    ) -> TwoPlayerGameState:
+        """Compute next state in the game."""
+        book_successor = self._book_successor(state)
+        if book_successor is not None:
+            return book_successor
+        self._new_search(state, deadline)
+        self._search_depth = depth = self.max_depth_minimax
+        successors = self.generate_successors(state)
+
+        # Eldest brother first, to get a bound for the others.
+        values = [self._min_value(successors[0], depth, -np.inf, np.inf)]
+        alphas = [-np.inf]
+        if len(successors) > 1:
+            pool = self._pool(state.game)
+            self._shared_alpha.value = values[0]
+            futures = {
+                pool.submit(
+                    _search_root_successor,
+                    successor.board,
+                    successor.next_player.label,
+                    state.player_max.label,
+                    depth,
+                    self._solving_endgame,
+                    self._deadline,
+                ): index
+                for index, successor in enumerate(successors[1:], start=1)
+            }
+            values.extend([None] * len(futures))
+            alphas.extend([None] * len(futures))
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    values[index], alphas[index], nodes = future.result()
+                    self.statistics.nodes += nodes
+                    MinimaxAlphaBetaStrategy.calls_number += nodes
+            except DeadlineExceeded:
+                # the workers poll the same deadline, so the moves being
+                # searched stop soon; those not started are dropped
+                for future in futures:
+                    future.cancel()
+                raise
+
+        # Values that did not beat their alpha are only upper bounds:
+        # search again those that may tie with the best move before it.
+        minimax_value = max(
+            value for value, alpha in zip(values, alphas) if value > alpha
+        )
+        for index, successor in enumerate(successors):
+            if values[index] >= minimax_value and values[index] <= alphas[index]:
+                values[index] = self._min_value(successor, depth, -np.inf, np.inf)
+            if values[index] == minimax_value:
+                next_state = successor
+                break
+
+        if self.verbose > 0:
+            print('Minimax value = {:.2g}'.format(minimax_value))
+            self._print_statistics()
+
+        return next_state
+
+
+class NegamaxPVSStrategy(MinimaxAlphaBetaStrategy):
+    """Negamax with Principal Variation Search (NegaScout).
+
+    A single _negamax method searches every node from the point of view
+    of the player to move. The first move of a node is searched with the
+    full window and the rest with a null window, which only proves that
+    they are not better; a move that fails high is searched again with
+    the full window. With good move ordering most null-window searches
+    succeed, so fewer nodes are expanded than with MinimaxAlphaBetaStrategy
+    at the same depth, and the same move is played.
+
+    With aspiration_window set, the root is first searched with a window
+    of that half-width around the value of the previous move, and again
+    with the full window if the value falls outside.
+    """
+
+    calls_number = 0 # for computer independent measures
+    null_window = 1e-6 # width of the windows that only test a bound
+
+    def __init__(
+        self,
+        heuristic: Heuristic,
+        max_depth_minimax: int,
+        verbose: int = 0,
+        transposition_table: Optional[TranspositionTable] = None,
+        move_ordering: Optional[MoveOrdering] = None,
+        aspiration_window: Optional[float] = None,
+        endgame_solver: Optional[EndgameSolver] = None,
+        opening_book: Optional[OpeningBook] = None,
+        batch_leaves: Optional[bool] = None,
+    ) -> None:
+        super().__init__(
+            heuristic,
+            max_depth_minimax,
+            verbose,
+            transposition_table,
+            move_ordering,
+            endgame_solver,
+            opening_book,
+            batch_leaves,
+        )
+        self.aspiration_window = aspiration_window
+        self.aspiration_failures = 0
+        self._previous_value: Optional[float] = None
+
+    def start_match(self, state: TwoPlayerGameState) -> None:
+        # the value of the last move of another match tells nothing
+        super().start_match(state)
+        self._previous_value = None
+
+    def next_move(
+        self,
+        state: TwoPlayerGameState,
+        gui: bool = False,
+        deadline: Optional[Deadline] = None,
+    ) -> TwoPlayerGameState:
+        """Compute next state in the game."""
+        book_successor = self._book_successor(state)
+        if book_successor is not None:
+            return book_successor
+        self._new_search(state, deadline)
+        self._search_depth = self.max_depth_minimax
+        successors = self.generate_successors(state)
+
+        previous_value = self._previous_value
+        if (
+            self.aspiration_window is not None
+            and previous_value is not None
+            and np.isfinite(previous_value)
+        ):
+            alpha = previous_value - self.aspiration_window
+            beta = previous_value + self.aspiration_window
+            minimax_value, next_state = self._search_root(successors, alpha, beta)
+            if minimax_value <= alpha or minimax_value >= beta:
+                self.aspiration_failures += 1
+                minimax_value, next_state = self._search_root(successors, -np.inf, np.inf)
+        else:
+            minimax_value, next_state = self._search_root(successors, -np.inf, np.inf)
+        self._previous_value = minimax_value
+
+        if self.verbose > 0:
+            if self.verbose > 1:
+                print('\nGame state before move:\n')
+                print(state.board)
+                print()
+            print('Minimax value = {:.2g}'.format(minimax_value))
+            self._print_statistics()
+
+        return next_state
+
+    def _search_root(
+        self,
+        successors: List[TwoPlayerGameState],
+        alpha: float,
+        beta: float,
+    ) -> Tuple[float, TwoPlayerGameState]:
+        """Value of the root searched with the (alpha, beta) window and its best successor."""
+        depth = self._search_depth
+        minimax_value = -np.inf
+        next_state = successors[0]
+        for index, successor in enumerate(successors):
+            # the successors are MIN nodes
+            value = self._principal_variation(successor, depth, alpha, beta, index, -1)
+            if value > minimax_value:
+                minimax_value = value
+                next_state = successor
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+        return minimax_value, next_state
+
+    def _principal_variation(
+        self,
+        state: TwoPlayerGameState,
+        depth: int,
+        alpha: float,
+        beta: float,
+        index: int,
+        color: int,
+    ) -> float:
+        """Value of a child for its parent, searched with a null window unless it is the first one."""
+        if index == 0:
+            return -self._negamax(state, depth, -beta, -alpha, color)
+        value = -self._negamax(state, depth, -alpha - self.null_window, -alpha, color)
+        if alpha < value < beta:
+            # failed high: it may be the new best move
+            value = -self._negamax(state, depth, -beta, -alpha, color)
+        return value
+
+    def _negamax(
+        self,
+        state: TwoPlayerGameState,
+        depth: int,
+        alpha: float,
+        beta: float,
+        color: int,
+    ) -> float:
+        """Value of the state for the player to move (color is 1 for MAX, -1 for MIN)."""
+        NegamaxPVSStrategy.calls_number += 1 # for computer independent measures
+        self.statistics.nodes += 1
+        if self._deadline is not None:
+            self._poll_deadline()
+
+        # the solver takes the window of MAX
+        solved_value = self._solved_value(
+            state, *((alpha, beta) if color > 0 else (-beta, -alpha)),
+        )
+        if solved_value is not None:
+            return color * solved_value
+
+        if state.end_of_game or depth == 0:
+            return color * self.heuristic.evaluate(state)
+
+        cached_value, alpha, beta, best_move = self._probe(state, depth, alpha, beta)
+        if cached_value is not None:
+            return cached_value
+        window = (alpha, beta)
+        self.statistics.interior_nodes += 1
+        ply = self._search_depth - depth + 1
+
+        negamax_value = -np.inf
+        game = state.game
+        moves = self._ordered_moves(state, best_move, ply)
+        # a null window is closed by the first leaf that fails high, so
+        # evaluating all of them at once would be wasted
+        leaf_values = None
+        if depth == 1 and beta - alpha > self.null_window:
+            leaf_values = self._leaf_values(state, moves)
+        if leaf_values is not None:
+            NegamaxPVSStrategy.calls_number += len(moves)
+        for index, move in enumerate(moves):
+            if leaf_values is not None:
+                value = color * leaf_values[index]
+            else:
+                undo = game.make_move(state, move)
+                try:
+                    value = self._principal_variation(
+                        state, depth - 1, alpha, beta, index, -color,
+                    )
+                finally:
+                    game.unmake_move(state, undo)
+
+            if value > negamax_value:
+                negamax_value = value
+                best_move = move
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    self._record_cutoff(state, move, index, ply, depth)
+                    break
+
+        self._store(state, depth, negamax_value, *window, best_move)
+
+        if self.verbose > 1:
+            print('{}: {}'.format(state.board, negamax_value))
+
+        return negamax_value
+
+
+class PonderStatistics(object):
+    """Counters of the moves of a PonderingStrategy."""
+
+    __slots__ = ('moves', 'ponders', 'hits', 'misses', 'seconds_saved')
+
+    def __init__(self) -> None:
+        self.moves = 0
+        self.ponders = 0 # ponder searches started
+        self.hits = 0 # moves whose position had been pondered
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def hit_rate(self) -> float:
+        """Fraction of the pondered positions that were reached."""
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    def seconds_saved_per_move(self) -> float:
+        return self.seconds_saved / self.moves if self.moves else 0.0
+
+    def __str__(self) -> str:
+        return (
+            'Ponder hits: {:d}, misses: {:d} ({:.1%} hit rate), '
+            'time saved: {:.2f}s per move'.format(
+                self.hits,
+                self.misses,
+                self.hit_rate(),
+                self.seconds_saved_per_move(),
+            )
+        )
+
+
+# Search state of the worker process of PonderingStrategy
+_ponder_generation: Any = None
+_ponder_strategy: Optional[Strategy] = None
+_ponder_game: Optional[TwoPlayerGame] = None
+
+
+def _init_ponder_worker(generation: Any, strategy: Strategy, game: TwoPlayerGame) -> None:
+    global _ponder_generation, _ponder_strategy, _ponder_game
+    _ponder_generation = generation
+    _ponder_strategy = strategy
+    _ponder_game = game
+
+
+class _PonderDeadline(Deadline):
+    """Deadline of a ponder search, which also expires when the strategy
+    drops it (see PonderingStrategy._stop_pondering)."""
+
+    def __init__(self, seconds: float, generation: int) -> None:
+        super().__init__(seconds)
+        self.generation = generation
+
+    def remaining(self) -> float:
+        if _ponder_generation.value != self.generation:
+            return 0.0
+        return super().remaining()
+
+    def expired(self) -> bool:
+        return _ponder_generation.value != self.generation or super().expired()
+
+
+def _ponder_search(
+    board: Any,
+    player_label: Any,
+    seconds: float,
+    generation: int,
+) -> Tuple[Any, Tuple[bool, Any], float, bool, Optional[int]]:
+    """Search in the worker process the position expected after the
+    reply of the opponent (the board, with the player of the label to
+    move), for at most seconds.
+
+    The worker keeps the strategy and the game it received when it
+    started, so only the board is sent and the tables of the strategy
+    stay warm from one ponder search to the next. Returns the move code
+    of the successor found (None if the search found none in time), the
+    reply expected to it (as expected_reply), the seconds searched,
+    whether the search completed, and the depth it reached if the
+    strategy reports it (as IterativeDeepeningAlphaBetaStrategy).
+
+    A search completed if it stopped on its own, not because the ponder
+    time ran out or the strategy dropped it: its move is then the one a
+    search of the position in the main process would play.
+    """
+    game = _ponder_game
+    player = game.player1 if game.player1.label == player_label else game.player2
+    position = TwoPlayerGameState(
+        game=game,
+        board=board,
+        initial_player=player,
+        player_max=player,
+    )
+    deadline = _PonderDeadline(seconds, generation)
+    started = time.perf_counter()
+    try:
+        successor = _ponder_strategy.next_move(position, deadline=deadline)
+    except DeadlineExceeded:
+        return None, (False, None), time.perf_counter() - started, False, None
+    seconds = time.perf_counter() - started
+    # iterative deepening stops safety_margin seconds before the deadline
+    completed = deadline.remaining() > getattr(_ponder_strategy, 'safety_margin', 0.0)
+    return (
+        successor.move_code,
+        _expected_reply(_ponder_strategy, successor),
+        seconds,
+        completed,
+        getattr(_ponder_strategy, 'depth_reached', None),
+    )
+
+
+def _expected_reply(strategy: Strategy, successor: TwoPlayerGameState) -> Tuple[bool, Any]:
+    """Reply to the successor predicted by the last search of the
+    strategy, if it predicts replies (see MinimaxAlphaBetaStrategy)."""
+    expected_reply = getattr(strategy, 'expected_reply', None)
+    if expected_reply is None:
+        return False, None
+    return expected_reply(successor)
+
+
+def _deeper(ponder_depth: Optional[int], search_depth: Optional[int]) -> bool:
+    """Whether a ponder search cut short reached deeper than the search
+    that followed it (unknown depths are not deeper)."""
+    return ponder_depth is not None and search_depth is not None and ponder_depth > search_depth
+
+
+class PonderingStrategy(Strategy):
+    """Strategy that keeps searching during the opponent's turn (pondering).
+
+    Each move is computed by strategy. Then the position expected after
+    the reply that the search predicts (see expected_reply of
+    MinimaxAlphaBetaStrategy) is searched by a copy of strategy in a
+    worker process, for at most max_sec_ponder seconds, while the
+    opponent thinks. If the opponent plays that reply (a ponder hit), the
+    move found is played, waiting for the ponder search to finish if
+    needed; otherwise (a miss) the ponder search is dropped and the
+    position is searched as usual. A hit whose ponder search was cut
+    short (by max_sec_ponder) is searched again with the time left for
+    the move, and the move of the deeper of both searches is played.
+
+    The strategy should not use worker processes itself. The worker is
+    stopped at the end of the match (or by close()).
+    """
+
+    def __init__(
+        self,
+        strategy: Strategy,
+        max_sec_ponder: float,
+        verbose: int = 0,
+    ) -> None:
+        super().__init__(verbose)
+        self.strategy = strategy
+        self.max_sec_ponder = max_sec_ponder
+        self.statistics = PonderStatistics()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._game: Optional[TwoPlayerGame] = None # game of the worker
+        self._generation: Any = None # number of the current ponder search
+        self._ponder: Optional[Tuple[int, Future]] = None # hash of the position pondered and its search
+        self._searched = False # whether the last move was searched by strategy (not pondered)
+
+    def __getstate__(self) -> dict:
+        # the worker stays in this process
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        state['_game'] = None
+        state['_generation'] = None
+        state['_ponder'] = None
+        return state
+
+    def search_nodes(self) -> Optional[int]:
+        # pondered moves are searched on the time of the opponent
+        return self.strategy.search_nodes() if self._searched else 0
+
+    def start_match(self, state: TwoPlayerGameState) -> None:
+        self.strategy.start_match(state)
+
+    def end_match(self) -> None:
+        self.close()
+        self.strategy.end_match()
+
+    def close(self) -> None:
+        """Stop pondering and shut the worker process down."""
+        if self._ponder is not None:
+            self._stop_pondering()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._game = None
+            self._generation = None
+
+    def _pool(self, game: TwoPlayerGame) -> ProcessPoolExecutor:
+        if self._executor is not None and self._game is not game:
+            # the worker knows another game
+            self.close()
+        if self._executor is None:
+            context = multiprocessing_context()
+            self._game = game
+            self._generation = context.Value('q', 0)
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=context,
+                initializer=_init_ponder_worker,
+                initargs=(self._generation, self.strategy, game),
+            )
+        return self._executor
+
+    def next_move(
+        self,
+        state: TwoPlayerGameState,
+        gui: bool = False,
+        deadline: Optional[Deadline] = None,
+    ) -> TwoPlayerGameState:
+        """Compute next state in the game."""
+        self.statistics.moves += 1
+        self._searched = False
+        pondered = self._pondered_move(state, deadline)
+        if pondered is not None and pondered[2]:
+            next_state, reply = pondered[:2]
+        else:
+            # not pondered, or cut short: search with the time left
+            self._searched = True
+            next_state = self.strategy.next_move(state, gui, deadline)
+            reply = _expected_reply(self.strategy, next_state)
+            if pondered is not None and pondered[0] is not None and _deeper(
+                pondered[3], getattr(self.strategy, 'depth_reached', None),
+            ):
+                next_state, reply = pondered[:2]
+        self._start_pondering(next_state, reply)
+
+        if self.verbose > 0:
+            print(self.statistics)
+
+        return next_state
+
+    def _pondered_move(
+        self,
+        state: TwoPlayerGameState,
+        deadline: Optional[Deadline],
+    ) -> Optional[Tuple[Optional[TwoPlayerGameState], Tuple[bool, Any], bool, Optional[int]]]:
+        """Result of the ponder search, if it searched this state: the
+        successor it found (None if none), the reply expected to it,
+        whether the search completed and the depth it reached (see
+        _ponder_search)."""
+        if self._ponder is None:
+            return None
+        key, future = self._ponder
+        if state.game.hash_state(state) != key:
+            self.statistics.misses += 1
+            self._stop_pondering()
+            return None
+        self._ponder = None
+        self.statistics.hits += 1
+
+        started = time.perf_counter()
+        try:
+            move_code, reply, seconds, completed, depth_reached = future.result(
+                timeout=None if deadline is None else max(deadline.remaining(), 0.0),
+            )
+        except FutureTimeoutError:
+            # a new search would not finish in time either
+            self._ponder = (key, future)
+            self._stop_pondering()
+            raise DeadlineExceeded()
+        if completed:
+            self.statistics.seconds_saved += seconds - (time.perf_counter() - started)
+
+        for successor in self.generate_successors(state):
+            if move_code is not None and successor.move_code == move_code:
+                return successor, reply, completed, depth_reached
+        return None, (False, None), False, None
+
+    def _start_pondering(self, next_state: TwoPlayerGameState, reply: Tuple[bool, Any]) -> None:
+        """Search in the worker the position expected after the reply
+        (found, move) to our move."""
+        found, reply = reply
+        if not found or next_state.end_of_game:
+            return
+        game = next_state.game
+        position = next_state.detach()
+        # make_move changes the board in place
+        position.board = position.board.copy()
+        game.make_move(position, reply)
+        if position.end_of_game:
+            return
+
+        pool = self._pool(game)
+        self._generation.value += 1
+        future = pool.submit(
+            _ponder_search,
+            position.board,
+            position.next_player.label,
+            self.max_sec_ponder,
+            self._generation.value,
+        )
+        self._ponder = (game.hash_state(position), future)
+        self.statistics.ponders += 1
+
+    def _stop_pondering(self) -> None:
+        """Drop the current ponder search (the worker polls the generation)."""
+        key, future = self._ponder
+        self._ponder = None
+        self._generation.value += 1
+        future.cancel()
+
+
+class MCTSStatistics(object):
+    """Counters of the searches of an MCTSStrategy."""
+
+    __slots__ = ('playouts', 'nodes', 'seconds')
+
+    def __init__(self) -> None:
+        self.playouts = 0
+        self.nodes = 0 # nodes added to the trees
+        self.seconds = 0.0
+
+    def playouts_per_second(self) -> float:
+        return self.playouts / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return 'Playouts: {:d} ({:.0f}/s), tree nodes: {:d}'.format(
+            self.playouts,
+            self.playouts_per_second(),
+            self.nodes,
+        )
+
+
+def _mcts_worker_search(
+    strategy: MCTSStrategy,
+    own: int,
+    opponent: int,
+    deadline: Deadline,
+    seed: int,
+) -> Tuple[Dict[int, int], int, int]:
+    """Search a tree of its own from the root in a worker process (root
+    parallelism). Returns the visits of each root move, the playouts and
+    the nodes of the tree."""
+    random.seed(seed)
+    strategy.statistics = MCTSStatistics()
+    visits = strategy._search(own, opponent, deadline)
+    return visits, strategy.statistics.playouts, strategy.statistics.nodes
+
+
+class MCTSStrategy(Strategy):
+    """Monte Carlo tree search (UCT) for Reversi.
+
+    Each iteration walks down the tree choosing the child with the best
+    UCB1 score (exploration weighs the less visited ones), expands the
+    node reached, plays a random game (playout) from it and counts the
+    result in the nodes of the path. The move played is the most visited
+    one.
+
+    The tree is kept in flat arrays indexed by node (no game states):
+    the position as bitboards of the player to move and of its opponent,
+    the move leading to it, its visits and the wins of the player who
+    made that move. The children of a node are stored together, so a
+    node only keeps the index of the first one and how many there are.
+    Playouts are played on the bitboards too.
+
+    The search stops after max_iterations playouts, after
+    max_sec_per_move seconds or safety_margin seconds before the deadline
+    of the move, whatever happens first. With n_workers > 1, as many
+    trees are searched at the same time, each one in a process of its own
+    with the same budget, and the visits of their root moves are added up
+    (root parallelism); the workers are stopped at the end of the match
+    (or by close()).
+    """
+
+    safety_margin = 0.05 # seconds
+
+    def __init__(
+        self,
+        max_sec_per_move: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+        exploration: float = math.sqrt(2),
+        n_workers: int = 1,
+        verbose: int = 0,
+    ) -> None:
+        super().__init__(verbose)
+        if max_sec_per_move is None and max_iterations is None:
+            raise ValueError('Give max_sec_per_move, max_iterations or both')
+        self.max_sec_per_move = max_sec_per_move
+        self.max_iterations = max_iterations
+        self.exploration = exploration
+        self.n_workers = n_workers
+        self.statistics = MCTSStatistics()
+        self._move_playouts = 0 # of the last move
+        self._layouts: Dict[Tuple[int, int], BitboardLayout] = {}
+        self._layout: Optional[BitboardLayout] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._new_tree()
+
+    def __getstate__(self) -> dict:
+        # the pool stays in this process and the tree is not needed
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        for name in ('_own', '_opponent', '_move', '_parent', '_first_child', '_n_children', '_visits', '_wins'):
+            state[name] = []
+        return state
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def search_nodes(self) -> Optional[int]:
+        return self._move_playouts
+
+    def end_match(self) -> None:
+        self.close()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers - 1,
+                mp_context=multiprocessing_context(),
+            )
+        return self._executor
+
+    def next_move(
+        self,
+        state: TwoPlayerGameState,
+        gui: bool = False,
+        deadline: Optional[Deadline] = None,
+    ) -> TwoPlayerGameState:
+        """Compute next state in the game."""
+        self._move_playouts = 0
+        successors = self.generate_successors(state)
+        if len(successors) == 1:
+            return successors[0]
+        own, opponent = self._bitboards(state)
+        playouts_before = self.statistics.playouts
+
+        seconds = self.max_sec_per_move
+        if deadline is not None:
+            # keep some time to return the move before the deadline
+            seconds = min(
+                np.inf if seconds is None else seconds,
+                deadline.remaining() - self.safety_margin,
+            )
+        search_deadline = Deadline(seconds, parent=deadline)
+
+        futures = []
+        if self.n_workers > 1:
+            pool = self._pool()
+            futures = [
+                pool.submit(
+                    _mcts_worker_search, self, own, opponent, search_deadline,
+                    random.getrandbits(32),
+                )
+                for worker in range(self.n_workers - 1)
+            ]
+        visits = self._search(own, opponent, search_deadline)
+        for future in futures:
+            worker_visits, playouts, nodes = future.result()
+            for move, move_visits in worker_visits.items():
+                visits[move] = visits.get(move, 0) + move_visits
+            self.statistics.playouts += playouts
+            self.statistics.nodes += nodes
+        self._move_playouts = self.statistics.playouts - playouts_before
+
+        # most visited move (the first one of the successors for ties)
+        best_move = max(visits, key=lambda move: visits[move])
+        square = self._layout.square(best_move)
+        for successor in successors:
+            if square in successor.board and square not in state.board:
+                next_state = successor
+                break
+
+        if self.verbose > 0:
+            print('Visits of the move played: {:d} of {:d} in {:.2f}s'.format(
+                visits[best_move],
+                sum(visits.values()),
+                search_deadline.elapsed(),
+            ))
+            print(self.statistics)
+
+        return next_state
+
+    def _bitboards(self, state: TwoPlayerGameState) -> Tuple[int, int]:
+        """Discs of the player to move and of the opponent."""
+        game = state.game
+        if not isinstance(game, Reversi):
+            raise ValueError('MCTSStrategy only plays Reversi')
+        size = (game.height, game.width)
+        if size not in self._layouts:
+            self._layouts[size] = BitboardLayout(
+                game.height, game.width, game.player1.label, game.player2.label,
+            )
+        self._layout = self._layouts[size]
+        board = state.board
+        if not isinstance(board, BitBoard):
+            board = self._layout.from_mapping(board)
+        if state.next_player.label == game.player1.label:
+            return board.black, board.white
+        return board.white, board.black
+
+    def _new_tree(self) -> None:
+        self._own: List[int] = []
+        self._opponent: List[int] = []
+        self._move: List[int] = [] # bit of the move leading to the node, 0 for a pass
+        self._parent: List[int] = []
+        self._first_child: List[int] = [] # -1 until the node is expanded
+        self._n_children: List[int] = []
+        self._visits: List[int] = []
+        self._wins: List[float] = [] # for the player who moved to the node
+
+    def _add_node(self, own: int, opponent: int, move: int, parent: int) -> None:
+        self._own.append(own)
+        self._opponent.append(opponent)
+        self._move.append(move)
+        self._parent.append(parent)
+        self._first_child.append(-1)
+        self._n_children.append(0)
+        self._visits.append(0)
+        self._wins.append(0.0)
+
+    def _search(self, own: int, opponent: int, deadline: Deadline) -> Dict[int, int]:
+        """Grow a new tree from the position until the budget runs out
+        and return the visits of each root move (bit)."""
+        started = time.perf_counter()
+        self._new_tree()
+        self._add_node(own, opponent, 0, -1)
+        self._expand(0)
+        iterations = 0
+        while (
+            (self.max_iterations is None or iterations < self.max_iterations)
+            and not deadline.expired()
+        ):
+            self._iterate()
+            iterations += 1
+        self.statistics.playouts += iterations
+        self.statistics.nodes += len(self._visits)
+        self.statistics.seconds += time.perf_counter() - started
+
+        first = self._first_child[0]
+        visits = {
+            self._move[child]: self._visits[child]
+            for child in range(first, first + self._n_children[0])
+        }
+        self._new_tree()
+        return visits
+
+    def _expand(self, node: int) -> None:
+        """Add the children of the node (a single one for a pass, none at
+        the end of the game)."""
+        layout = self._layout
+        own, opponent = self._own[node], self._opponent[node]
+        self._first_child[node] = len(self._visits)
+        moves = layout.valid_moves(own, opponent)
+        if moves:
+            n_children = 0
+            for move in layout.iter_bits(moves):
+                flipped = layout.flips(own, opponent, move)
+                self._add_node(opponent & ~flipped, own | move | flipped, move, node)
+                n_children += 1
+            self._n_children[node] = n_children
+        elif layout.valid_moves(opponent, own):
+            self._add_node(opponent, own, 0, node)
+            self._n_children[node] = 1
+
+    def _select_child(self, node: int) -> int:
+        """Child with the best UCB1 score (an unvisited one if any)."""
+        first = self._first_child[node]
+        # (the root may not be visited yet, and then neither are its children)
+        log_visits = math.log(max(self._visits[node], 1))
+        exploration = self.exploration
+        visits, wins = self._visits, self._wins
+        best_child, best_score = first, -math.inf
+        for child in range(first, first + self._n_children[node]):
+            child_visits = visits[child]
+            if child_visits == 0:
+                return child
+            score = wins[child] / child_visits + exploration * math.sqrt(log_visits / child_visits)
+            if score > best_score:
+                best_child, best_score = child, score
+        return best_child
+
+    def _iterate(self) -> None:
+        """Selection, expansion, playout and backpropagation."""
+        node = 0
+        while self._n_children[node] > 0:
+            node = self._select_child(node)
+        if self._first_child[node] < 0 and self._visits[node] > 0:
+            # second visit: the node joins the tree with its children
+            self._expand(node)
+            if self._n_children[node] > 0:
+                node = self._first_child[node]
+
+        # final disc difference for the player to move at the node
+        difference = self._playout(self._own[node], self._opponent[node])
+        # result for the player who moved to the node
+        result = 1.0 if difference < 0 else 0.0 if difference > 0 else 0.5
+        while node >= 0:
+            self._visits[node] += 1
+            self._wins[node] += result
+            result = 1.0 - result
+            node = self._parent[node]
+
+    def _playout(self, own: int, opponent: int) -> int:
+        """Disc difference at the end of a random game from the position,
+        for the player to move."""
+        layout = self._layout
+        sign = 1
+        passed = False
+        while True:
+            moves = layout.valid_moves(own, opponent)
+            if moves:
+                move = random.choice(list(layout.iter_bits(moves)))
+                flipped = layout.flips(own, opponent, move)
+                own, opponent = opponent & ~flipped, own | move | flipped
+                passed = False
+            elif passed:
+                # neither player can move
+                break
+            else:
+                own, opponent = opponent, own
+                passed = True
+            sign = -sign
+        return sign * (_popcount(own) - _popcount(opponent))
@@ -0,0 +1,101 @@
+"""
+Shared positions and helpers of the tests.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+# import from parent directory
+import os, sys
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+from typing import List, Optional
+
+from game_infrastructure.game import TwoPlayerGameState
+from game_infrastructure.reversi import create_reversi_state
+
+
+# name: (board as in tournament.py, None for the initial 8x8 board; label of the player to move)
+POSITIONS = {
+    '8x8 opening': (None, 'B'),
+    '8x8 midgame': (
+        [
+            '...W.W..',
+            'BBBBW...',
+            '.BWWB...',
+            '..WBBBB.',
+            '..WBBBB.',
+            '.BWWBWBB',
+            '..WWW..B',
+            '........',
+        ],
+        'B',
+    ),
+    '6x6 opening': (
+        [
+            '......',
+            '......',
+            '..WB..',
+            '..BW..',
+            '......',
+            '......',
+        ],
+        'B',
+    ),
+    '5x7 intermediate': (
+        [
+            '..B.B..',
+            '.WBBW..',
+            'WBWBB..',
+            '.W.WWW.',
+            '.BBWBWB',
+        ],
+        'B',
+    ),
+    '5x7 endgame': (
+        [
+            'B.B.B..',
+            'WWWWWW.',
+            'WWBBBB.',
+            '.WWWWW.',
+            'WWWWBWB',
+        ],
+        'B',
+    ),
+}
+
+
+def position_state(engine: type, name: str) -> TwoPlayerGameState:
+    board, label = POSITIONS[name]
+    return create_reversi_state(engine, board, label)
+
+
+def random_game(engine: type, board: Optional[List[str]], seed: int) -> List[TwoPlayerGameState]:
+    """States of a game of random moves from the board, B moving first."""
+    rng = random.Random(seed)
+    state = create_reversi_state(engine, board, 'B')
+    states = [state]
+    while not state.end_of_game:
+        state = rng.choice(state.game.generate_successors(state))
+        states.append(state)
+    return states
+
+
+def exhaustive_value(state: TwoPlayerGameState) -> int:
+    """Final disc difference for the player to move, with perfect play,
+    by plain negamax over every move."""
+    if state.end_of_game:
+        own = sum(1 for label in state.board.values() if label == state.next_player.label)
+        return own - (len(state.board) - own)
+    game = state.game
+    value = None
+    for move in game.legal_moves(state):
+        undo = game.make_move(state, move)
+        try:
+            successor_value = -exhaustive_value(state)
+        finally:
+            game.unmake_move(state, undo)
+        if value is None or successor_value > value:
+            value = successor_value
+    return value
@@ -0,0 +1,49 @@
+"""
+NumPy move generator on stacks of boards against the engine.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import numpy as np
+import pytest
+
+from game_infrastructure.reversi import ArrayMoveGenerator, Reversi
+
+from conftest import POSITIONS, random_game
+
+
+@pytest.mark.parametrize('name', ['8x8 opening', '6x6 opening', '5x7 intermediate'])
+def test_stack_of_boards_matches_engine(name):
+    """The positions of a few random games, moved on all at once."""
+    states = [
+        state
+        for seed in range(3)
+        for state in random_game(Reversi, POSITIONS[name][0], seed)
+        if not state.end_of_game
+    ]
+    game = states[0].game
+    generator = ArrayMoveGenerator(game.height, game.width)
+    boards = [generator.from_mappings([state.board], state.next_player.label) for state in states]
+    own = np.concatenate([board[0] for board in boards])
+    opponent = np.concatenate([board[1] for board in boards])
+
+    moves = generator.valid_moves(own, opponent)
+    counts = generator.flip_counts(own, opponent)
+    assert list(generator.mobility(own, opponent)) == [int(mask.sum()) for mask in moves]
+    for index, state in enumerate(states):
+        legal = game.legal_moves(state)
+        if legal == [None]:
+            # a pass
+            assert not moves[index].any()
+            continue
+        assert generator.moves(moves[index]) == legal
+        # legal_moves are in the order of generate_successors
+        for (x, y), successor in zip(legal, game.generate_successors(state)):
+            move = np.zeros_like(own[index])
+            move[y - 1, x - 1] = True
+            after_own, after_opponent = generator.play(own[index], opponent[index], move)
+            expected_own, expected_opponent = generator.from_mappings([successor.board], state.next_player.label)
+            assert (after_own == expected_own[0]).all()
+            assert (after_opponent == expected_opponent[0]).all()
+            assert counts[index, y - 1, x - 1] == opponent[index].sum() - after_opponent.sum()
@@ -0,0 +1,112 @@
+"""
+Bounded caches and the evaluation cache of the heuristics.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pickle
+
+import pytest
+
+from game_infrastructure.game import ClockCache, LRUCache
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from heuristic import Heuristic, best_mobility_function, best_mobility_function_batch, evaluation_cache
+from strategy import MinimaxAlphaBetaStrategy
+
+from conftest import position_state, random_game
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'
+    cache.put('d', 'D')
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (4, 1, 1, 3)
+
+
+def test_clock_gives_a_second_chance():
+    cache = ClockCache(3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'
+    # the hand passes a, which was referenced, and evicts b
+    cache.put('d', 'D')
+    assert cache.get('b') is None
+    # a lost its bit on the way: it goes before c, referenced again
+    assert cache.get('c') == 'C'
+    cache.put('e', 'E')
+    assert cache.get('a') is None
+    assert [cache.get(key) for key in 'cde'] == ['C', 'D', 'E']
+    # storing a key again replaces its value in place
+    cache.put('d', 'D2')
+    assert (cache.get('d'), len(cache), cache.evictions) == ('D2', 3, 2)
+
+
+@pytest.mark.parametrize('policy', ['lru', 'clock'])
+def test_pickling_keeps_the_counters_only(policy):
+    cache = evaluation_cache(2, policy)
+    for key in range(5):
+        cache.put(key, key)
+        cache.get(key)
+    copy = pickle.loads(pickle.dumps(cache))
+    assert len(copy) == 0
+    assert (copy.max_entries, copy.hits, copy.evictions) == (2, 5, 3)
+    copy.put(1, 1)
+    assert copy.get(1) == 1
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        evaluation_cache(10, 'fifo')
+
+
+def counting_heuristic(calls: list, cache=None) -> Heuristic:
+    def evaluation_function(state):
+        calls.append(1)
+        return best_mobility_function(state)
+
+    def batch_evaluation_function(batch):
+        calls.extend([1] * len(batch))
+        return best_mobility_function_batch(batch)
+
+    return Heuristic(
+        name='mobility',
+        evaluation_function=evaluation_function,
+        batch_evaluation_function=batch_evaluation_function,
+        cache=cache,
+    )
+
+
+@pytest.mark.parametrize('policy', ['lru', 'clock'])
+def test_cached_values_are_evaluated_once(policy):
+    calls = []
+    heuristic = counting_heuristic(calls, evaluation_cache(1000, policy))
+    states = random_game(Reversi, None, 0)[:10]
+    values = [heuristic.evaluate(state) for state in states[:5]]
+    assert len(calls) == 5
+    assert [heuristic.evaluate(state) for state in states[:5]] == values
+    assert len(calls) == 5
+    # a batch evaluates only the states not in the cache
+    batch_values = heuristic.evaluate_batch(states)
+    assert len(calls) == 10
+    assert list(batch_values[:5]) == values
+    assert list(batch_values) == [best_mobility_function(state) for state in states]
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('policy', ['lru', 'clock'])
+def test_cache_keeps_the_move(engine, policy):
+    plain = MinimaxAlphaBetaStrategy(counting_heuristic([]), 3)
+    calls = []
+    cached = MinimaxAlphaBetaStrategy(counting_heuristic(calls, evaluation_cache(64, policy)), 3)
+    state = position_state(engine, '8x8 midgame')
+    assert cached.next_move(state).move_code == plain.next_move(position_state(engine, '8x8 midgame')).move_code
+    # a small cache evicts, and the values are still right
+    cache = cached.heuristic.cache
+    assert cache.evictions > 0
+    # and only the misses are evaluated
+    assert len(calls) == cache.misses
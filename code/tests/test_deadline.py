@@ -0,0 +1,133 @@
+"""
+Deadlines of the moves and forfeits of the matches.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import threading
+import time
+
+import pytest
+
+from game_infrastructure.game import (
+    Deadline,
+    DeadlineExceeded,
+    Player,
+    TwoPlayerGameState,
+    TwoPlayerMatch,
+)
+from game_infrastructure.reversi import BitboardReversi, from_array_to_dictionary_board
+from heuristic import Heuristic, best_mobility_function
+from strategy import (
+    IterativeDeepeningAlphaBetaStrategy,
+    MinimaxAlphaBetaStrategy,
+    RandomStrategy,
+    Strategy,
+)
+
+from conftest import POSITIONS
+
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+
+
+class RaisingStrategy(Strategy):
+    """Gives up on the move: its search did not finish in time."""
+
+    def next_move(self, state, gui=False, deadline=None):
+        raise DeadlineExceeded()
+
+
+class LateStrategy(Strategy):
+    """Ignores the deadline and returns a move after it has passed."""
+
+    def next_move(self, state, gui=False, deadline=None):
+        time.sleep(deadline.remaining() + 0.05)
+        return state.game.generate_successors(state)[0]
+
+
+def create_match(strategy1: Strategy, strategy2: Strategy, max_sec_per_move: float) -> TwoPlayerMatch:
+    board, label = POSITIONS['5x7 intermediate']
+    player1 = Player(name='player1', strategy=strategy1)
+    player2 = Player(name='player2', strategy=strategy2)
+    game = BitboardReversi(player1=player1, player2=player2, height=len(board), width=len(board[0]))
+    state = TwoPlayerGameState(
+        game=game,
+        board=from_array_to_dictionary_board(board),
+        initial_player=player1,
+    )
+    return TwoPlayerMatch(state, max_sec_per_move=max_sec_per_move, gui=False)
+
+
+def test_deadline_expires():
+    deadline = Deadline(0.05)
+    assert not deadline.expired() and 0 < deadline.remaining() <= 0.05
+    deadline.check()
+    time.sleep(0.06)
+    assert deadline.expired() and deadline.remaining() < 0
+    assert deadline.elapsed() >= 0.05
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+    # without a limit it only expires when cancelled
+    unlimited = Deadline()
+    assert not unlimited.expired() and unlimited.remaining() == float('inf')
+
+
+def test_cancel_and_parent():
+    parent = Deadline(60)
+    child = Deadline(0.05, parent=parent)
+    # the nearest of both
+    assert child.remaining() <= 0.05
+    assert Deadline(60, parent=Deadline(0.05)).remaining() <= 0.05
+    # cancelling the child leaves the parent running
+    child.cancel()
+    assert child.expired() and child.remaining() == 0.0
+    assert not parent.expired()
+    # cancelling the parent expires its children
+    other_child = Deadline(60, parent=parent)
+    parent.cancel()
+    assert other_child.expired() and other_child.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        other_child.check()
+
+
+@pytest.mark.parametrize('strategy_class', [RaisingStrategy, LateStrategy])
+def test_player_out_of_time_forfeits(strategy_class):
+    match = create_match(RandomStrategy(), strategy_class(), max_sec_per_move=0.2)
+    scores = match.play_match()
+    assert list(scores) == [0, -1]
+    assert match.n_plies == 1
+
+
+def test_iterative_deepening_returns_before_the_match_deadline():
+    """The strategy has more time than the match gives each move, and stops
+    safety_margin seconds before the deadline of the match."""
+    strategy = IterativeDeepeningAlphaBetaStrategy(heuristic, max_sec_per_move=60)
+    match = create_match(strategy, RandomStrategy(), max_sec_per_move=0.2)
+    scores = match.play_match()
+    # the discs at the end of the game, not a forfeit
+    assert sum(scores) > 0
+
+
+def test_concurrent_matches():
+    """Matches in threads keep their own deadlines: a player out of time
+    in one match does not stop the other."""
+    def play(match: TwoPlayerMatch, results: dict, name: str) -> None:
+        results[name] = match.play_match()
+
+    expected = create_match(
+        MinimaxAlphaBetaStrategy(heuristic, 2), MinimaxAlphaBetaStrategy(heuristic, 1), 60,
+    ).play_match()
+    matches = {
+        'search': create_match(MinimaxAlphaBetaStrategy(heuristic, 2), MinimaxAlphaBetaStrategy(heuristic, 1), 60),
+        'forfeit': create_match(RandomStrategy(), LateStrategy(), 0.2),
+    }
+    results: dict = {}
+    threads = [threading.Thread(target=play, args=(match, results, name)) for name, match in matches.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert list(results['search']) == list(expected)
+    assert list(results['forfeit']) == [0, -1]
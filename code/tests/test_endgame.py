@@ -0,0 +1,72 @@
+"""
+Endgame solver against an exhaustive search.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pytest
+
+from endgame import EndgameSolver
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from heuristic import Heuristic, best_mobility_function
+from strategy import MinimaxAlphaBetaStrategy, NegamaxPVSStrategy
+
+from conftest import POSITIONS, exhaustive_value, position_state, random_game
+
+
+ENGINES = [Reversi, BitboardReversi]
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+
+
+def endgame_states(engine: type) -> list:
+    """Fixed 5x7 endgame and the positions 8 plies before the end of a
+    few random games."""
+    states = [position_state(engine, '5x7 endgame')]
+    for name, seed in (('8x8 opening', 0), ('8x8 opening', 1), ('6x6 opening', 2)):
+        states.append(random_game(engine, POSITIONS[name][0], seed)[-9])
+    return states
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_solver_matches_exhaustive_search(engine):
+    for state in endgame_states(engine):
+        expected = exhaustive_value(state)
+        solver = EndgameSolver(max_empties=14)
+        assert solver.solve(state) == expected
+        # again with the bounds kept from the first solve
+        assert solver._bounds or solver.empties(state) < solver.table_empties
+        assert solver.solve(state) == expected
+        win_loss_draw = EndgameSolver(max_empties=14, win_loss_draw=True)
+        assert win_loss_draw.solve(state) == (expected > 0) - (expected < 0)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_fail_soft_bounds(engine):
+    state = position_state(engine, '5x7 endgame')
+    expected = exhaustive_value(state)
+    solver = EndgameSolver(max_empties=14)
+    assert solver.solve(state, expected, expected + 4) <= expected
+    assert solver.solve(state, expected - 4, expected) >= expected
+    assert solver.solve(state, expected - 1, expected + 1) == expected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('strategy_class', [MinimaxAlphaBetaStrategy, NegamaxPVSStrategy])
+def test_strategies_play_a_perfect_move(engine, strategy_class):
+    """Close to the end, the move chosen keeps the exact value."""
+    for state in endgame_states(engine):
+        expected = exhaustive_value(state)
+        strategy = strategy_class(heuristic, 1, endgame_solver=EndgameSolver(max_empties=14))
+        successor = strategy.next_move(state)
+        value = exhaustive_value(successor)
+        if successor.next_player.label != state.next_player.label:
+            value = -value
+        assert value == expected
+
+
+def test_applies_close_to_the_end():
+    solver = EndgameSolver()
+    assert solver.applies(position_state(Reversi, '5x7 endgame'))
+    assert not solver.applies(position_state(Reversi, '8x8 midgame'))
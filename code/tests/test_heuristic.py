@@ -0,0 +1,141 @@
+"""
+Batch evaluation of the heuristics against the scalar one.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import numpy as np
+import pytest
+
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from heuristic import *
+from strategy import MinimaxAlphaBetaStrategy, NegamaxPVSStrategy
+
+from conftest import POSITIONS, position_state, random_game
+
+
+# name: (scalar function, batch function)
+FUNCTIONS = {
+    'result_end_game': (result_end_game, result_end_game_batch),
+    'parity': (parity_function, parity_function_batch),
+    'corners': (corners_based_function, corners_based_function_batch),
+    'best_mobility': (best_mobility_function, best_mobility_function_batch),
+    'combined': (
+        lambda state: combined_based_function(
+            state, [corners_based_function, parity_function, best_mobility_function], [0.3, 0.3, 0.4],
+        ),
+        lambda batch: combined_based_function_batch(
+            batch, [corners_based_function_batch, parity_function_batch, best_mobility_function_batch], [0.3, 0.3, 0.4],
+        ),
+    ),
+}
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('name', ['8x8 opening', '6x6 opening', '5x7 intermediate'])
+@pytest.mark.parametrize('function', sorted(FUNCTIONS))
+def test_batch_matches_scalar(engine, name, function):
+    """Every position of a few random games, seen by either player as MAX."""
+    evaluation_function, batch_evaluation_function = FUNCTIONS[function]
+    heuristic = Heuristic(
+        name=function,
+        evaluation_function=evaluation_function,
+        batch_evaluation_function=batch_evaluation_function,
+    )
+    board, label = POSITIONS[name]
+    for seed in range(3):
+        states = random_game(engine, board, seed)
+        for state in states[1::2]:
+            state.player_max = state.next_player
+        expected = [heuristic.evaluate(state) for state in states]
+        np.testing.assert_allclose(heuristic.evaluate_batch(states), expected, rtol=1e-12, atol=1e-12)
+
+
+def counting_heuristic(calls: list) -> Heuristic:
+    """Combined heuristic that records the size of each batch it evaluates."""
+    evaluation_function, batch_evaluation_function = FUNCTIONS['combined']
+
+    def count_batch(batch: BoardBatch) -> np.ndarray:
+        calls.append(len(batch))
+        return batch_evaluation_function(batch)
+
+    return Heuristic(
+        name='combined',
+        evaluation_function=evaluation_function,
+        batch_evaluation_function=count_batch,
+    )
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('strategy_class', [MinimaxAlphaBetaStrategy, NegamaxPVSStrategy])
+@pytest.mark.parametrize('name', ['8x8 midgame', '5x7 intermediate'])
+def test_batched_leaves_play_the_same_move(engine, strategy_class, name):
+    moves = {}
+    for batch_leaves in (None, True, False):
+        calls = []
+        strategy = strategy_class(counting_heuristic(calls), 3, batch_leaves=batch_leaves)
+        moves[batch_leaves] = strategy.next_move(position_state(engine, name)).move_code
+        # batched by default only on the dict board
+        batched = batch_leaves if batch_leaves is not None else engine is Reversi
+        assert bool(calls) == batched
+    assert moves[None] == moves[True] == moves[False]
+
+
+class WindowRecordingPVS(NegamaxPVSStrategy):
+    """PVS that records the window of the nodes whose leaves it batches."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.windows = []
+        self.batched_windows = []
+
+    def _negamax(self, state, depth, alpha, beta, color):
+        self.windows.append((alpha, beta))
+        try:
+            return super()._negamax(state, depth, alpha, beta, color)
+        finally:
+            self.windows.pop()
+
+    def _leaf_values(self, state, moves):
+        self.batched_windows.append(self.windows[-1])
+        return super()._leaf_values(state, moves)
+
+
+def test_pvs_does_not_batch_null_windows():
+    strategy = WindowRecordingPVS(counting_heuristic([]), 3, batch_leaves=True)
+    strategy.next_move(position_state(Reversi, '8x8 midgame'))
+    assert strategy.batched_windows
+    assert all(beta - alpha > strategy.null_window for alpha, beta in strategy.batched_windows)
+
+
+def successor_gains_reference(state) -> list:
+    """Change of result_end_game in each successor, building them (as the
+    capture heuristics did before move_effects)."""
+    actual_score = result_end_game(state)
+    return [result_end_game(successor) - actual_score for successor in state.game.generate_successors(state)]
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('name', ['8x8 opening', '5x7 intermediate'])
+def test_capture_heuristics_match_the_successors(engine, name):
+    for seed in range(2):
+        for state in random_game(engine, POSITIONS[name][0], seed):
+            for player_max in (state.game.player1, state.game.player2):
+                state.player_max = player_max
+                if state.end_of_game:
+                    continue
+                gains = successor_gains_reference(state)
+                assert successors_gains(state) == gains
+                assert maximize_possibly_captured_pieces(state) == sum(gains)
+                assert maximize_captured_piece(state) == max([0] + gains)
+                assert ponderation_maximize(state, 0.1, 0.2, 0.3, 0.4) == pytest.approx(
+                    0.1 * result_end_game(state) + 0.2 * max([0] + gains) + 0.3 * sum(gains)
+                    + 0.4 * corners_based_function(state)
+                )
+                state_next = state.clone()
+                state_next.next_player = state.game.opponent(state.next_player)
+                state_next.hash_key = None
+                assert complex_evaluation_function(state) == (
+                    len(state.game.generate_successors(state_next)) - len(state.game.generate_successors(state))
+                )
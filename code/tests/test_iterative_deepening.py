@@ -0,0 +1,53 @@
+"""
+Iterative deepening within a time budget.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import time
+
+import numpy as np
+import pytest
+
+from game_infrastructure.game import TwoPlayerGameState
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from heuristic import Heuristic, best_mobility_function
+from strategy import IterativeDeepeningAlphaBetaStrategy, MinimaxAlphaBetaStrategy
+
+from conftest import position_state
+
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+
+
+def root_values(state: TwoPlayerGameState, depth: int) -> dict:
+    """Alpha-beta value of each move of the state at the depth."""
+    strategy = MinimaxAlphaBetaStrategy(heuristic, depth)
+    strategy._new_search(state)
+    return {
+        successor.move_code: strategy._min_value(successor, depth, -np.inf, np.inf)
+        for successor in strategy.generate_successors(state)
+    }
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 intermediate'])
+def test_reaches_max_depth_with_time(engine, name):
+    strategy = IterativeDeepeningAlphaBetaStrategy(heuristic, max_sec_per_move=60, max_depth_minimax=3)
+    move = strategy.next_move(position_state(engine, name)).move_code
+    assert strategy.depth_reached == 3
+    # the best move of alpha-beta at that depth (or one as good)
+    values = root_values(position_state(engine, name), 3)
+    assert values[move] == max(values.values())
+
+
+def test_stops_within_budget():
+    state = position_state(BitboardReversi, '8x8 midgame')
+    moves = [successor.move_code for successor in state.game.generate_successors(state)]
+    strategy = IterativeDeepeningAlphaBetaStrategy(heuristic, max_sec_per_move=0.3)
+    start = time.perf_counter()
+    move = strategy.next_move(state).move_code
+    assert time.perf_counter() - start < 0.3 + 0.2
+    assert 0 <= strategy.depth_reached < strategy.max_depth_minimax
+    assert move in moves
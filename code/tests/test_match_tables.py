@@ -0,0 +1,112 @@
+"""
+Search tables kept between the moves of a match.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pytest
+
+from endgame import EndgameSolver
+from game_infrastructure.game import Player, TwoPlayerGameState, TwoPlayerMatch
+from game_infrastructure.reversi import BitboardReversi, from_array_to_dictionary_board
+from heuristic import Heuristic, best_mobility_function
+from move_ordering import MoveOrdering
+from strategy import MinimaxAlphaBetaStrategy, NegamaxPVSStrategy, Strategy
+from transposition import TranspositionTable
+
+from conftest import POSITIONS, position_state
+
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+
+
+def table_sizes(strategy: MinimaxAlphaBetaStrategy) -> tuple:
+    """Entries of the transposition table, history of the move ordering
+    and bounds of the endgame solver."""
+    return (
+        len(strategy.transposition_table),
+        len(strategy.move_ordering._history),
+        len(strategy.endgame_solver._bounds),
+    )
+
+
+class RecordingMixin(object):
+    """Records the sizes of the tables when each search starts."""
+
+    def _new_search(self, state, deadline=None):
+        super()._new_search(state, deadline)
+        self.sizes.append(table_sizes(self))
+
+
+class RecordingAlphaBeta(RecordingMixin, MinimaxAlphaBetaStrategy):
+    pass
+
+
+class RecordingPVS(RecordingMixin, NegamaxPVSStrategy):
+    pass
+
+
+class FailingStrategy(Strategy):
+
+    def next_move(self, state, gui=False, deadline=None):
+        raise RuntimeError('no move')
+
+
+def recording_strategy(strategy_class: type) -> MinimaxAlphaBetaStrategy:
+    strategy = strategy_class(
+        heuristic,
+        2,
+        transposition_table=TranspositionTable(),
+        move_ordering=MoveOrdering(),
+        endgame_solver=EndgameSolver(max_empties=8),
+    )
+    strategy.sizes = []
+    return strategy
+
+
+def create_match(strategy1: Strategy, strategy2: Strategy) -> TwoPlayerMatch:
+    board, label = POSITIONS['5x7 intermediate']
+    player1 = Player(name='player1', strategy=strategy1)
+    player2 = Player(name='player2', strategy=strategy2)
+    game = BitboardReversi(player1=player1, player2=player2, height=len(board), width=len(board[0]))
+    state = TwoPlayerGameState(
+        game=game,
+        board=from_array_to_dictionary_board(board),
+        initial_player=player1,
+    )
+    return TwoPlayerMatch(state, max_sec_per_move=60, gui=False)
+
+
+@pytest.mark.parametrize('strategy_class', [RecordingAlphaBeta, RecordingPVS])
+def test_tables_are_kept_during_the_match(strategy_class):
+    strategy = recording_strategy(strategy_class)
+    match = create_match(strategy, MinimaxAlphaBetaStrategy(heuristic, 1))
+    match.play_match()
+    # empty for the first move, then kept (some moves may be forced)
+    assert strategy.sizes[0] == (0, 0, 0)
+    assert all(size[0] > 0 and size[1] > 0 for size in strategy.sizes[2:])
+    # endgame bounds reach the last moves
+    assert any(size[2] > 0 for size in strategy.sizes)
+    # and released at the end
+    assert table_sizes(strategy) == (0, 0, 0)
+    assert not strategy._in_match
+
+
+def test_tables_are_cleared_when_the_match_fails():
+    strategy = recording_strategy(RecordingAlphaBeta)
+    match = create_match(strategy, FailingStrategy())
+    with pytest.raises(RuntimeError):
+        match.play_match()
+    assert len(strategy.sizes) == 1
+    assert table_sizes(strategy) == (0, 0, 0)
+    assert not strategy._in_match
+
+
+@pytest.mark.parametrize('strategy_class', [RecordingAlphaBeta, RecordingPVS])
+def test_searches_out_of_a_match_start_from_scratch(strategy_class):
+    strategy = recording_strategy(strategy_class)
+    for name in ('5x7 endgame', '5x7 endgame', '8x8 midgame'):
+        strategy.next_move(position_state(BitboardReversi, name))
+        assert any(table_sizes(strategy))
+    assert strategy.sizes == [(0, 0, 0)] * 3
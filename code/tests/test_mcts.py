@@ -0,0 +1,135 @@
+"""
+Monte Carlo tree search against the engines.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import random
+
+import pytest
+
+from game_infrastructure.game import TwoPlayerGameState
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from strategy import MCTSStrategy
+
+from conftest import exhaustive_value, position_state, random_game
+
+
+ENGINES = [Reversi, BitboardReversi]
+
+BOARD_4X4 = [
+    '....',
+    '.WB.',
+    '.BW.',
+    '....',
+]
+
+
+def final_differences(state: TwoPlayerGameState, label: str) -> set:
+    """Disc differences for the player of the label at the end of every
+    game that can be played from the state."""
+    if state.end_of_game:
+        own = sum(1 for square_label in state.board.values() if square_label == label)
+        return {own - (len(state.board) - own)}
+    game = state.game
+    differences = set()
+    for move in game.legal_moves(state):
+        undo = game.make_move(state, move)
+        try:
+            differences |= final_differences(state, label)
+        finally:
+            game.unmake_move(state, undo)
+    return differences
+
+
+def endgame_states(engine: type) -> list:
+    """4x4 positions close to the end in which the choice of the move
+    decides who wins: some moves win and some do not."""
+    states = []
+    for seed in range(40):
+        for state in random_game(engine, BOARD_4X4, seed)[-6:-1]:
+            state.player_max = state.next_player
+            values = []
+            for move in state.game.legal_moves(state):
+                undo = state.game.make_move(state, move)
+                try:
+                    value = exhaustive_value(state)
+                    values.append(value if state.next_player.label != state.player_max.label else -value)
+                finally:
+                    state.game.unmake_move(state, undo)
+            if max(values) > 0 >= min(values):
+                states.append(state)
+    return states
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_playouts_end_as_the_engine_games(engine):
+    strategy = MCTSStrategy(max_iterations=1)
+    random.seed(0)
+    for seed in range(5):
+        for state in random_game(engine, BOARD_4X4, seed)[-5:-1]:
+            own, opponent = strategy._bitboards(state)
+            expected = final_differences(state, state.next_player.label)
+            differences = {strategy._playout(own, opponent) for playout in range(100)}
+            assert differences <= expected
+            if len(state.board) == 15:
+                # a single game left: the playout has to be that one
+                assert differences == expected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_backpropagation_sign(engine):
+    """After one iteration, the path counts the playout as a win for the
+    player who moved to each node, alternately."""
+    state = next(
+        state for state in random_game(engine, BOARD_4X4, 0)
+        if len(state.board) == 15 and not state.end_of_game
+    )
+    strategy = MCTSStrategy(max_iterations=1)
+    own, opponent = strategy._bitboards(state)
+    strategy._new_tree()
+    strategy._add_node(own, opponent, 0, -1)
+    strategy._expand(0)
+    strategy._iterate()
+    child = strategy._first_child[0]
+    (difference,) = final_differences(state, state.next_player.label)
+    # the root player made the move to the child
+    expected = 1.0 if difference > 0 else 0.0 if difference < 0 else 0.5
+    assert (strategy._visits[0], strategy._visits[child]) == (1, 1)
+    assert strategy._wins[child] == expected
+    assert strategy._wins[0] == 1.0 - expected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_finds_the_winning_moves(engine):
+    states = endgame_states(engine)[:5]
+    assert states
+    random.seed(0)
+    for state in states:
+        successor = MCTSStrategy(max_iterations=400).next_move(state)
+        value = exhaustive_value(successor)
+        if successor.next_player.label != state.next_player.label:
+            value = -value
+        assert value > 0
+
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_max_iterations_bounds_the_playouts(n_workers):
+    strategy = MCTSStrategy(max_iterations=50, n_workers=n_workers)
+    try:
+        strategy.next_move(position_state(BitboardReversi, '8x8 midgame'))
+        assert strategy.search_nodes() == 50 * n_workers
+        assert strategy.statistics.playouts == 50 * n_workers
+    finally:
+        strategy.close()
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 intermediate', '5x7 endgame'])
+def test_moves_are_legal(engine, name):
+    state = position_state(engine, name)
+    moves = [successor.move_code for successor in state.game.generate_successors(state)]
+    successor = MCTSStrategy(max_iterations=30).next_move(state)
+    assert successor.move_code in moves
+    assert successor.board != state.board
@@ -0,0 +1,62 @@
+"""
+Move ordering of the alpha-beta strategies.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pytest
+
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from heuristic import Heuristic, best_mobility_function
+from move_ordering import MoveOrdering, reversi_square_values
+from strategy import MinimaxAlphaBetaStrategy
+
+from conftest import position_state
+
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+
+
+def test_square_values():
+    values = reversi_square_values(8, 8)
+    assert values[(1, 1)] > values[(1, 4)] > values[(4, 4)] > values[(1, 2)] > values[(2, 2)]
+    assert values == {(x, y): values[(9 - x, y)] for x, y in values}
+
+
+def test_pv_then_killers_then_history():
+    state = position_state(Reversi, '8x8 midgame')
+    moves = state.game.legal_moves(state)
+    ordering = MoveOrdering(square_values=False)
+    history_move, killer_move, pv_move = moves[0], moves[1], moves[2]
+    ordering.record_cutoff(state, history_move, 5, 3)
+    ordering.record_cutoff(state, killer_move, 2, 1)
+    ordered = ordering.order(state, list(moves), 2, pv_move)
+    assert ordered[:3] == [pv_move, killer_move, history_move]
+    assert sorted(ordered) == sorted(moves)
+    # killers are per ply and forgotten by a new search; history ages
+    assert ordering.order(state, list(moves), 3)[0] == history_move
+    ordering.new_search()
+    assert ordering.order(state, list(moves), 2)[0] == history_move
+    ordering.clear()
+    assert ordering.order(state, list(moves), 2) == moves
+
+
+def test_killers_are_bounded():
+    state = position_state(Reversi, '8x8 midgame')
+    moves = state.game.legal_moves(state)
+    ordering = MoveOrdering(n_killers=2, history=False, square_values=False)
+    for move in moves[:3]:
+        ordering.record_cutoff(state, move, 1, 1)
+    assert ordering.order(state, list(moves), 1)[:2] == [moves[2], moves[1]]
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 intermediate'])
+def test_ordering_keeps_the_move_and_saves_nodes(engine, name):
+    plain = MinimaxAlphaBetaStrategy(heuristic, 3)
+    ordered = MinimaxAlphaBetaStrategy(heuristic, 3, move_ordering=MoveOrdering())
+    plain_move = plain.next_move(position_state(engine, name)).move_code
+    ordered_move = ordered.next_move(position_state(engine, name)).move_code
+    assert ordered_move == plain_move
+    assert ordered.statistics.nodes <= plain.statistics.nodes
@@ -0,0 +1,59 @@
+"""
+Negamax principal variation search against alpha-beta.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pytest
+
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from heuristic import *
+from move_ordering import MoveOrdering
+from strategy import MinimaxAlphaBetaStrategy, NegamaxPVSStrategy
+from transposition import TranspositionTable
+
+from conftest import position_state
+
+
+heuristic = Heuristic(
+    name='corners_parity_mobility',
+    evaluation_function=lambda state: combined_based_function(
+        state, [corners_based_function, parity_function, best_mobility_function], [0.3, 0.3, 0.4],
+    ),
+)
+
+# name: function (depth) -> strategy that should play the move of alpha-beta
+STRATEGIES = {
+    'pvs': lambda depth: NegamaxPVSStrategy(heuristic, depth),
+    'pvs_ordering': lambda depth: NegamaxPVSStrategy(heuristic, depth, move_ordering=MoveOrdering()),
+    'pvs_tt_ordering': lambda depth: NegamaxPVSStrategy(
+        heuristic, depth, transposition_table=TranspositionTable(), move_ordering=MoveOrdering(),
+    ),
+}
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 intermediate'])
+@pytest.mark.parametrize('strategy', sorted(STRATEGIES))
+def test_pvs_matches_alphabeta(engine, name, strategy):
+    alphabeta = MinimaxAlphaBetaStrategy(heuristic, 3)
+    expected = alphabeta.next_move(position_state(engine, name)).move_code
+    pvs = STRATEGIES[strategy](3)
+    assert pvs.next_move(position_state(engine, name)).move_code == expected
+    assert pvs.statistics.nodes <= alphabeta.statistics.nodes
+
+
+def test_aspiration_window_keeps_the_moves():
+    """Over the moves of a game, searched also after failed windows."""
+    pvs = NegamaxPVSStrategy(heuristic, 3, aspiration_window=0.01)
+    alphabeta = MinimaxAlphaBetaStrategy(heuristic, 3)
+    state = position_state(BitboardReversi, '6x6 opening')
+    for ply in range(8):
+        if state.end_of_game:
+            break
+        state.player_max = state.next_player
+        successor = alphabeta.next_move(state)
+        assert pvs.next_move(state).move_code == successor.move_code
+        state = successor
+    assert pvs.aspiration_failures > 0
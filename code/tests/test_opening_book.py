@@ -0,0 +1,134 @@
+"""
+Opening book built offline and read at play time.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pickle
+
+import numpy as np
+import pytest
+
+from game_infrastructure.game import TwoPlayerGameState
+from game_infrastructure.reversi import (
+    BitboardReversi,
+    Reversi,
+    create_reversi_state,
+    from_dictionary_to_array_board,
+)
+from heuristic import Heuristic, best_mobility_function
+from opening_book import OpeningBook, build_opening_book
+from strategy import MinimaxAlphaBetaStrategy
+
+from conftest import position_state
+
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+BOOK_DEPTH = 2
+BOOK_PLIES = 3
+
+
+@pytest.fixture(scope='module')
+def book_path(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp('book') / '6x6.book')
+    state = position_state(BitboardReversi, '6x6 opening')
+    n_positions = build_opening_book(path, state, BOOK_PLIES, MinimaxAlphaBetaStrategy(heuristic, BOOK_DEPTH))
+    assert n_positions == len(OpeningBook(path)) > 1
+    return path
+
+
+def book_positions(engine: type) -> list:
+    """Positions of the first plies of the 6x6 game, with the player to move as MAX."""
+    positions = []
+
+    def expand(state: TwoPlayerGameState, ply: int) -> None:
+        if ply >= BOOK_PLIES:
+            return
+        state.player_max = state.next_player
+        positions.append(state)
+        for successor in state.game.generate_successors(state):
+            expand(successor, ply + 1)
+
+    expand(position_state(engine, '6x6 opening'), 0)
+    return positions
+
+
+def root_values(state: TwoPlayerGameState, depth: int) -> dict:
+    """Alpha-beta value of the square of each move of the state."""
+    strategy = MinimaxAlphaBetaStrategy(heuristic, depth)
+    strategy._new_search(state)
+    return {
+        (set(successor.board) - set(state.board)).pop(): strategy._min_value(successor, depth, -np.inf, np.inf)
+        for successor in strategy.generate_successors(state)
+    }
+
+
+def symmetric_state(state: TwoPlayerGameState, symmetry: int) -> TwoPlayerGameState:
+    game = state.game
+    board = {game.symmetries.square(square, symmetry): label for square, label in state.board.items()}
+    board_array = from_dictionary_to_array_board(board, game.height, game.width)
+    return create_reversi_state(type(game), board_array, state.next_player.label)
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+def test_book_moves_are_the_best_moves(book_path, engine):
+    book = OpeningBook(book_path)
+    positions = book_positions(engine)
+    for state in positions:
+        values = root_values(state, BOOK_DEPTH)
+        move = book.lookup(state)
+        # the move of the strategy, or one as good in a symmetric position
+        assert values[move] == max(values.values())
+    assert (book.hits, book.misses) == (len(positions), 0)
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+def test_symmetric_positions_share_the_entry(book_path, engine):
+    book = OpeningBook(book_path)
+    # a position none of whose symmetries leaves it unchanged
+    state = next(
+        state for state in book_positions(engine)
+        if len({frozenset(symmetric_state(state, s).board.items()) for s in range(len(state.game.symmetries))})
+        == len(state.game.symmetries)
+    )
+    move = book.lookup(state)
+    for symmetry in range(len(state.game.symmetries)):
+        assert book.lookup(symmetric_state(state, symmetry)) == state.game.symmetries.square(move, symmetry)
+
+
+def test_strategy_plays_the_book_move(book_path):
+    book = OpeningBook(book_path)
+    strategy = MinimaxAlphaBetaStrategy(heuristic, 4, opening_book=book)
+    state = position_state(BitboardReversi, '6x6 opening')
+    successor = strategy.next_move(state)
+    assert book.lookup(state) in set(successor.board) - set(state.board)
+    # without searching
+    assert strategy.search_nodes() == 0
+    # out of the book, it searches
+    out_of_book = position_state(BitboardReversi, '5x7 intermediate')
+    strategy.next_move(out_of_book)
+    assert strategy.search_nodes() > 0
+
+
+def test_other_positions_are_not_looked_up(book_path):
+    book = OpeningBook(book_path)
+    assert book.lookup(position_state(Reversi, '8x8 opening')) is None
+    assert book.lookup(position_state(Reversi, '5x7 intermediate')) is None
+    assert (book.hits, book.misses) == (0, 0)
+
+
+def test_pickled_book_maps_the_file_again(book_path):
+    book = OpeningBook(book_path)
+    state = position_state(Reversi, '6x6 opening')
+    move = book.lookup(state)
+    copy = pickle.loads(pickle.dumps(book))
+    assert copy.lookup(state) == move
+    assert (copy.hits, len(copy)) == (2, len(book))
+
+
+def test_not_a_book(tmp_path):
+    path = tmp_path / 'not.book'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
@@ -0,0 +1,52 @@
+"""
+Root-split parallel alpha-beta.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pytest
+
+from game_infrastructure.reversi import BitboardReversi, Reversi
+from heuristic import *
+from strategy import MinimaxAlphaBetaStrategy, ParallelAlphaBetaStrategy
+
+from conftest import position_state
+
+
+# a lambda, which the workers can not unpickle if it is sent to them
+heuristic = Heuristic(
+    name='corners_mobility',
+    evaluation_function=lambda state: best_mobility_function(state) + 0.5 * corners_based_function(state),
+)
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 intermediate'])
+def test_parallel_matches_alphabeta(engine, name):
+    expected = MinimaxAlphaBetaStrategy(heuristic, 3).next_move(position_state(engine, name)).move_code
+    strategy = ParallelAlphaBetaStrategy(heuristic, 3, n_workers=2)
+    try:
+        assert strategy.next_move(position_state(engine, name)).move_code == expected
+        # the workers count their nodes too
+        assert strategy.statistics.nodes > 0
+    finally:
+        strategy.close()
+    assert strategy._executor is None
+
+
+def test_workers_keep_the_game_of_the_match():
+    """Moves of one game reuse the pool; another game starts a new one."""
+    strategy = ParallelAlphaBetaStrategy(heuristic, 2, n_workers=2)
+    try:
+        state = position_state(BitboardReversi, '6x6 opening')
+        successor = strategy.next_move(state)
+        executor = strategy._executor
+        reply = state.game.generate_successors(successor)[0]
+        reply.player_max = reply.next_player
+        strategy.next_move(reply)
+        assert strategy._executor is executor
+        strategy.next_move(position_state(BitboardReversi, '6x6 opening'))
+        assert strategy._executor is not executor
+    finally:
+        strategy.close()
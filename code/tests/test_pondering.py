@@ -0,0 +1,118 @@
+"""
+Pondering on the opponent's time.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+from game_infrastructure.game import Player, TwoPlayerGameState, TwoPlayerMatch
+from game_infrastructure.reversi import BitboardReversi, from_array_to_dictionary_board
+from heuristic import Heuristic, best_mobility_function
+from strategy import IterativeDeepeningAlphaBetaStrategy, MinimaxAlphaBetaStrategy, PonderingStrategy
+
+from conftest import POSITIONS, position_state
+
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+
+
+def after_reply(successor: TwoPlayerGameState, reply) -> TwoPlayerGameState:
+    """State after the opponent plays the reply to our move."""
+    state = successor.detach()
+    state.board = state.board.copy()
+    state.game.make_move(state, reply)
+    return state
+
+
+def first_moves(strategy: PonderingStrategy, expected: bool) -> TwoPlayerGameState:
+    """Play our move in the 5x7 position and the expected reply (or
+    another one), and return the state reached."""
+    successor = strategy.next_move(position_state(BitboardReversi, '5x7 intermediate'))
+    found, reply = strategy.strategy.expected_reply(successor)
+    assert found and strategy._ponder is not None
+    if not expected:
+        reply = next(move for move in successor.game.legal_moves(successor) if move != reply)
+    return after_reply(successor, reply)
+
+
+def plain_move(state: TwoPlayerGameState):
+    return MinimaxAlphaBetaStrategy(heuristic, 3).next_move(state).move_code
+
+
+def test_hit_plays_the_move_of_the_strategy():
+    strategy = PonderingStrategy(MinimaxAlphaBetaStrategy(heuristic, 3), max_sec_ponder=60)
+    try:
+        state = first_moves(strategy, expected=True)
+        assert strategy.next_move(state).move_code == plain_move(state)
+        assert (strategy.statistics.hits, strategy.statistics.misses) == (1, 0)
+        # found by the worker, not searched again
+        assert not strategy._searched
+        assert strategy.search_nodes() == 0
+    finally:
+        strategy.close()
+
+
+def test_iterative_deepening_to_its_max_depth_completes():
+    strategy = PonderingStrategy(
+        IterativeDeepeningAlphaBetaStrategy(heuristic, max_sec_per_move=60, max_depth_minimax=3),
+        max_sec_ponder=60,
+    )
+    try:
+        state = first_moves(strategy, expected=True)
+        successor = strategy.next_move(state)
+        assert not strategy._searched
+        assert successor.move_code in [s.move_code for s in state.game.generate_successors(state)]
+    finally:
+        strategy.close()
+
+
+def test_hit_cut_short_is_searched_again():
+    # no time to ponder: the fixed-depth search in the worker can not finish
+    strategy = PonderingStrategy(MinimaxAlphaBetaStrategy(heuristic, 3), max_sec_ponder=0)
+    try:
+        state = first_moves(strategy, expected=True)
+        assert strategy.next_move(state).move_code == plain_move(state)
+        assert strategy.statistics.hits == 1
+        assert strategy._searched
+        assert strategy.statistics.seconds_saved == 0
+    finally:
+        strategy.close()
+
+
+def test_miss_drops_the_ponder_search():
+    strategy = PonderingStrategy(MinimaxAlphaBetaStrategy(heuristic, 3), max_sec_ponder=60)
+    try:
+        state = first_moves(strategy, expected=False)
+        generation = strategy._generation.value
+        assert strategy.next_move(state).move_code == plain_move(state)
+        assert (strategy.statistics.hits, strategy.statistics.misses) == (0, 1)
+        assert strategy._searched
+        # the worker was told to stop, then given the next position
+        assert strategy._generation.value == generation + 2
+    finally:
+        strategy.close()
+
+
+def test_no_worker_left_after_the_match():
+    board, label = POSITIONS['5x7 intermediate']
+    pondering = PonderingStrategy(MinimaxAlphaBetaStrategy(heuristic, 2), max_sec_ponder=60)
+    player1 = Player(name='player1', strategy=pondering)
+    player2 = Player(name='player2', strategy=MinimaxAlphaBetaStrategy(heuristic, 1))
+    game = BitboardReversi(player1=player1, player2=player2, height=len(board), width=len(board[0]))
+    state = TwoPlayerGameState(
+        game=game,
+        board=from_array_to_dictionary_board(board),
+        initial_player=player1,
+    )
+    match = TwoPlayerMatch(state, max_sec_per_move=60, gui=False)
+    match.play_match()
+    assert pondering.statistics.ponders > 0
+    assert pondering._executor is None and pondering._ponder is None
+
+    # close() stops the worker process as well
+    strategy = PonderingStrategy(MinimaxAlphaBetaStrategy(heuristic, 2), max_sec_ponder=60)
+    first_moves(strategy, expected=True)
+    processes = list(strategy._executor._processes.values())
+    strategy.close()
+    assert strategy._executor is None
+    assert not any(process.is_alive() for process in processes)
@@ -0,0 +1,164 @@
+"""
+Reversi engines: the bitboards against the dict board.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import pickle
+import random
+
+import pytest
+
+from game_infrastructure.game import LRUCache, TwoPlayerGame, TwoPlayerGameState
+from game_infrastructure.reversi import BitboardReversi, Reversi, create_reversi_state
+from heuristic import Heuristic, best_mobility_function
+from perft import divide, perft, perft_make_unmake, standard_counts
+from strategy import MinimaxAlphaBetaStrategy
+
+from conftest import POSITIONS, position_state, random_game
+
+
+ENGINES = [Reversi, BitboardReversi]
+
+
+def successors_by_move(state: TwoPlayerGameState) -> dict:
+    return {str(successor.move_code): successor for successor in state.game.generate_successors(state)}
+
+
+@pytest.mark.parametrize('name', ['8x8 opening', '6x6 opening', '5x7 intermediate'])
+def test_engines_play_the_same_games(name):
+    """Random games played on both engines at once go through the same
+    positions, hashes and scores."""
+    board, label = POSITIONS[name]
+    rng = random.Random(0)
+    for game_number in range(5):
+        dict_state, bitboard_state = [create_reversi_state(engine, board, label) for engine in ENGINES]
+        while True:
+            assert dict(bitboard_state.board) == dict(dict_state.board)
+            assert bitboard_state.hash_key == dict_state.hash_key
+            assert bitboard_state.end_of_game == dict_state.end_of_game
+            if dict_state.end_of_game:
+                assert list(bitboard_state.scores) == list(dict_state.scores)
+                break
+            dict_successors = successors_by_move(dict_state)
+            bitboard_successors = successors_by_move(bitboard_state)
+            assert dict_successors.keys() == bitboard_successors.keys()
+            move = rng.choice(sorted(dict_successors))
+            dict_state, bitboard_state = dict_successors[move], bitboard_successors[move]
+
+
+class DefaultMovesReversi(Reversi):
+    """Reversi with the incremental interface of TwoPlayerGame, built on
+    generate_successors."""
+    legal_moves = TwoPlayerGame.legal_moves
+    make_move = TwoPlayerGame.make_move
+    unmake_move = TwoPlayerGame.unmake_move
+
+
+@pytest.mark.parametrize('engine', ENGINES + [DefaultMovesReversi])
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 endgame'])
+def test_make_unmake_move(engine, name):
+    """Each move leads to its successor and is undone exactly."""
+    state = position_state(engine, name)
+    game = state.game
+    board = dict(state.board)
+    hash_key = state.hash_key
+    successors = game.generate_successors(state)
+    moves = game.legal_moves(state)
+    assert len(moves) == len(successors)
+    for move, successor in zip(moves, successors):
+        undo = game.make_move(state, move)
+        assert dict(state.board) == dict(successor.board)
+        assert state.next_player is successor.next_player
+        assert state.hash_key == successor.hash_key
+        assert state.end_of_game == successor.end_of_game
+        game.unmake_move(state, undo)
+        assert dict(state.board) == board
+        assert state.hash_key == hash_key
+
+
+@pytest.mark.parametrize('name', ['6x6 opening', '5x7 intermediate'])
+def test_search_on_default_moves(name):
+    """The alpha-beta strategies work on games that only define
+    generate_successors."""
+    heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+    moves = [
+        MinimaxAlphaBetaStrategy(heuristic, 3).next_move(position_state(engine, name)).move_code
+        for engine in (Reversi, DefaultMovesReversi)
+    ]
+    assert moves[0] == moves[1]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_board_cache_gives_the_computed_values(engine):
+    """Moves, coins and end of game of the cached boards are the ones
+    computed from scratch, and the cache stays within its size."""
+    for seed in range(3):
+        states = random_game(engine, POSITIONS['6x6 opening'][0], seed)
+        game = states[0].game
+        game.board_cache = LRUCache(8)
+        for state in states:
+            assert game._board_info(state.board) == game._compute_board_info(state.board)
+            # the second lookup of the board is a hit
+            hits = game.board_cache.hits
+            assert game._board_info(state.board) == game._compute_board_info(state.board)
+            assert game.board_cache.hits == hits + 1
+            assert len(game.board_cache) <= 8
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_board_cache_is_not_pickled(engine):
+    state = position_state(engine, '8x8 midgame')
+    state.game.legal_moves(state)
+    assert len(state.game.board_cache) > 0
+    game = pickle.loads(pickle.dumps(state.game))
+    assert len(game.board_cache) == 0
+    assert game.board_cache.max_entries == state.game.board_cache.max_entries
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_uncached_boards(engine):
+    cached = position_state(engine, '5x7 intermediate')
+    uncached = position_state(engine, '5x7 intermediate')
+    uncached.game.board_cache = None
+    assert successors_by_move(uncached).keys() == successors_by_move(cached).keys()
+    end_of_game, scores = uncached.game.score(uncached)
+    assert (end_of_game, list(scores)) == (cached.end_of_game, list(cached.scores))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 intermediate'])
+def test_symmetries_round_trip(engine, name):
+    state = position_state(engine, name)
+    game = state.game
+    symmetries = game.symmetries
+    assert len(symmetries) == (8 if game.height == game.width else 4)
+    own, opponent = game._position_bits(state.board, state.next_player.label)
+    canonical = symmetries.canonical(own, opponent)
+    assert game.canonical_form(state) == canonical
+    for symmetry in range(len(symmetries)):
+        for square in symmetries.layout.squares:
+            image = symmetries.square(square, symmetry)
+            assert symmetries.inverse_square(image, symmetry) == square
+            assert symmetries.apply(symmetries.layout.bits[square], symmetry) == symmetries.layout.bits[image]
+        # every image of the position has the same canonical form
+        image_own, image_opponent = symmetries.apply(own, symmetry), symmetries.apply(opponent, symmetry)
+        assert symmetries.canonical(image_own, image_opponent)[:2] == canonical[:2]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('depth', [1, 2, 3, 4, 5])
+def test_perft_standard_board(engine, depth):
+    assert perft(create_reversi_state(engine), depth) == standard_counts[depth]
+    assert perft_make_unmake(create_reversi_state(engine), depth) == standard_counts[depth]
+
+
+@pytest.mark.parametrize('name', ['6x6 opening', '5x7 intermediate', '5x7 endgame'])
+def test_engines_agree_on_perft(name):
+    counts = [perft(position_state(engine, name), 4) for engine in ENGINES]
+    counts += [perft_make_unmake(position_state(engine, name), 4) for engine in ENGINES]
+    assert len(set(counts)) == 1
+    divisions = [divide(position_state(engine, name), 4) for engine in ENGINES]
+    assert divisions[0] == divisions[1]
+    assert sum(divisions[0].values()) == counts[0]
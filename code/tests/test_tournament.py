@@ -0,0 +1,101 @@
+"""
+Tournaments of the heuristics.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import json
+
+from game_infrastructure.game import Player, TwoPlayerGameState, TwoPlayerMatch
+from game_infrastructure.reversi import BitboardReversi, from_array_to_dictionary_board
+from game_infrastructure.tournament import StudentHeuristic, Tournament
+from heuristic import best_mobility_function, corners_based_function
+
+from conftest import POSITIONS
+
+
+class HeuristicMobility(StudentHeuristic):
+
+    def get_name(self) -> str:
+        return "mobility"
+
+    def evaluation_function(self, state: TwoPlayerGameState) -> float:
+        return best_mobility_function(state)
+
+
+class HeuristicCorners(StudentHeuristic):
+
+    def get_name(self) -> str:
+        return "corners"
+
+    def evaluation_function(self, state: TwoPlayerGameState) -> float:
+        return corners_based_function(state)
+
+
+def create_match(player1: Player, player2: Player) -> TwoPlayerMatch:
+    """As create_match of tournament.py, on the 5x7 board."""
+    board, label = POSITIONS['5x7 intermediate']
+    game = BitboardReversi(player1=player1, player2=player2, height=len(board), width=len(board[0]))
+    game_state = TwoPlayerGameState(
+        game=game,
+        board=from_array_to_dictionary_board(board),
+        initial_player=player1,
+    )
+    return TwoPlayerMatch(game_state, max_sec_per_move=60, gui=False)
+
+
+def run_tournament(n_workers: int = 1, **options) -> tuple:
+    tour = Tournament(max_depth=2, init_match=create_match)
+    scores, totals, names = tour.run(
+        student_strategies={'a': [HeuristicMobility], 'b': [HeuristicCorners]},
+        increasing_depth=False,
+        n_pairs=2,
+        n_workers=n_workers,
+        seed=0,
+        **options,
+    )
+    return scores, totals
+
+
+def test_results_do_not_depend_on_workers():
+    scores, totals = run_tournament()
+    assert sum(totals.values()) == 4
+    assert run_tournament(n_workers=2) == (scores, totals)
+
+
+def read_lines(log_path) -> list:
+    with open(log_path) as log:
+        return log.read().splitlines()
+
+
+def test_match_log_records_every_match(tmp_path):
+    log_path = tmp_path / 'matches.jsonl'
+    scores, totals = run_tournament(log_path=str(log_path))
+    records = [json.loads(line) for line in read_lines(log_path)]
+    assert [record['match'] for record in records] == [0, 1, 2, 3]
+    for record in records:
+        assert record['depth'] == 2
+        assert sorted(record['colors']) == ['B', 'W']
+        assert record['wins'] + record['loses'] == 1
+        assert record['plies'] > 0
+        assert all(nodes > 0 for nodes in record['nodes'])
+    assert sum(record['wins'] + record['loses'] for record in records) == sum(totals.values())
+
+
+def test_interrupted_tournament_resumes_from_log(tmp_path):
+    log_path = tmp_path / 'matches.jsonl'
+    scores, totals = run_tournament(log_path=str(log_path))
+    lines = read_lines(log_path)
+
+    # as left by a run interrupted while writing the third match
+    log_path.write_text(lines[0] + '\n' + lines[1] + '\n' + lines[2][:20])
+    assert run_tournament(n_workers=2, log_path=str(log_path)) == (scores, totals)
+    resumed = [json.loads(line) for line in read_lines(log_path)[:2] + read_lines(log_path)[3:]]
+    assert sorted(record['match'] for record in resumed) == [0, 1, 2, 3]
+    wins = {record['match']: record['wins'] for record in resumed}
+    assert [wins[match] for match in range(4)] == [json.loads(line)['wins'] for line in lines]
+
+    # nothing left to play
+    assert run_tournament(log_path=str(log_path)) == (scores, totals)
+    assert len(read_lines(log_path)) == 5
@@ -0,0 +1,90 @@
+"""
+Transposition table and Zobrist hashing.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+import random
+
+import pytest
+
+from game_infrastructure.reversi import BitboardReversi, Reversi, create_reversi_state
+from heuristic import Heuristic, best_mobility_function
+from strategy import MinimaxAlphaBetaStrategy
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+from conftest import position_state
+
+
+heuristic = Heuristic(name='mobility', evaluation_function=best_mobility_function)
+
+
+def test_store_and_probe():
+    table = TranspositionTable(max_entries=8)
+    assert table.probe(5) is None
+    table.store(5, 3, 1.5, EXACT, (1, 2))
+    entry = table.probe(5)
+    assert (entry.key, entry.depth, entry.value, entry.bound, entry.best_move) == (5, 3, 1.5, EXACT, (1, 2))
+    assert (table.hits, table.misses) == (1, 1)
+
+
+def test_replacement_keeps_deepest_and_latest():
+    table = TranspositionTable(max_entries=8)
+    # keys 1, 5 and 9 share a slot of the 4
+    table.store(1, 4, 0.0, EXACT, None)
+    table.store(5, 2, 0.0, EXACT, None)
+    assert table.probe(1).depth == 4 and table.probe(5).depth == 2
+    # a shallower result replaces the always-replace entry only
+    table.store(9, 1, 0.0, EXACT, None)
+    assert table.probe(1) is not None and table.probe(5) is None and table.probe(9) is not None
+    # a deeper one takes the depth-preferred entry, which moves down
+    table.store(5, 6, 0.0, EXACT, None)
+    assert table.probe(5).depth == 6 and table.probe(1).depth == 4 and table.probe(9) is None
+    # a result of the same position replaces its entry whatever the depth
+    table.store(5, 1, 2.0, LOWER_BOUND, None)
+    assert table.probe(5).depth == 1
+    assert len(table) <= table.max_entries
+
+
+def test_bounds_stored_and_probed():
+    state = position_state(Reversi, '6x6 opening')
+    strategy = MinimaxAlphaBetaStrategy(heuristic, 3, transposition_table=TranspositionTable())
+    # failed low: an upper bound, which lowers beta
+    strategy._store(state, 2, -1.0, 0.0, 5.0, (3, 4))
+    assert strategy.transposition_table.probe(state.hash_key).bound == UPPER_BOUND
+    assert strategy._probe(state, 2, -3.0, 5.0) == (None, -3.0, -1.0, (3, 4))
+    # and settles a window above it
+    assert strategy._probe(state, 2, 0.0, 5.0)[0] == -1.0
+    # failed high: a lower bound, which raises alpha
+    strategy._store(state, 2, 6.0, 0.0, 5.0, (3, 4))
+    assert strategy.transposition_table.probe(state.hash_key).bound == LOWER_BOUND
+    assert strategy._probe(state, 2, 0.0, 10.0) == (None, 6.0, 10.0, (3, 4))
+    # exact values settle any window, but not deeper searches
+    strategy._store(state, 2, 1.0, 0.0, 5.0, (3, 4))
+    assert strategy._probe(state, 2, -10.0, 10.0)[0] == 1.0
+    assert strategy._probe(state, 3, -10.0, 10.0) == (None, -10.0, 10.0, (3, 4))
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+@pytest.mark.parametrize('name', ['8x8 midgame', '6x6 opening', '5x7 intermediate'])
+def test_search_with_table_plays_the_same_move(engine, name):
+    moves = []
+    for table in (None, TranspositionTable()):
+        strategy = MinimaxAlphaBetaStrategy(heuristic, 3, transposition_table=table)
+        moves.append(strategy.next_move(position_state(engine, name)).move_code)
+    assert moves[0] == moves[1]
+
+
+@pytest.mark.parametrize('engine', [Reversi, BitboardReversi])
+def test_incremental_hash_matches_full_hash(engine):
+    """The hash updated by make_move is the one computed from the board."""
+    rng = random.Random(0)
+    for game_number in range(3):
+        state = create_reversi_state(engine)
+        game = state.game
+        while not state.end_of_game:
+            # known before the move, so that make_move updates it
+            assert state.hash_key == game.hash_state(state)
+            game.make_move(state, rng.choice(game.legal_moves(state)))
+        assert state.hash_key == game.hash_state(state)
@@ -16,9 +16,11 @@ from game_infrastructure.game import Player, TwoPlayerGameState, TwoPlayerMatch
 from heuristic import simple_evaluation_function
 from game_infrastructure.tictactoe import TicTacToe
 from game_infrastructure.tournament import StudentHeuristic, Tournament
+from strategy import MCTSStrategy, MinimaxAlphaBetaStrategy, NegamaxPVSStrategy
 
 from heuristic import *
 from game_infrastructure.reversi import (
+    BitboardReversi,
     Reversi,
     from_array_to_dictionary_board,
     from_dictionary_to_array_board,
@@ -103,6 +105,9 @@ class HeuristicCorners(StudentHeuristic):
     def evaluation_function(self, state: TwoPlayerGameState) -> float:
         return corners_based_function(state)
 
+    def batch_evaluation_function(self, batch: BoardBatch) -> np.ndarray:
+        return corners_based_function_batch(batch)
+
 class HeuristicPonderationMax(StudentHeuristic):
     """Heuristic using ponderation_maximize evaluation function.
     Combines HeuristicEndGame, HeuristicMaxCapturablePieces, HeuristicBestCapture 
@@ -130,7 +135,26 @@ class HeuristicParityMobilityCorners1(StudentHeuristic):
         weights = [0.3, 0.3, 0.4]
         
         return combined_based_function(state, functions, weights)
+
+    def batch_evaluation_function(self, batch: BoardBatch) -> np.ndarray:
+        functions = [corners_based_function_batch, parity_function_batch, best_mobility_function_batch]
+        weights = [0.3, 0.3, 0.4]
+
+        return combined_based_function_batch(batch, functions, weights)
         
+class PlayerMCTS(StudentHeuristic):
+    """ Plays with Monte Carlo tree search (random playouts) instead of
+    searching with a heuristic, with mcts_sec_per_move seconds per move"""
+
+    def get_name(self) -> str:
+        return "mcts"
+
+    def evaluation_function(self, state: TwoPlayerGameState) -> float:
+        return 0
+
+    def strategy(self, heuristic, max_depth_minimax, verbose=0, **options) -> MCTSStrategy:
+        return MCTSStrategy(max_sec_per_move=mcts_sec_per_move, n_workers=mcts_workers, verbose=verbose)
+
 class HeuristicParityMobilityCorners2(StudentHeuristic):
     """ Combines corners_based_function, parity_function and best_mobility_function
     with some optimized poderations"""
@@ -144,6 +168,12 @@ class HeuristicParityMobilityCorners2(StudentHeuristic):
         
         return combined_based_function(state, functions, weights)
 
+    def batch_evaluation_function(self, batch: BoardBatch) -> np.ndarray:
+        functions = [corners_based_function_batch, parity_function_batch, best_mobility_function_batch]
+        weights = [0.7, 0.1, 0.2]
+
+        return combined_based_function_batch(batch, functions, weights)
+
 
 
 ###############################################################################################
@@ -192,6 +222,21 @@ initial_board_global = intermediate_state_small
 repetitions = 1 # tournament repetitions
 depth = 2 # search depth used by the search algorithms
 max_sec_per_move = 5
+reversi_engine = Reversi # BitboardReversi plays the same games using bitboards (faster)
+search_strategy = MinimaxAlphaBetaStrategy # NegamaxPVSStrategy plays the same moves expanding fewer nodes
+evaluation_cache_size = None # e.g. 2 ** 16: each heuristic remembers the values of that many positions (about 230 bytes each)
+evaluation_cache_policy = 'lru' # or 'clock'
+persistent_evaluation_cache = False # keep the remembered values from one match to the next
+endgame_empties = None # e.g. 12: positions with that many empty squares or fewer are solved exactly
+endgame_win_loss_draw = False # only tell solved wins, losses and draws apart (much faster)
+opening_book = None # e.g. 'opening_book.bin', built with build_opening_book.py for the same initial board
+batch_leaves = None # True/False to evaluate the leaves of each frontier node in one batch or not; by default only without bitboards
+mcts_sec_per_move = 1 # time of PlayerMCTS for each move (it plays with MCTSStrategy)
+mcts_workers = 1 # processes searching for PlayerMCTS (root parallelism)
+max_sec_ponder = None # e.g. 5: players keep searching for that long during the opponent's turn, in a process of their own
+n_workers = 1 # matches played at the same time, each one in its own process
+seed = None # fix it (e.g. seed = 0) to get the same results in every run
+match_log = None # e.g. 'matches.jsonl': each match of the normal tournament is appended to it as it finishes, and matches already there are not played again
 
 # different tournament moddalities can be selected
 test = 0 # normal tournament
@@ -200,6 +245,7 @@ test = 0 # normal tournament
 
 # here we choose the players (herusitic classes) which will play against each other in case of normal tournament
 strats = {'End': [HeuristicPonderationMax], 'EndMaxBest': [HeuristicParityMobilityCorners1]}
+#strats['MCTS'] = [PlayerMCTS] # Monte Carlo tree search against them
 
 # these varibles are used in one_heuristic_against_others, when not running a normal tournament
 tested_heuristic = {'0': [HeuristicPonderationMax]}
@@ -228,6 +274,8 @@ def one_heuristic_against_others(ponderations: bool):
             increasing_depth=False,
             n_pairs=repetitions,
             allow_selfmatch=False,
+            n_workers=n_workers,
+            seed=seed,
         )
         # we save the relevant results of the tournament in scores_backup
         tested_heuristic_wins = list(list(scores.values())[0].values())[0]
@@ -267,7 +315,7 @@ def create_match(player1: Player, player2: Player) -> TwoPlayerMatch:
         except ValueError:
             raise ValueError('Wrong configuration of the board')
     
-    game = Reversi(
+    game = reversi_engine(
         player1=player1,
         player2=player2,
         height=height,
@@ -283,7 +331,19 @@ def create_match(player1: Player, player2: Player) -> TwoPlayerMatch:
 
     return TwoPlayerMatch(game_state, max_sec_per_move=max_sec_per_move, gui=False)
 
-tour = Tournament(max_depth=depth, init_match=create_match)
+tour = Tournament(
+    max_depth=depth,
+    init_match=create_match,
+    strategy=search_strategy,
+    evaluation_cache_size=evaluation_cache_size,
+    evaluation_cache_policy=evaluation_cache_policy,
+    persistent_evaluation_cache=persistent_evaluation_cache,
+    endgame_empties=endgame_empties,
+    endgame_win_loss_draw=endgame_win_loss_draw,
+    opening_book=opening_book,
+    max_sec_ponder=max_sec_ponder,
+    batch_leaves=batch_leaves,
+)
 
 
 
@@ -313,6 +373,9 @@ if test == 0 :
         increasing_depth=False,
         n_pairs=repetitions,
         allow_selfmatch=False,
+        n_workers=n_workers,
+        seed=seed,
+        log_path=match_log,
     )
     print('Execution time: %s' %(time.time() - start))
     print()
@@ -328,6 +391,14 @@ if test == 0 :
             else:
                 print('\t%d' % (scores[name1][name2]), end='')
         print()
+    if evaluation_cache_size is not None:
+        print()
+        print('Evaluation caches:')
+        for name, cache in tour.evaluation_cache_statistics().items():
+            print('%s\t%s' % (name, cache))
+    if opening_book is not None:
+        print()
+        print('Opening book: %s' % tour.opening_book_statistics())
 
 # if test equals 1 a tournament in which one heuristic is faced against a list of others will be
 # carried out
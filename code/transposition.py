@@ -0,0 +1,97 @@
+"""
+Transposition table for the search strategies.
+Author: Pedro Urbina Rodriguez
+"""
+
+from __future__ import annotations  # For Python 3.7
+
+from typing import Any, List, NamedTuple, Optional
+
+# Kind of value stored in an entry
+EXACT = 0
+LOWER_BOUND = 1  # the search failed high, the value is at least this
+UPPER_BOUND = 2  # the search failed low, the value is at most this
+
+
+class TranspositionEntry(NamedTuple):
+    """Result of searching a position."""
+
+    key: int
+    depth: int
+    value: float
+    bound: int
+    best_move: Any
+
+
+class TranspositionTable(object):
+    """Bounded table of search results indexed by the position hash.
+
+    Each slot holds two entries: a depth-preferred one, replaced only by
+    searches at least as deep, and an always-replace one that keeps the
+    most recent shallower result. So at most max_entries are stored.
+    """
+
+    def __init__(self, max_entries: int = 2 ** 16) -> None:
+        self.max_entries = max_entries
+        self.n_slots = max(1, max_entries // 2)
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self) -> None:
+        """Remove all the entries (the counters are kept)."""
+        self._depth_preferred: List[Optional[TranspositionEntry]] = [None] * self.n_slots
+        self._always_replace: List[Optional[TranspositionEntry]] = [None] * self.n_slots
+
+    def __getstate__(self) -> dict:
+        # Pickling (e.g. to send a strategy to another process) keeps the
+        # size and the counters, not the entries.
+        state = self.__dict__.copy()
+        del state['_depth_preferred'], state['_always_replace']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.clear()
+
+    def __len__(self) -> int:
+        return (
+            sum(entry is not None for entry in self._depth_preferred)
+            + sum(entry is not None for entry in self._always_replace)
+        )
+
+    def probe(self, key: int) -> Optional[TranspositionEntry]:
+        """Entry stored for the position, if any."""
+        index = key % self.n_slots
+        entry = self._depth_preferred[index]
+        if entry is None or entry.key != key:
+            entry = self._always_replace[index]
+            if entry is None or entry.key != key:
+                self.misses += 1
+                return None
+        self.hits += 1
+        return entry
+
+    def store(
+        self,
+        key: int,
+        depth: int,
+        value: float,
+        bound: int,
+        best_move: Any,
+    ) -> None:
+        """Store the result of searching a position to the given depth."""
+        index = key % self.n_slots
+        entry = TranspositionEntry(key, depth, value, bound, best_move)
+        deepest = self._depth_preferred[index]
+        if deepest is None or deepest.key == key or depth >= deepest.depth:
+            self._depth_preferred[index] = entry
+            if deepest is not None and deepest.key != key:
+                self._always_replace[index] = deepest
+        else:
+            self._always_replace[index] = entry
+
+    def hit_rate(self) -> float:
+        """Fraction of probes that found an entry."""
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0